@@ -0,0 +1,324 @@
+# game/autopilot.py
+import argparse
+import math
+import sys
+import time
+from array import array
+from collections import deque
+from settings import TILE_SIZE, PELLET_POINTS, AUTOPILOT_BUDGET_MS
+from game.direction import NAMES, NONE, REVERSE, DX, DY, MASK_CODES
+from game.engine import GameEngine
+
+BUDGET_MS = AUTOPILOT_BUDGET_MS  # search time per call (one call per frame)
+EXPLORATION = 15.0       # UCT exploration constant, in points (about a pellet and a half)
+DISCOUNT = 0.97          # per macro move: sooner pellets are worth more
+DEATH_PENALTY = 1500     # points a lost life costs in the search
+WIN_BONUS = 5000
+TIME_COST = 0.0          # points a frame costs (0: only the discount hurries Pacman)
+PELLET_DECAY = 0.97      # per tile: a leaf is worth PELLET_POINTS * PELLET_DECAY**(distance to the nearest pellet)
+PELLET_SEARCH = 128      # tiles the nearest-pellet search looks through at a leaf
+MAX_MACRO_FRAMES = 96    # frames one macro move may run before it counts as a decision point anyway
+MAX_NODES = 8192         # node pool size; a full tree is only refined until a move frees part of it
+RECLAIM_PER_CALL = 64    # released nodes returned to the pool per call
+
+def _aligned(pacman):
+    return pacman.x % TILE_SIZE == 0 and pacman.y % TILE_SIZE == 0
+
+def choices(engine):
+    """
+    Direction codes worth deciding between for a grid-aligned Pacman: every
+    open exit at junctions, corners and when stopped; a single code where
+    only one way leads on without turning back (it is taken automatically).
+    """
+    pac, gm = engine.pacman, engine.game_map
+    codes = MASK_CODES[gm.legal_mask(pac.x // TILE_SIZE, pac.y // TILE_SIZE)]
+    if pac.dir == NONE:
+        return codes
+    forward = [c for c in codes if c != REVERSE[pac.dir]]
+    if len(forward) == 1 and forward[0] == pac.dir:
+        return forward  # straight corridor
+    return codes if forward else (REVERSE[pac.dir],)
+
+def pellet_distance(engine):
+    """Walking distance from Pacman to the nearest pellet (PELLET_SEARCH if none is that close)."""
+    gm, pac = engine.game_map, engine.pacman
+    cols, grid, mask = gm.cols, gm.pellet_grid, gm.adjacency
+    start = (pac.y // TILE_SIZE)*cols + pac.x // TILE_SIZE
+    if not 0 <= start < len(grid):
+        return PELLET_SEARCH
+    seen = {start}
+    q = deque([(start, 0)])
+    while q:
+        i, d = q.popleft()
+        if grid[i]:
+            return d
+        if d >= PELLET_SEARCH:
+            break
+        x = i % cols
+        for code in MASK_CODES[mask[i]]:
+            j = (i // cols + DY[code])*cols + (x + DX[code]) % cols
+            if j not in seen and 0 <= j < len(grid):
+                seen.add(j)
+                q.append((j, d + 1))
+    return PELLET_SEARCH
+
+def pack_state(state):
+    """An EngineState with the random generator's 625 ints packed into bytes (2.5 KB instead of ~20)."""
+    version, internal, gauss = state.rng_state
+    return state._replace(rng_state=(version, array("I", internal).tobytes(), gauss))
+
+def unpack_state(state):
+    version, internal, gauss = state.rng_state
+    return state._replace(rng_state=(version, tuple(array("I", internal)), gauss))
+
+class Autopilot:
+    """
+    Anytime Monte Carlo tree search Pacman: a policy(engine) -> action for
+    GameEngine.run / the tournament, or main.py's input source.
+
+    The forward model is a clone of the game's engine: the real ghost rules
+    (target_tile, choose_dir_greedy, frightened_step) with the engine's
+    random state, so on simulated time a predicted line is exactly what
+    will happen. Moves are macro moves from one decision point (a junction,
+    corner or stop, see choices()) to the next; corridors are followed
+    without branching. Lines are valued by the score along the way less lost
+    lives and time taken, plus the nearest pellet at the leaf, discounted by
+    its walking distance (never worth more than eating it now, so Pacman
+    does not leave the last pellets of a corridor to stay near them).
+
+    Every call searches for `budget_ms`, not only at decision points: once a
+    move is chosen its child becomes the root, the state at the next decision
+    point, and is refined on each frame of the walk there. On arrival the
+    root is checked against the real state and the tree is rebuilt only when
+    they differ (a reset, a real-time clock). nodes_per_second() and
+    iterations_per_second() report the search speed.
+
+    So that a call never stalls, the tree is a fixed pool of `max_nodes`
+    nodes in flat arrays (nothing for the garbage collector to walk) holding
+    packed snapshots, and the subtrees a move rules out are returned to the
+    pool a few nodes at a time rather than all at once.
+    """
+
+    def __init__(self, budget_ms=BUDGET_MS, exploration=EXPLORATION, max_nodes=MAX_NODES):
+        self.budget = budget_ms / 1000
+        self.exploration = exploration
+        self.model = None  # scratch engine the search steps
+        self.root = -1
+        # node pool
+        self.states = [None] * max_nodes           # pack_state() snapshots
+        self.action = bytearray(max_nodes)         # direction code of the move into the node
+        self.untried = bytearray(max_nodes)        # bit mask of direction codes not expanded yet
+        self.terminal = bytearray(max_nodes)
+        self.child = array("i", [-1]) * max_nodes  # first child
+        self.sibling = array("i", [-1]) * max_nodes
+        self.visits = array("i", bytes(4 * max_nodes))
+        self.total = array("d", bytes(8 * max_nodes))
+        self.reward = array("d", bytes(8 * max_nodes))    # points (minus penalties) on the move into the node
+        self.estimate = array("d", bytes(8 * max_nodes))  # leaf value
+        self.free = list(range(max_nodes - 1, -1, -1))
+        self.released = []  # roots of subtrees waiting to go back to the pool
+        # stats
+        self.nodes = 0          # nodes expanded, in total
+        self.iterations = 0     # selection passes, in total (no expansion once the tree holds a finished game)
+        self.search_time = 0.0  # seconds spent searching, in total
+        self.longest_call = 0.0
+        self.rebuilds = 0
+
+    def __call__(self, engine):
+        start = time.perf_counter()
+        self._reclaim(RECLAIM_PER_CALL)
+        action, decided = None, False
+        if not engine.game_over and _aligned(engine.pacman):
+            codes = choices(engine)
+            if len(codes) == 1:
+                action = NAMES[codes[0]]
+            else:
+                self._sync_root(engine)
+                self._search(start + self.budget)
+                best = self._best_child()
+                action = NAMES[self.action[best] if best >= 0 else codes[0]]
+                self._advance_root(best)
+                decided = True
+        if not decided and not engine.game_over:
+            # on the way to the next decision point: refine the tree rooted there
+            if self.root < 0:
+                self._plant_root(engine, action)
+            self._search(start + self.budget)
+        self.longest_call = max(self.longest_call, time.perf_counter() - start)
+        return action
+
+    def nodes_per_second(self):
+        return self.nodes / self.search_time if self.search_time else 0.0
+
+    def iterations_per_second(self):
+        return self.iterations / self.search_time if self.search_time else 0.0
+
+    # --------- node pool ---------------------------------------------------
+    def _alloc(self, model, code=NONE, reward=0.0):
+        """A new node for `model`'s current state; -1 when the pool is exhausted."""
+        if not self.free and not self._reclaim(1):
+            return -1
+        i = self.free.pop()
+        self.states[i] = pack_state(model.snapshot())
+        self.action[i] = code
+        self.terminal[i] = model.game_over
+        mask = 0
+        if not model.game_over:
+            for c in choices(model):
+                mask |= 1 << c
+        self.untried[i] = mask
+        self.child[i] = self.sibling[i] = -1
+        self.visits[i] = 0
+        self.total[i] = 0.0
+        self.reward[i] = reward
+        d = pellet_distance(model)
+        self.estimate[i] = 0.0 if model.game_over or d >= PELLET_SEARCH else PELLET_POINTS * PELLET_DECAY**d
+        return i
+
+    def _reclaim(self, limit):
+        """Return up to `limit` released nodes to the pool; False if there was nothing to return."""
+        released, child, sibling = self.released, self.child, self.sibling
+        for _ in range(limit):
+            if not released:
+                return bool(self.free)
+            i = released.pop()
+            c = child[i]
+            while c >= 0:
+                released.append(c)
+                c = sibling[c]
+            self.states[i] = None
+            self.free.append(i)
+        return True
+
+    def _release(self, i):
+        if i >= 0:
+            self.released.append(i)
+
+    # --------- tree --------------------------------------------------------
+    def _new_model(self, engine):
+        self.model = engine.clone()
+        self.model.input_source = None
+        return self.model
+
+    def _sync_root(self, engine):
+        """Make the root the real current state, reusing the tree when it predicted this state."""
+        if self.root >= 0 and self.states[self.root] == pack_state(engine.snapshot()):
+            return
+        self.rebuilds += 1
+        self._release(self.root)
+        self.root = self._alloc(self._new_model(engine))
+
+    def _plant_root(self, engine, action):
+        """Root the tree at the next decision point ahead, where `action` (this frame's) leads."""
+        model = self._new_model(engine)
+        reward = self._advance(model, action)
+        self.root = self._alloc(model, reward=reward)
+
+    def _best_child(self):
+        best, most, c = -1, -1, self.child[self.root]
+        while c >= 0:
+            if self.visits[c] > most:
+                best, most = c, self.visits[c]
+            c = self.sibling[c]
+        return best
+
+    def _advance_root(self, keep):
+        """Make child `keep` the root, releasing the old root and the other children."""
+        root, sibling = self.root, self.sibling
+        c = self.child[root]
+        while c >= 0:
+            nxt = sibling[c]
+            if c != keep:
+                self._release(c)
+            c = nxt
+        self.child[root] = -1
+        self._release(root)
+        if keep >= 0:
+            sibling[keep] = -1
+        self.root = keep
+
+    def _advance(self, model, want):
+        """Step `model` with direction name `want` to the next decision point; returns the reward on the way."""
+        pac = model.pacman
+        score, lives, frame = pac.score, pac.lives, model.frame
+        for _ in range(MAX_MACRO_FRAMES):
+            if model.step(want):
+                break
+            if _aligned(pac):
+                codes = choices(model)
+                if len(codes) != 1:
+                    break
+                want = NAMES[codes[0]]
+        reward = pac.score - score - (lives - pac.lives) * DEATH_PENALTY - (model.frame - frame) * TIME_COST
+        if model.won:
+            reward += WIN_BONUS
+        return reward
+
+    def _search(self, deadline):
+        root = self.root
+        if root < 0:
+            return
+        start = time.perf_counter()
+        model, c = self.model, self.exploration
+        child, sibling, visits, total = self.child, self.sibling, self.visits, self.total
+        untried, terminal = self.untried, self.terminal
+        iterations = 0
+        while time.perf_counter() < deadline:
+            iterations += 1
+            node, path = root, [root]
+            while not terminal[node]:
+                mask = untried[node]
+                if mask:
+                    code = (mask & -mask).bit_length() - 1
+                    model.restore(unpack_state(self.states[node]))
+                    reward = self._advance(model, NAMES[code])
+                    new = self._alloc(model, code, reward)
+                    if new >= 0:
+                        untried[node] = mask & ~(1 << code)
+                        sibling[new] = child[node]
+                        child[node] = new
+                        self.nodes += 1
+                        path.append(new)
+                        break
+                best, best_u = -1, -math.inf
+                log_n = math.log(visits[node] + 1)
+                ch = child[node]
+                while ch >= 0:
+                    n = visits[ch]
+                    u = total[ch] / n + c * math.sqrt(log_n / n) if n else math.inf
+                    if u > best_u:
+                        best, best_u = ch, u
+                    ch = sibling[ch]
+                if best < 0:
+                    break
+                node = best
+                path.append(node)
+            value = self.estimate[path[-1]]
+            for i in reversed(path):
+                value = self.reward[i] + DISCOUNT * value
+                visits[i] += 1
+                total[i] += value
+        self.iterations += iterations
+        self.search_time += time.perf_counter() - start
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Play headless games with the search autopilot.")
+    ap.add_argument("--games", type=int, default=3)
+    ap.add_argument("--budget-ms", type=float, default=BUDGET_MS, help="search time per frame")
+    ap.add_argument("--max-frames", type=int, default=20000)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--ghost-pathing", default="greedy", choices=("greedy", "bfs"))
+    args = ap.parse_args(argv)
+
+    print(f"{'seed':>6}{'score':>8}{'lives':>7}{'frames':>8}{'won':>5}{'nodes/s':>10}{'iters/s':>10}{'max call ms':>13}{'rebuilds':>10}")
+    for i in range(args.games):
+        engine = GameEngine(seed=args.seed + i, ghost_pathing=args.ghost_pathing)
+        pilot = Autopilot(args.budget_ms)
+        frames = engine.run(args.max_frames, pilot)
+        print(f"{args.seed + i:>6}{engine.pacman.score:>8}{engine.pacman.lives:>7}{frames:>8}"
+              f"{'yes' if engine.won else 'no':>5}{pilot.nodes_per_second():>10.0f}"
+              f"{pilot.iterations_per_second():>10.0f}{pilot.longest_call * 1000:>13.2f}{pilot.rebuilds:>10}", flush=True)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,395 @@
+# game/batch.py
+import numpy as np
+from settings import (TILE_SIZE, PACMAN_SPEED, GHOST_SPEED, FRIGHTENED_SPEED, PELLET_POINTS,
+                      POWER_POINTS, GHOST_POINTS, POWER_DURATION, RESPAWN_INVINCIBLE)
+from game.map import GameMap, PELLET_TILE, POWER_TILE, PELLET_BOX
+from game.routing import STEPS
+from game.direction import DX, DY
+from game.engine import FRAME_MS, build_mode_schedule
+from game.ghost import HOUSE_WAIT_MS, make_ghosts
+
+# action codes accepted by BatchEnv.step (anything else = keep current wish)
+ACTIONS = ("UP", "DOWN", "LEFT", "RIGHT")
+ACTION_DX = np.array([0, 0, -1, 1])
+ACTION_DY = np.array([-1, 1, 0, 0])
+NO_ACTION = -1
+
+# ghost slots and mode codes
+GHOST_NAMES = ("blinky", "pinky", "inky", "clyde")
+MODES = ("scatter", "chase", "frightened", "eaten")
+SCATTER, CHASE, FRIGHTENED, EATEN = range(4)
+NEVER = -1  # eaten_time "None"
+
+GHOST_DX = np.array([dx for dx, _ in STEPS])
+GHOST_DY = np.array([dy for _, dy in STEPS])
+
+class BatchEnv:
+    """
+    N independent games stepped in lockstep with NumPy.
+
+    Pacman and ghost state for every game lives in (N,) and (N, 4) integer
+    arrays and each step applies the rules of Pacman.update, Ghost.update and
+    GameEngine.step as whole-array operations. Frightened ghosts draw their
+    random turn from one uniform per ghost per step (kept in last_uniforms)
+    instead of the random module.
+    """
+
+    def __init__(self, n, seed=None, game_map=None):
+        self.n = n
+        gm = game_map if game_map is not None else GameMap()
+        self.rows, self.cols = gm.rows, gm.cols
+        self.wall = np.array(gm.wall_grid, dtype=bool)
+        self.tunnel = np.zeros(self.rows, dtype=bool)
+        for r in gm.tunnel_rows:
+            if 0 <= r < self.rows:
+                self.tunnel[r] = True
+        self.initial_pellets = np.frombuffer(bytes(gm.pellet_grid), dtype=np.uint8)
+        self.pacman_spawn = gm.pacman_spawn
+        self.ghost_spawns = gm.ghost_spawns[:len(GHOST_NAMES)]
+        self.home = gm.home_tile
+        # scatter corners and respawn delay as the scalar ghosts get them (corners follow the board size)
+        ghosts = make_ghosts(self.ghost_spawns, gm, names=GHOST_NAMES[:len(self.ghost_spawns)])
+        self.scatter_targets = np.array([g.scatter_target for g in ghosts])
+        self.respawn_delay = np.array([g.respawn_delay for g in ghosts])
+
+        # next-hop code toward home for every tile (-1: none), from the routing table
+        routes = gm.routes
+        self.home_step = np.full(self.rows * self.cols, -1, dtype=np.int64)
+        for ty in range(self.rows):
+            for tx in range(self.cols):
+                step = routes.first_step((tx, ty), self.home)
+                if step is not None:
+                    self.home_step[ty*self.cols + tx] = STEPS.index(step)
+
+        schedule, self.cycle_length = build_mode_schedule()
+        self.schedule_starts = np.array([ts for ts, _ in schedule])
+        self.schedule_modes = np.array([SCATTER if m == "scatter" else CHASE for _, m in schedule])
+        self.ghost_points = np.array(GHOST_POINTS)
+        self.rng = np.random.default_rng(seed)
+        self.reset()
+
+    def reset(self):
+        n, g = self.n, len(self.ghost_spawns)
+        self.frame = 0
+        self.px = np.full(n, self.pacman_spawn[0], dtype=np.int64)
+        self.py = np.full(n, self.pacman_spawn[1], dtype=np.int64)
+        self.pdx = np.zeros(n, dtype=np.int64)
+        self.pdy = np.zeros(n, dtype=np.int64)
+        self.wdx = np.zeros(n, dtype=np.int64)
+        self.wdy = np.zeros(n, dtype=np.int64)
+        self.score = np.zeros(n, dtype=np.int64)
+        self.lives = np.full(n, 3, dtype=np.int64)
+        self.invincible_until = np.zeros(n, dtype=np.int64)
+        self.pellets = np.tile(self.initial_pellets, (n, 1))
+        self.pellets_left = np.full(n, np.count_nonzero(self.initial_pellets), dtype=np.int64)
+
+        self.gx = np.tile(np.array([x for x, _ in self.ghost_spawns]), (n, 1))
+        self.gy = np.tile(np.array([y for _, y in self.ghost_spawns]), (n, 1))
+        self.gdx = np.ones((n, g), dtype=np.int64)
+        self.gdy = np.zeros((n, g), dtype=np.int64)
+        self.mode = np.full((n, g), SCATTER, dtype=np.int64)
+        self.prev_mode = self.mode.copy()
+        self.speed = np.full((n, g), GHOST_SPEED, dtype=np.int64)
+        not_blinky = np.arange(g) != 0
+        self.house_wait = np.tile(np.where(not_blinky, HOUSE_WAIT_MS, 0), (n, 1))
+        self.in_house = np.tile(not_blinky, (n, 1))
+        self.eaten_time = np.full((n, g), NEVER, dtype=np.int64)
+
+        self.frightened_until = np.zeros(n, dtype=np.int64)
+        self.eaten_chain = np.zeros(n, dtype=np.int64)
+        self.game_over = np.zeros(n, dtype=bool)
+        self.won = np.zeros(n, dtype=bool)
+        self.last_uniforms = np.zeros((n, g))
+
+    # ---- helpers ----------------------------------------------------------
+    def _blocked(self, tx, ty):
+        """Vectorized GameMap.tile_blocked."""
+        inside = (ty >= 0) & (ty < self.rows)
+        return ~inside | self.wall[np.clip(ty, 0, self.rows-1), tx % self.cols]
+
+    def _legal(self, tx, ty):
+        """Vectorized Ghost.legal_dirs as a (..., 4) bool array in STEPS order."""
+        row_ok = (ty >= 0) & (ty < self.rows)
+        on_tunnel = row_ok & self.tunnel[np.clip(ty, 0, self.rows-1)]
+        out = []
+        for dx, dy in STEPS:
+            nx, ny = tx + dx, ty + dy
+            ok = (ny >= 0) & (ny < self.rows) & (((nx >= 0) & (nx < self.cols)) | on_tunnel)
+            out.append(ok & ~self._blocked(nx, ny))
+        return np.stack(out, axis=-1)
+
+    def _greedy(self, legal, tx, ty, target_x, target_y, fdx, fdy, forbid):
+        """Vectorized Ghost.choose_dir_greedy; `forbid` masks where a reverse is forbidden."""
+        forbid = forbid & ((fdx != 0) | (fdy != 0))
+        best = np.full(tx.shape, -1)
+        bestdist = np.full(tx.shape, 10**9)
+        for k, (dx, dy) in enumerate(STEPS):
+            ok = legal[..., k] & ~(forbid & (dx == -fdx) & (dy == -fdy))
+            dist = np.abs(tx + dx - target_x) + np.abs(ty + dy - target_y)
+            better = ok & (dist < bestdist)
+            best = np.where(better, k, best)
+            bestdist = np.where(better, dist, bestdist)
+        found = best >= 0
+        code = np.maximum(best, 0)
+        dx = np.where(found, GHOST_DX[code], np.where(forbid, -fdx, 0))
+        dy = np.where(found, GHOST_DY[code], np.where(forbid, -fdy, 0))
+        return dx, dy
+
+    def _frightened(self, legal, dx, dy, u):
+        """Vectorized Ghost.frightened_step, picking choices[int(u * len(choices))]."""
+        reverse = np.stack([(sx == -dx) & (sy == -dy) for sx, sy in STEPS], axis=-1)
+        count = legal.sum(axis=-1)
+        moving = (dx != 0) | (dy != 0)
+        filtered = legal & ~reverse
+        use_filtered = moving[..., None] & (count > 1)[..., None] & filtered.any(axis=-1)[..., None]
+        choices = np.where(use_filtered, filtered, legal)
+        count = choices.sum(axis=-1)
+        pick = (u * count).astype(np.int64)
+        rank = np.cumsum(choices, axis=-1) - 1
+        chosen = choices & (rank == pick[..., None])
+        code = np.argmax(chosen, axis=-1)
+        has = count > 0
+        return np.where(has, GHOST_DX[code], 0), np.where(has, GHOST_DY[code], 0)
+
+    # ---- stepping ---------------------------------------------------------
+    def step(self, actions):
+        """Advance every game one frame. `actions[i]` indexes ACTIONS or is NO_ACTION. Returns (rewards, done)."""
+        T = TILE_SIZE
+        now = int(self.frame * FRAME_MS)
+        self.frame += 1
+        live = ~self.game_over
+        score_before = self.score.copy()
+        actions = np.asarray(actions)
+        self.last_uniforms = u = self.rng.random(self.gx.shape)
+
+        # --- Pacman.update
+        act = live & (actions >= 0)
+        code = np.clip(actions, 0, 3)
+        self.wdx = np.where(act, ACTION_DX[code], self.wdx)
+        self.wdy = np.where(act, ACTION_DY[code], self.wdy)
+        px, py = self.px, self.py
+        aligned = live & (px % T == 0) & (py % T == 0)
+        can_want = ~self._blocked((px + self.wdx*T) // T, (py + self.wdy*T) // T)
+        turn = aligned & ((self.wdx != self.pdx) | (self.wdy != self.pdy)) & can_want
+        self.pdx = np.where(turn, self.wdx, self.pdx)
+        self.pdy = np.where(turn, self.wdy, self.pdy)
+        stop = aligned & self._blocked((px + self.pdx*T) // T, (py + self.pdy*T) // T)
+        self.pdx = np.where(stop, 0, self.pdx)
+        self.pdy = np.where(stop, 0, self.pdy)
+        px = np.where(live, px + self.pdx * PACMAN_SPEED, px)
+        py = np.where(live, py + self.pdy * PACMAN_SPEED, py)
+        px = self._wrap(px, py)
+        self.px, self.py = px, py
+
+        ate_power = self._eat(live)
+
+        # --- global scatter/chase mode
+        elapsed = now % self.cycle_length
+        global_mode = self.schedule_modes[np.searchsorted(self.schedule_starts, elapsed, side="right") - 1]
+
+        start_fright = live & ate_power
+        self.frightened_until = np.where(start_fright, now + POWER_DURATION, self.frightened_until)
+        self.eaten_chain = np.where(start_fright, 0, self.eaten_chain)
+        not_eaten = self.mode != EATEN
+        self.mode = np.where(start_fright[:, None] & not_eaten, FRIGHTENED, self.mode)
+
+        # --- Ghost.update for all ghosts at once
+        blinky_tx, blinky_ty = self.gx[:, 0] // T, self.gy[:, 0] // T
+        frightened_now = (now < self.frightened_until)[:, None]
+        not_eaten = self.mode != EATEN
+        new_mode = np.where(frightened_now, FRIGHTENED, global_mode)
+        self.mode = np.where(live[:, None] & not_eaten, new_mode, self.mode)
+        self._update_ghosts(live, now, u, blinky_tx, blinky_ty)
+
+        # --- collisions, ghost by ghost (later ghosts see earlier outcomes)
+        for k in range(self.gx.shape[1]):
+            hit = live & (np.abs(self.px - self.gx[:, k]) < T) & (np.abs(self.py - self.gy[:, k]) < T)
+            mode = self.mode[:, k]
+            eat = hit & (mode == FRIGHTENED)
+            self.score += np.where(eat, self.ghost_points[np.minimum(self.eaten_chain, 3)], 0)
+            self.eaten_chain += eat
+            self.mode[:, k] = np.where(eat, EATEN, mode)
+            self.eaten_time[:, k] = np.where(eat, now, self.eaten_time[:, k])
+            hurt = hit & ~eat & (mode != EATEN) & (now >= self.invincible_until) & (self.lives > 0)
+            self.lives -= hurt
+            self.invincible_until = np.where(hurt, now + RESPAWN_INVINCIBLE, self.invincible_until)
+            self.px = np.where(hurt, self.px // T * T, self.px)
+            self.py = np.where(hurt, self.py // T * T, self.py)
+            for arr in (self.pdx, self.pdy, self.wdx, self.wdy):
+                arr[hurt] = 0
+            self.game_over |= hurt & (self.lives <= 0)
+
+        cleared = live & ~self.game_over & (self.pellets_left == 0)
+        self.won |= cleared
+        self.game_over |= cleared
+        return self.score - score_before, self.game_over.copy()
+
+    def _wrap(self, x, y):
+        row = y // TILE_SIZE
+        on_tunnel = (row >= 0) & (row < self.rows) & self.tunnel[np.clip(row, 0, self.rows-1)]
+        x = np.where(on_tunnel & (x < 0), (self.cols-1) * TILE_SIZE, x)
+        return np.where(on_tunnel & (x >= self.cols * TILE_SIZE), 0, x)
+
+    def _eat(self, live):
+        """Vectorized GameMap.eat_pellets for Pacman's rect; returns the ate-power mask."""
+        T, cols = TILE_SIZE, self.cols
+        left, top = self.px, self.py
+        right, bottom = left + T, top + T
+        tx0, tx1 = np.maximum(left // T, 0), np.minimum((right-1) // T, cols-1)
+        ty0, ty1 = np.maximum(top // T, 0), np.minimum((bottom-1) // T, self.rows-1)
+        rows = np.arange(self.n)
+        powers = np.zeros(self.n, dtype=np.int64)
+        for tx, ty, valid in ((tx0, ty0, (tx0 <= tx1) & (ty0 <= ty1)),
+                              (tx1, ty0, (tx1 > tx0) & (ty0 <= ty1)),
+                              (tx0, ty1, (tx0 <= tx1) & (ty1 > ty0)),
+                              (tx1, ty1, (tx1 > tx0) & (ty1 > ty0))):
+            idx = np.clip(ty, 0, self.rows-1) * cols + np.clip(tx, 0, cols-1)
+            kind = self.pellets[rows, idx]
+            off = np.where(kind == POWER_TILE, PELLET_BOX[POWER_TILE][0], PELLET_BOX[PELLET_TILE][0])
+            size = np.where(kind == POWER_TILE, PELLET_BOX[POWER_TILE][1], PELLET_BOX[PELLET_TILE][1])
+            bx, by = tx*T + off, ty*T + off
+            hit = (live & valid & (kind != 0) &
+                   (left < bx+size) & (right > bx) & (top < by+size) & (bottom > by))
+            self.pellets[rows[hit], idx[hit]] = 0
+            self.pellets_left -= hit
+            self.score += np.where(hit, np.where(kind == POWER_TILE, POWER_POINTS, PELLET_POINTS), 0)
+            powers += hit & (kind == POWER_TILE)
+        return powers > 0
+
+    def _update_ghosts(self, live, now, u, blinky_tx, blinky_ty):
+        T = TILE_SIZE
+        live = live[:, None]
+        just_switched = self.mode != self.prev_mode
+        self.prev_mode = np.where(live, self.mode, self.prev_mode)
+
+        gx, gy = self.gx, self.gy
+        aligned = live & (gx % T == 0) & (gy % T == 0)
+
+        # 1) initial house wait
+        waiting = aligned & self.in_house
+        hold = waiting & (now < self.house_wait)
+        self.in_house = self.in_house & ~(waiting & ~hold)
+        decide = aligned & ~hold
+
+        tx, ty = gx // T, gy // T
+        legal = self._legal(tx, ty)
+        pac_tx, pac_ty = (self.px // T)[:, None], (self.py // T)[:, None]
+        pdx, pdy = self.pdx[:, None], self.pdy[:, None]
+        mode, dx, dy = self.mode, self.gdx, self.gdy
+
+        # scatter / chase targets
+        names = np.arange(gx.shape[1])[None, :]
+        ahead_x, ahead_y = pac_tx + pdx*2, pac_ty + pdy*2
+        far = (np.abs(pac_tx - tx) + np.abs(pac_ty - ty)) >= 8
+        sx, sy = self.scatter_targets[None, :, 0], self.scatter_targets[None, :, 1]
+        chase_x = np.select([names == 0, names == 1, names == 2, names == 3],
+                            [pac_tx, pac_tx + pdx*4, ahead_x + (ahead_x - blinky_tx[:, None]),
+                             np.where(far, pac_tx, sx)], pac_tx)
+        chase_y = np.select([names == 0, names == 1, names == 2, names == 3],
+                            [pac_ty, pac_ty + pdy*4, ahead_y + (ahead_y - blinky_ty[:, None]),
+                             np.where(far, pac_ty, sy)], pac_ty)
+        target_x = np.where(mode == SCATTER, sx, chase_x)
+        target_y = np.where(mode == SCATTER, sy, chase_y)
+        ndx, ndy = self._greedy(legal, tx, ty, target_x, target_y, dx, dy, ~just_switched)
+
+        # frightened: random wander, or a free greedy pick on the switch-in frame
+        fdx, fdy = self._frightened(legal, dx, dy, u)
+        sdx, sdy = self._greedy(legal, tx, ty, tx, ty, dx, dy, np.zeros_like(decide))
+        fdx, fdy = np.where(just_switched, sdx, fdx), np.where(just_switched, sdy, fdy)
+        is_fright = mode == FRIGHTENED
+        ndx, ndy = np.where(is_fright, fdx, ndx), np.where(is_fright, fdy, ndy)
+
+        # eaten: follow the routing table home, falling back to greedy
+        hx, hy = self.home
+        in_map = (tx >= 0) & (tx < self.cols) & (ty >= 0) & (ty < self.rows)
+        step = np.where(in_map, self.home_step[np.clip(ty, 0, self.rows-1)*self.cols + np.clip(tx, 0, self.cols-1)], -1)
+        edx, edy = self._greedy(legal, tx, ty, hx, hy, dx, dy, ~just_switched)
+        has_step = step >= 0
+        code = np.maximum(step, 0)
+        edx, edy = np.where(has_step, GHOST_DX[code], edx), np.where(has_step, GHOST_DY[code], edy)
+        is_eaten = mode == EATEN
+        ndx, ndy = np.where(is_eaten, edx, ndx), np.where(is_eaten, edy, ndy)
+
+        self.gdx = np.where(decide, ndx, dx)
+        self.gdy = np.where(decide, ndy, dy)
+        new_speed = np.where(is_fright, FRIGHTENED_SPEED, np.where(is_eaten, GHOST_SPEED + 1, GHOST_SPEED))
+        self.speed = np.where(decide, new_speed, self.speed)
+
+        # eaten ghosts park at home until their respawn delay is over
+        home_px, home_py = hx * T, hy * T
+        park = decide & is_eaten & (np.abs(gx - home_px) < 4) & (np.abs(gy - home_py) < 4)
+        gx = np.where(park, home_px, gx)
+        gy = np.where(park, home_py, gy)
+        self.gdx = np.where(park, 0, self.gdx)
+        self.gdy = np.where(park, 0, self.gdy)
+        self.eaten_time = np.where(park & (self.eaten_time == NEVER), now, self.eaten_time)
+        respawn = park & (now - self.eaten_time >= self.respawn_delay[None, :])
+        self.mode = np.where(respawn, SCATTER, self.mode)
+        self.eaten_time = np.where(respawn, NEVER, self.eaten_time)
+
+        # move (wrapping only on tunnel rows)
+        move = live & ~hold & ~park
+        gx = np.where(move, gx + self.gdx * self.speed, gx)
+        gy = np.where(move, gy + self.gdy * self.speed, gy)
+        self.gx, self.gy = self._wrap(gx, gy), gy
+
+    def game_state(self, i):
+        """Game i as plain tuples, in the same shape as engine_state() for a GameEngine."""
+        ghosts = tuple((int(self.gx[i, k]), int(self.gy[i, k]), int(self.gdx[i, k]), int(self.gdy[i, k]),
+                        MODES[self.mode[i, k]]) for k in range(self.gx.shape[1]))
+        return ((int(self.px[i]), int(self.py[i]), int(self.pdx[i]), int(self.pdy[i]),
+                 int(self.score[i]), int(self.lives[i])), ghosts, int(self.pellets_left[i]),
+                bool(self.game_over[i]))
+
+def engine_state(engine):
+    """Scalar GameEngine state in the BatchEnv.game_state() layout."""
+    p = engine.pacman
+    ghosts = tuple((g.x, g.y, DX[g.dir], DY[g.dir], g.mode) for g in engine.ghosts)
+    return ((p.x, p.y, DX[p.dir], DY[p.dir], p.score, p.lives), ghosts,
+            engine.game_map.pellets_left, engine.game_over)
+
+class _UniformChoice:
+    """Stand-in for a ghost's rng that picks with a uniform supplied by BatchEnv."""
+
+    def __init__(self):
+        self.u = 0.0
+
+    def choice(self, seq):
+        return seq[int(self.u * len(seq))]
+
+def check_consistency(games=32, frames=3000, seed=0, game_map=None):
+    """
+    Run BatchEnv and one GameEngine per game side by side on the same seeded
+    random actions and frightened draws, on `game_map` (default: the
+    classic maze). Returns a list of (game, frame, batch_state,
+    engine_state) for every divergence.
+    """
+    from game.engine import GameEngine
+    rng = np.random.default_rng(seed)
+    env = BatchEnv(games, seed=seed, game_map=game_map)
+    engines = [GameEngine(game_map=game_map.fork() if game_map is not None else None) for _ in range(games)]
+    pickers = []
+    for e in engines:
+        row = [_UniformChoice() for _ in e.ghosts]
+        for g, picker in zip(e.ghosts, row):
+            g.rng = picker
+        pickers.append(row)
+
+    mismatches = []
+    for f in range(frames):
+        actions = np.where(rng.random(games) < 0.1, rng.integers(0, 4, games), NO_ACTION)
+        env.step(actions)
+        for i, e in enumerate(engines):
+            for k, picker in enumerate(pickers[i]):
+                picker.u = env.last_uniforms[i, k]
+            e.step(ACTIONS[actions[i]] if actions[i] >= 0 else None)
+            ours, theirs = env.game_state(i), engine_state(e)
+            if ours != theirs:
+                mismatches.append((i, f, ours, theirs))
+        if env.game_over.all():
+            break
+    return mismatches
+
+if __name__ == "__main__":
+    bad = check_consistency()
+    print("consistent" if not bad else f"{len(bad)} mismatching frames, first: {bad[0]}")
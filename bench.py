@@ -0,0 +1,359 @@
+# game/bench.py
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+MIN_TIME = 0.2   # seconds per timed repeat
+REPEATS = 5      # best-of
+ALLOC_OPS = 200  # ops sampled for allocation figures
+
+# --------- cases ---------------------------------------------------------------
+# Each case factory does its setup and returns a zero-argument op to time.
+
+def case_map_construct():
+    from game.map import GameMap
+    return GameMap
+
+def case_neighbors():
+    from game.map import GameMap
+    from game.ghost import neighbors
+    gm = GameMap()
+    tiles = [(x, y) for y in range(gm.rows) for x in range(gm.cols) if not gm.tile_blocked(x, y)]
+    it = iter(())
+    def op():
+        nonlocal it
+        t = next(it, None)
+        if t is None:
+            it = iter(tiles)
+            t = next(it)
+        neighbors(gm, *t)
+    return op
+
+def case_first_step_bfs():
+    from game.map import GameMap
+    from game.ghost import first_step_bfs
+    gm = GameMap()
+    home = gm.home_tile
+    far = (1, 25)  # bottom-left corridor, a long way from the ghost house
+    return lambda: first_step_bfs(gm, far, home)
+
+def _ghost_at_junction():
+    from game.map import GameMap
+    from game.ghost import make_ghosts
+    from settings import TILE_SIZE
+    gm = GameMap()
+    g = make_ghosts(gm.ghost_spawns, gm)[0]
+    g.x, g.y = 6 * TILE_SIZE, 5 * TILE_SIZE  # four-way junction
+    return gm, g
+
+def case_legal_dirs():
+    gm, g = _ghost_at_junction()
+    return lambda: g.legal_dirs(gm)
+
+def case_choose_dir_greedy():
+    gm, g = _ghost_at_junction()
+    forbid = g.dir
+    return lambda: g.choose_dir_greedy(gm, (26, 25), forbid)
+
+def case_ghost_decide_corridor():
+    from game.engine import GameEngine
+    from settings import TILE_SIZE
+    engine = GameEngine(seed=1)
+    g = engine.ghosts[0]
+    g.mode = g._prev_mode = "chase"
+    g.x, g.y = 1 * TILE_SIZE, 3 * TILE_SIZE  # left-hand corridor
+    down = g.legal_dirs(engine.game_map)[0]
+    def op():
+        g.dir = down
+        g._decide(engine.game_map, engine.pacman, (1, 1), 0, False)
+    return op
+
+def case_pacman_update_full_board():
+    from game.map import GameMap
+    from game.pacman import Pacman, DIRS
+    gm = GameMap()
+    pac = Pacman(*gm.pacman_spawn)
+    spawn = gm.pacman_spawn
+    full = gm.pellets_left
+    def op():
+        pac.x, pac.y = spawn
+        pac.dir = pac.want = DIRS["LEFT"]
+        pac.update(gm, 0)
+        if gm.pellets_left != full:
+            gm.reset_pellets()
+    return op
+
+def case_engine_frame():
+    from game.engine import GameEngine
+    engine = GameEngine(seed=1)
+    rng = random.Random(1)
+    actions = ["UP", "DOWN", "LEFT", "RIGHT"]
+    def op():
+        if engine.game_over:
+            engine.reset()
+        engine.step(rng.choice(actions) if engine.frame % 15 == 0 else None)
+    return op
+
+def case_swarm_frame():
+    from game.engine import GameEngine
+    engine = GameEngine(seed=1, ghost_pathing="flow", ghost_count=300)
+    rng = random.Random(1)
+    actions = ["UP", "DOWN", "LEFT", "RIGHT"]
+    def op():
+        if engine.game_over:
+            engine.reset()
+        engine.step(rng.choice(actions) if engine.frame % 15 == 0 else None)
+    return op
+
+def case_env_step():
+    from game.env import PacmanEnv, ACTIONS
+    env = PacmanEnv(seed=1)
+    env.reset()
+    rng = random.Random(1)
+    def op():
+        _, _, terminated, truncated, _ = env.step(rng.randrange(len(ACTIONS)) if env.steps % 15 == 0 else 0)
+        if terminated or truncated:
+            env.reset()
+    return op
+
+def case_env_render():
+    _offscreen()
+    from game.env import PacmanEnv
+    env = PacmanEnv(seed=1, render_mode="rgb_array")
+    env.reset()
+    def op():
+        if env.step(0)[2]:
+            env.reset()
+        env.render()
+    return op
+
+def _offscreen():
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    import pygame
+    from settings import SCREEN_WIDTH, SCREEN_HEIGHT
+    pygame.display.init()
+    pygame.font.init()
+    return pygame, pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+
+def case_draw_offscreen():
+    pygame, screen = _offscreen()
+    from game.engine import GameEngine
+    engine = GameEngine(seed=1)
+    def op():
+        screen.fill((0, 0, 0))
+        engine.game_map.draw(screen)
+        engine.pacman.draw(screen)
+        for g in engine.ghosts:
+            g.draw(screen)
+    return op
+
+def case_draw_sprites():
+    pygame, screen = _offscreen()
+    from game.engine import GameEngine
+    from game.sprites import SpriteAtlas
+    from settings import TILE_SIZE
+    engine = GameEngine(seed=1)
+    atlas = SpriteAtlas()
+    gm = engine.game_map
+    def op():
+        screen.fill((0, 0, 0))
+        for wall in gm.walls:
+            pygame.draw.rect(screen, (0, 0, 255), wall)
+        pellets = atlas.pellets
+        batch = [(pellets[kind], (tx*TILE_SIZE, ty*TILE_SIZE)) for tx, ty, kind in gm.pellet_tiles()]
+        pac = engine.pacman
+        batch.append((atlas.pacman(pac.dir, pac.x, pac.y), (pac.x, pac.y)))
+        batch.extend((atlas.ghost(g), (g.x, g.y)) for g in engine.ghosts)
+        screen.blits(batch, doreturn=False)
+    return op
+
+def case_renderer_frame():
+    pygame, screen = _offscreen()
+    from game.engine import GameEngine
+    from game.render import Renderer
+    font = pygame.font.Font(None, 28)
+    engine = GameEngine(seed=1)
+    renderer = Renderer(screen, font, font, font)
+    def op():
+        if engine.game_over:
+            engine.reset()
+        engine.step()
+        renderer.draw(engine, engine.now())
+    return op
+
+CASES = {
+    "map_construct": case_map_construct,
+    "neighbors": case_neighbors,
+    "first_step_bfs": case_first_step_bfs,
+    "legal_dirs": case_legal_dirs,
+    "choose_dir_greedy": case_choose_dir_greedy,
+    "ghost_decide_corridor": case_ghost_decide_corridor,
+    "pacman_update_full_board": case_pacman_update_full_board,
+    "engine_frame": case_engine_frame,
+    "swarm_frame": case_swarm_frame,
+    "env_step": case_env_step,
+    "env_render": case_env_render,
+    "draw_offscreen": case_draw_offscreen,
+    "draw_sprites": case_draw_sprites,
+    "renderer_frame": case_renderer_frame,
+}
+
+# --------- map-size scaling ---------------------------------------------------
+SCALING_SIZES = (28, 64, 128, 256, 512, 1024)
+SCALING_FRAMES = 600  # engine/camera frames timed per size
+
+def scaling(sizes=SCALING_SIZES, frames=SCALING_FRAMES):
+    """
+    Cost of generated size x size mazes: generation and compile time, memory
+    held by the compiled level plus one GameMap, and per-frame time of the
+    engine (ghosts on shortest-path steering) and the scrolling CameraRenderer.
+    """
+    pygame, screen = _offscreen()
+    from game.mazegen import generate_level
+    from game.level import compile_level
+    from game.map import GameMap
+    from game.engine import GameEngine
+    from game.render import CameraRenderer
+    font = pygame.font.Font(None, 28)
+    rng = random.Random(1)
+    actions = ["UP", "DOWN", "LEFT", "RIGHT"]
+    rows = {}
+    print(f"{'size':>6}{'tiles':>10}{'gen ms':>10}{'compile ms':>12}{'MiB':>8}{'engine us':>11}{'camera us':>11}")
+    for size in sizes:
+        t = time.perf_counter()
+        lines = generate_level(size, size, seed=size)
+        gen = time.perf_counter() - t
+        t = time.perf_counter()
+        compile_level(lines)  # bypasses the caches on purpose
+        compile_time = time.perf_counter() - t
+        tracemalloc.start()  # compiled again for memory: tracing would skew the timing
+        gm = GameMap(compile_level(lines))
+        gm.routes
+        mem = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        engine = GameEngine(seed=1, game_map=gm, ghost_pathing="bfs")
+        t = time.perf_counter()
+        for i in range(frames):
+            if engine.game_over:
+                engine.reset()
+            engine.step(rng.choice(actions) if i % 15 == 0 else None)
+        engine_time = (time.perf_counter() - t) / frames
+
+        renderer = CameraRenderer(screen, font, font, font)
+        renderer.draw(engine, engine.now())
+        t = time.perf_counter()
+        for _ in range(frames):
+            renderer.draw(engine, engine.now())
+        camera_time = (time.perf_counter() - t) / frames
+
+        tiles = len(lines) * len(lines[0])
+        rows[size] = {"tiles": tiles, "generate_s": gen, "compile_s": compile_time, "memory_bytes": mem,
+                      "engine_frame_s": engine_time, "camera_frame_s": camera_time}
+        print(f"{size:>6}{tiles:>10,}{gen*1e3:>10.1f}{compile_time*1e3:>12.1f}{mem/2**20:>8.1f}"
+              f"{engine_time*1e6:>11.1f}{camera_time*1e6:>11.1f}", flush=True)
+    return rows
+
+# --------- measuring -----------------------------------------------------------
+def time_op(op, min_time=MIN_TIME, repeats=REPEATS):
+    """Best-of-`repeats` ops/sec, each repeat running for at least `min_time`."""
+    n = 1
+    while True:
+        t = time.perf_counter()
+        for _ in range(n):
+            op()
+        dt = time.perf_counter() - t
+        if dt >= min_time / 4:
+            break
+        n *= 4
+    n = max(1, int(n * min_time / max(dt, 1e-9)))
+    best = 0.0
+    for _ in range(repeats):
+        t = time.perf_counter()
+        for _ in range(n):
+            op()
+        best = max(best, n / (time.perf_counter() - t))
+    return best
+
+def alloc_op(op, ops=ALLOC_OPS):
+    """
+    Allocation figures per op under tracemalloc: the mean transient high-water
+    mark in bytes, and the number of memory blocks still held afterwards.
+    """
+    op()  # warm caches so lazy setup isn't counted
+    tracemalloc.start()
+    try:
+        peaks = 0
+        start_blocks = sys.getallocatedblocks()
+        for _ in range(ops):
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            op()
+            peaks += tracemalloc.get_traced_memory()[1] - before
+        retained = sys.getallocatedblocks() - start_blocks
+    finally:
+        tracemalloc.stop()
+    return peaks / ops, retained / ops
+
+def run(names, min_time=MIN_TIME):
+    results = {}
+    for name in names:
+        op = CASES[name]()
+        ops = time_op(op, min_time)
+        peak, retained = alloc_op(op)
+        results[name] = {"ops_per_sec": ops, "peak_bytes_per_op": peak, "retained_blocks_per_op": retained}
+        print(f"{name:<26}{ops:>14,.0f} ops/s{peak:>12.0f} B/op{retained:>9.2f} blk/op", flush=True)
+    return results
+
+def compare(results, baseline, threshold):
+    """Return [(case, old, new, change)] for cases slower than the baseline by more than `threshold`."""
+    regressions = []
+    for name, row in results.items():
+        old = baseline.get("results", {}).get(name)
+        if not old:
+            continue
+        change = row["ops_per_sec"] / old["ops_per_sec"] - 1
+        flag = "  REGRESSION" if change < -threshold else ""
+        print(f"{name:<26}{old['ops_per_sec']:>14,.0f} -> {row['ops_per_sec']:>14,.0f}  {change:+7.1%}{flag}")
+        if flag:
+            regressions.append((name, old["ops_per_sec"], row["ops_per_sec"], change))
+    return regressions
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmarks for the simulation and rendering hot paths.")
+    ap.add_argument("cases", nargs="*", default=list(CASES), help="subset of cases (default: all)")
+    ap.add_argument("--save", metavar="JSON", help="store this run as a baseline")
+    ap.add_argument("--compare", metavar="JSON", help="compare against a stored baseline")
+    ap.add_argument("--threshold", type=float, default=0.10, help="slowdown that counts as a regression")
+    ap.add_argument("--min-time", type=float, default=MIN_TIME)
+    ap.add_argument("--scaling", nargs="*", type=int, metavar="SIZE",
+                    help=f"time generated mazes by size instead (default sizes: {' '.join(map(str, SCALING_SIZES))})")
+    args = ap.parse_args(argv)
+    if args.scaling is not None:
+        scaling(args.scaling or SCALING_SIZES)
+        return 0
+    unknown = [c for c in args.cases if c not in CASES]
+    if unknown:
+        ap.error(f"unknown case(s): {', '.join(unknown)}")
+
+    random.seed(0)
+    results = run(args.cases, args.min_time)
+    if args.save:
+        import pygame
+        with open(args.save, "w") as f:
+            json.dump({"python": platform.python_version(), "pygame": pygame.version.ver,
+                       "machine": platform.machine(), "results": results}, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,21 @@
+# game/direction.py
+# Small-integer direction codes shared by the entities, routing and the level
+# compiler. Codes 0-3 follow routing.STEPS (right, left, down, up), so a code
+# is also the bit position in a tile's legal-move mask.
+
+RIGHT, LEFT, DOWN, UP, NONE = range(5)
+
+CODES = {"RIGHT": RIGHT, "LEFT": LEFT, "DOWN": DOWN, "UP": UP, "NONE": NONE}
+NAMES = ("RIGHT", "LEFT", "DOWN", "UP", "NONE")
+
+DX = (1, -1, 0, 0, 0)
+DY = (0, 0, 1, -1, 0)
+REVERSE = (LEFT, RIGHT, UP, DOWN, NONE)
+BIT = (1, 2, 4, 8, 0)
+
+# (dx, dy) -> code, for snapshots and other (dx, dy) data
+CODE_OF_STEP = {(DX[c], DY[c]): c for c in range(5)}
+
+# legal codes for each 4-bit mask, in code order; and the code of a single-bit mask
+MASK_CODES = tuple(tuple(c for c in range(4) if mask >> c & 1) for mask in range(16))
+SINGLE = {BIT[c]: c for c in range(4)}
@@ -0,0 +1,399 @@
+# game/engine.py
+import random
+from collections import namedtuple
+from settings import TILE_SIZE, FPS, GHOST_POINTS, POWER_DURATION, SCATTER_CHASE_CYCLE
+from game.map import GameMap
+from game.pacman import Pacman, DIRS
+from game.ghost import make_ghosts, GHOST_ORDER
+from game.swarm import SwarmFields, SpatialHash, SPATIAL_HASH_MIN
+from game.events import PELLET, POWER, GHOST_EATEN, DEATH, MODE, FRIGHTENED, CALM, GAME_OVER, MODE_CODES
+from game.level import POWER_TILE
+from game.timers import Scheduler
+
+FRAME_MS = 1000 / FPS
+
+# engine timer kinds (arg):
+#   SWITCH_MODE  scatter/chase schedule index   END_FRIGHT   -
+#   LEAVE_HOUSE  ghost index                    RESPAWN      ghost index (parked at home)
+#   SETTLE       ghost index (respawned last frame, takes the current mode)
+SWITCH_MODE, END_FRIGHT, LEAVE_HOUSE, RESPAWN, SETTLE = range(5)
+
+def build_mode_schedule(cycle=SCATTER_CHASE_CYCLE):
+    """Turn the scatter/chase cycle (seconds) into [(start_ms, mode), ...] plus its length in ms."""
+    schedule = []
+    t = 0
+    scatter = True
+    for secs in cycle:
+        schedule.append((t*1000, "scatter" if scatter else "chase"))
+        t += secs
+        scatter = not scatter
+    return schedule, t*1000
+
+EngineState = namedtuple("EngineState", [
+    "frame", "start_time", "frightened_until", "eaten_chain", "ghosts_eaten", "game_over", "won",
+    "rng_state", "pacman", "ghosts", "pellets", "pellets_left", "mode", "frightened", "timers",
+])
+
+class GameEngine:
+    """
+    Display-free game simulation. Owns the map, Pacman and the ghosts and
+    advances them by exactly one frame per step().
+
+    Everything that happens at a set time (scatter/chase switches, the end
+    of frightened mode, ghosts leaving the house and respawning) is a timer
+    in `timers`, a Scheduler in game time: ghost modes are written only
+    when they change, and step() only updates the ghosts that are out of
+    the house and not parked at home (`active`). pause()/resume() hold the
+    timers while a real-time clock runs on.
+
+    clock:        callable returning the current time in ms. When omitted the
+                  engine runs on simulated time (frame count * FRAME_MS), so a
+                  headless run is as fast as the CPU allows.
+    input_source: callable returning a direction name ("UP", "DOWN", "LEFT",
+                  "RIGHT") or None; consulted when step() gets no action.
+    game_map:     map to play on; it is kept and refilled on every reset().
+    ghost_names / ghost_pathing / ghost_count: ghost personalities, steering
+                  and number, see make_ghosts(). ghost_pathing="flow" with a
+                  large ghost_count is swarm mode: chasers share one flow
+                  field toward Pacman (see game.swarm).
+    seed:         seed for the engine's random.Random, re-applied on every
+                  reset(); with simulated time the same seed and inputs always
+                  replay the same game.
+    profiler:     optional FrameProfiler timing the update phases and the
+                  ghost decision paths.
+    events:       optional EventLog receiving gameplay events (pellets,
+                  ghosts eaten, deaths, mode switches, game over); clones
+                  don't log.
+    """
+
+    def __init__(self, clock=None, input_source=None, game_map=None,
+                 ghost_names=GHOST_ORDER, ghost_pathing="greedy", seed=None, profiler=None, ghost_count=None,
+                 events=None):
+        self.clock = clock
+        self.profiler = profiler
+        self.events = events
+        self.seed = seed
+        self.rng = random.Random()
+        self.input_source = input_source
+        self.game_map = game_map
+        self.ghost_names = ghost_names
+        self.ghost_pathing = ghost_pathing
+        self.ghost_count = ghost_count
+        self.flow = None
+        self.schedule, self.cycle_length = build_mode_schedule()
+        self.paused_at = None
+        self.reset()
+
+    def now(self):
+        if self.clock is None:
+            return int(self.frame * FRAME_MS)
+        return self.clock()
+
+    def reset(self):
+        if self.game_map is None:
+            self.game_map = GameMap()
+        else:
+            self.game_map.reset_pellets()
+        self.pacman = Pacman(*self.game_map.pacman_spawn)
+        self.ghosts = make_ghosts(self.game_map.ghost_spawns, self.game_map,
+                                  self.ghost_names, self.ghost_pathing, self.ghost_count)
+        self.rng.seed(self.seed)
+        if self.ghost_pathing == "flow" and (self.flow is None or self.flow.game_map is not self.game_map):
+            self.flow = SwarmFields(self.game_map)
+        for g in self.ghosts:
+            g.rng = self.rng
+            g.profiler = self.profiler
+            g.flow = self.flow
+        # many ghosts: bucket them by tile so collisions only look near Pacman
+        self.spatial = SpatialHash(self.ghosts) if len(self.ghosts) >= SPATIAL_HASH_MIN else None
+        self.last_action = None
+        self.frame = 0
+        self.start_time = self.now()
+        self.frightened_until = 0
+        self.eaten_chain = 0
+        self.ghosts_eaten = 0
+        self.game_over = False
+        self.won = False
+        self.mode = self.schedule[0][1]  # scatter/chase, what non-eaten ghosts are in when not frightened
+        self.frightened = False
+        self.timers = Scheduler()
+        self._arm_switch(0, self.start_time)
+        for i, g in enumerate(self.ghosts):
+            if g.in_house:
+                self.timers.at(self.start_time + g.house_wait, LEAVE_HOUSE, i)
+        self._refresh_active()
+        self._sync_logged_modes()
+        if self.events is not None:
+            self.events.start(self)
+
+    def _sync_logged_modes(self):
+        """Take the current scatter/chase and frightened state as already logged."""
+        self.logged_mode = self.mode
+        self.logged_frightened = self.frightened
+
+    # --------- timers ------------------------------------------------------
+    def _arm_switch(self, index, start):
+        """Set the timer for the schedule entry after `index`, which started at `start` ms."""
+        schedule = self.schedule
+        nxt = index + 1
+        end = schedule[nxt][0] if nxt < len(schedule) else self.cycle_length
+        self.timers.at(start - schedule[index][0] + end, SWITCH_MODE, nxt % len(schedule))
+
+    def _refresh_active(self):
+        """Rebuild `active`: the ghosts out of the house and not parked at home, in roster order."""
+        home = set(self.timers.pending(RESPAWN))
+        home.update(self.timers.pending(SETTLE))
+        self.active = [g for i, g in enumerate(self.ghosts) if not g.in_house and i not in home]
+
+    def _set_ghost_mode(self, mode):
+        for g in self.ghosts:
+            if g.mode != "eaten":
+                g.mode = mode
+
+    def _run_timers(self, now, settled):
+        """Fire the timers due by `now`. `settled` is the mode non-eaten ghosts had last frame."""
+        ghosts, timers = self.ghosts, self.timers
+        respawning = refresh = None
+        for time, kind, arg in timers.due(now):
+            if kind == SWITCH_MODE:
+                self.mode = self.schedule[arg][1]
+                self._arm_switch(arg, time)
+                if not self.frightened:
+                    self._set_ghost_mode(self.mode)
+            elif kind == END_FRIGHT:
+                if time == self.frightened_until:  # not superseded by a later power pellet
+                    self.frightened = False
+                    self._set_ghost_mode(self.mode)
+            elif kind == LEAVE_HOUSE:
+                g = ghosts[arg]
+                g.in_house = False
+                if g.mode != "eaten":
+                    g._prev_mode = settled  # as if it had been updated in the house every frame
+                refresh = True
+            elif kind == RESPAWN:
+                # after this pass, so a switch firing with it doesn't reach the still-eaten ghost
+                respawning = respawning or []
+                respawning.append(arg)
+            else:  # SETTLE
+                ghosts[arg].mode = "frightened" if self.frightened else self.mode
+                refresh = True
+        if respawning is not None:
+            for i in respawning:
+                g = ghosts[i]
+                g._prev_mode = g.mode
+                g.respawn()
+                timers.at(now + 1, SETTLE, i)  # any later time is the next frame
+        if refresh:
+            self._refresh_active()
+
+    def _park(self, ghosts, now):
+        """Take ghosts that parked at home this frame out of `active` until they respawn."""
+        for g in ghosts:
+            i = self.ghosts.index(g)
+            if g.mode == "eaten":
+                self.timers.at(g.eaten_time + g.respawn_delay, RESPAWN, i)
+            else:
+                self.timers.at(now + 1, SETTLE, i)  # respawned on arrival
+        self._refresh_active()
+
+    def pause(self):
+        """
+        Hold the game clock until resume(). Simulated time only advances in
+        step(), so this matters for a real-time `clock`: resume() moves every
+        timer and deadline later by the time spent paused. Pausing a paused
+        game, or resuming a running one, does nothing.
+        """
+        if self.paused_at is None:
+            self.paused_at = self.now()
+
+    def resume(self):
+        if self.paused_at is None:
+            return
+        gap = self.now() - self.paused_at
+        self.paused_at = None
+        if gap > 0:
+            self.timers.shift(gap)
+            self.start_time += gap
+            self.frightened_until += gap
+            self.pacman.invincible_until += gap
+            for g in self.ghosts:
+                if g.eaten_time is not None:
+                    g.eaten_time += gap
+
+    def step(self, action=None):
+        """Advance one frame. `action` is a direction name or None (keep going). Returns game_over."""
+        if action is None and self.input_source is not None:
+            action = self.input_source()
+        self.last_action = action
+        now = self.now()
+        self.frame += 1
+        if self.game_over:
+            return True
+
+        pacman, ghosts, game_map = self.pacman, self.ghosts, self.game_map
+        prof = self.profiler
+        if action is not None:
+            pacman.want = DIRS[action]
+        if prof:
+            prof.begin("pacman")
+        log = self.events
+        eaten_before = len(game_map.eaten)
+        ate_power = pacman.update(game_map, now)
+        if prof:
+            prof.end("pacman")
+            prof.begin("ghosts")
+
+        # ghost modes change only here and in the timers
+        settled = "frightened" if self.frightened else self.mode
+        if ate_power:
+            self.frightened_until = now + POWER_DURATION
+            self.eaten_chain = 0
+            self.frightened = True
+            self.timers.at(self.frightened_until, END_FRIGHT)
+            self._set_ghost_mode("frightened")
+        due = self.timers.next_time()
+        if due is not None and due <= now:
+            self._run_timers(now, settled)
+
+        # update ghosts
+        if self.flow is not None:
+            self.flow.chase.retarget(*pacman.tile())
+        blinky_tile = ghosts[0].tile()
+        if log is not None and (len(game_map.eaten) != eaten_before or self.mode != self.logged_mode
+                                or self.frightened != self.logged_frightened):
+            self._log_frame(log, eaten_before, self.mode, ate_power, self.frightened)
+        parked = None
+        for g in self.active:
+            if g.update(game_map, pacman, blinky_tile, now):
+                parked = parked or []
+                parked.append(g)
+        if parked is not None:
+            self._park(parked, now)
+        if prof:
+            prof.end("ghosts")
+            prof.begin("collisions")
+
+        # collisions
+        px, py = pacman.x, pacman.y
+        if self.spatial is not None:
+            ghosts = [ghosts[i] for i in self.spatial.near(px, py)]
+        for g in ghosts:
+            # both are TILE_SIZE squares: they overlap iff closer than a tile on both axes
+            if abs(px - g.x) < TILE_SIZE and abs(py - g.y) < TILE_SIZE:
+                if g.mode == "frightened":
+                    if log is not None:
+                        log.emit(self.frame, GHOST_EATEN, min(self.eaten_chain, 3), self.ghosts.index(g),
+                                 self._pacman_tile())
+                    pacman.score += GHOST_POINTS[min(self.eaten_chain, 3)]
+                    self.eaten_chain += 1
+                    self.ghosts_eaten += 1
+                    g.mode = "eaten"
+                    g.eaten_time = now
+                elif g.mode != "eaten" and now >= pacman.invincible_until:
+                    pacman.hit_by_ghost(now)
+                    if log is not None:
+                        log.emit(self.frame, DEATH, pacman.lives, self.ghosts.index(g), self._pacman_tile())
+                    if pacman.lives <= 0:
+                        self.game_over = True
+        if prof:
+            prof.end("collisions")
+
+        # win: all pellets eaten
+        if not self.game_over and game_map.pellets_left == 0:
+            self.game_over = True
+            self.won = True
+        if log is not None and self.game_over:
+            log.emit(self.frame, GAME_OVER, int(self.won), 0, pacman.score)
+        return self.game_over
+
+    def _pacman_tile(self):
+        tx, ty = self.pacman.tile()
+        return ty*self.game_map.cols + tx
+
+    def _log_frame(self, log, eaten_before, mode, ate_power, frightened):
+        """Log this frame's pellets and mode changes (collisions log their own events)."""
+        frame, eaten, initial = self.frame, self.game_map.eaten, self.game_map.level.pellets
+        power_tile = 0
+        for i in range(eaten_before, len(eaten)):
+            tile = eaten[i]
+            if initial[tile] == POWER_TILE:
+                power_tile = tile
+                log.emit(frame, POWER, 0, 0, tile)
+            else:
+                log.emit(frame, PELLET, 0, 0, tile)
+        if mode != self.logged_mode:
+            self.logged_mode = mode
+            log.emit(frame, MODE, MODE_CODES[mode])
+        if ate_power:
+            log.emit(frame, FRIGHTENED, 0, 0, power_tile)
+        elif self.logged_frightened and not frightened:
+            log.emit(frame, CALM)
+        self.logged_frightened = frightened
+
+    def run(self, max_frames, policy=None):
+        """Step until game over or `max_frames`; `policy(engine)` supplies actions. Returns frames run."""
+        for n in range(max_frames):
+            if self.step(policy(self) if policy is not None else None):
+                return n + 1
+        return max_frames
+
+    # --------- snapshot / restore ------------------------------------------
+    def snapshot(self):
+        """
+        The mutable part of the game as an immutable EngineState. Map structure
+        (walls, tunnel rows, routes, home tile) and ghost personalities are not
+        included; they never change during a game.
+        """
+        gm = self.game_map
+        return EngineState(self.frame, self.start_time, self.frightened_until, self.eaten_chain,
+                           self.ghosts_eaten, self.game_over, self.won, self.rng.getstate(),
+                           self.pacman.snapshot(), tuple(g.snapshot() for g in self.ghosts),
+                           bytes(gm.pellet_grid), gm.pellets_left, self.mode, self.frightened,
+                           self.timers.state())
+
+    def restore(self, state):
+        """Load a snapshot() (or any tuple in its layout); the ghost roster and map layout must match."""
+        (self.frame, self.start_time, self.frightened_until, self.eaten_chain,
+         self.ghosts_eaten, self.game_over, self.won, rng_state,
+         pac, ghosts, pellets, pellets_left, self.mode, self.frightened, timers) = state
+        self.rng.setstate(rng_state)
+        self.pacman.restore(pac)
+        for g, gs in zip(self.ghosts, ghosts):
+            g.restore(gs)
+        self.timers.load(timers)
+        self._refresh_active()
+        if self.spatial is not None:
+            self.spatial = SpatialHash(self.ghosts)
+        gm = self.game_map
+        gm.pellet_grid[:] = pellets
+        gm.pellets_left = pellets_left
+        # the eaten log no longer describes this board; renderers rebuild on the reset bump
+        gm.eaten.clear()
+        gm.resets += 1
+        self._sync_logged_modes()
+
+    def clone(self):
+        """
+        An independent engine in the same state, sharing all immutable map
+        structure. Clones (search rollouts) neither log events nor profile.
+        """
+        other = object.__new__(GameEngine)
+        other.__dict__.update(self.__dict__)
+        other.game_map = self.game_map.fork()
+        other.events = None
+        other.profiler = None
+        other.rng = random.Random()
+        other.pacman = self.pacman.copy()
+        other.ghosts = [g.copy() for g in self.ghosts]
+        other.timers = self.timers.copy()
+        other._refresh_active()
+        if self.flow is not None:
+            other.flow = SwarmFields(other.game_map, self.flow.chase.radius)
+        for g in other.ghosts:
+            g.rng = other.rng
+            g.flow = other.flow
+            g.profiler = None
+        if self.spatial is not None:
+            other.spatial = SpatialHash(other.ghosts)
+        other.rng.setstate(self.rng.getstate())
+        return other
@@ -0,0 +1,150 @@
+# game/env.py
+import os
+import numpy as np
+from settings import TILE_SIZE
+from game.engine import GameEngine
+from game.map import PELLET_TILE, POWER_TILE
+
+# action index -> direction name passed to GameEngine.step (0: keep going)
+ACTIONS = (None, "UP", "DOWN", "LEFT", "RIGHT")
+
+# observation channels
+CHANNELS = ("walls", "pellets", "power", "pacman", "scatter", "chase", "frightened", "eaten")
+WALLS, PELLETS, POWER, PACMAN = range(4)
+MODE_CHANNEL = {"scatter": 4, "chase": 5, "frightened": 6, "eaten": 7}
+
+MAX_STEPS = 10000  # steps per episode before it is truncated
+
+def _tile(x, y, cols, rows):
+    """Tile under an entity's centre, clamped to the board (entities slide off it in tunnels)."""
+    half = TILE_SIZE // 2
+    return min(max((x + half) // TILE_SIZE, 0), cols - 1), min(max((y + half) // TILE_SIZE, 0), rows - 1)
+
+class PacmanEnv:
+    """
+    reset()/step() environment around a GameEngine, with the Gymnasium API
+    (but no dependency on it) for reinforcement learning.
+
+    Observations are uint8 tile grids shaped (len(CHANNELS), rows, cols): 1
+    where there is a wall, pellet, power pellet, Pacman, or a ghost in each
+    mode. The array is allocated once and updated in place: walls are written
+    at construction, pellets are cleared from the map's eaten log and entity
+    cells are unset where they were and set where they are now. Every step
+    returns the same array, so copy it to keep one.
+
+    render_mode="rgb_array" draws the board offscreen (SDL's dummy video
+    driver when there is no display) into a Surface that wraps a NumPy
+    buffer, and render() returns a (height, width, 3) view of it.
+
+    Rewards are score gained; an episode terminates when the game is over
+    and is truncated after max_steps steps. Each step runs frame_skip
+    engine frames with the same action. Other keyword arguments go to
+    GameEngine (ghost_pathing, ghost_count, ...).
+    """
+
+    def __init__(self, game_map=None, seed=None, render_mode=None, frame_skip=1, max_steps=MAX_STEPS,
+                 **engine_kwargs):
+        if render_mode not in (None, "rgb_array"):
+            raise ValueError(f"unsupported render_mode {render_mode!r}")
+        self.engine = GameEngine(game_map=game_map, seed=seed, **engine_kwargs)
+        self.render_mode = render_mode
+        self.frame_skip = frame_skip
+        self.max_steps = max_steps
+        gm = self.engine.game_map
+        self.rows, self.cols = gm.rows, gm.cols
+        self.obs = np.zeros((len(CHANNELS), self.rows, self.cols), dtype=np.uint8)
+        self.obs[WALLS] = np.array(gm.wall_grid, dtype=bool)
+        self._flat = self.obs.reshape(len(CHANNELS), -1)  # per-channel views indexed by tile number
+        self._cells = memoryview(self.obs.reshape(-1))      # the same bytes, for cheap single-cell writes
+        self._plane = self.rows * self.cols
+        self._marks = []  # obs offsets of the entity cells set last sync
+        self._map_resets = None
+        self._erased = 0
+        self.steps = 0
+        self.pixels = self.frame = self.layer = None
+        if render_mode == "rgb_array":
+            self._init_render()
+
+    def _init_render(self):
+        import pygame
+        from game.render import MazeLayer
+        from game.sprites import SpriteAtlas
+        if not pygame.display.get_init():
+            os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+            pygame.display.init()
+        if pygame.display.get_surface() is None:
+            pygame.display.set_mode((1, 1))  # sprites and layers convert to the display format
+        w, h = self.cols*TILE_SIZE, self.rows*TILE_SIZE
+        # A surfarray view locks its surface and blits onto a locked surface
+        # fail, so the frame is built on the buffer instead: pygame draws
+        # straight into self.pixels and render() hands out views of it.
+        self.pixels = np.zeros((h, w, 4), dtype=np.uint8)
+        self.frame = pygame.image.frombuffer(self.pixels, (w, h), "RGBX")
+        self.atlas = SpriteAtlas()
+        self.layer = MazeLayer(self.atlas, like=self.frame)
+
+    def reset(self, seed=None, options=None):
+        """Start a new episode (reseeding the engine when `seed` is given); returns (obs, info)."""
+        if seed is not None:
+            self.engine.seed = seed
+        self.engine.reset()
+        self.steps = 0
+        self._sync()
+        return self.obs, self._info()
+
+    def step(self, action):
+        """Apply ACTIONS[action]; returns (obs, reward, terminated, truncated, info)."""
+        engine = self.engine
+        name = ACTIONS[action]
+        score = engine.pacman.score
+        for _ in range(self.frame_skip):
+            if engine.step(name):
+                break
+        self.steps += 1
+        self._sync()
+        terminated = engine.game_over
+        truncated = not terminated and self.steps >= self.max_steps
+        return self.obs, engine.pacman.score - score, terminated, truncated, self._info()
+
+    def _info(self):
+        engine = self.engine
+        return dict(score=engine.pacman.score, lives=engine.pacman.lives, frame=engine.frame, won=engine.won)
+
+    def _sync(self):
+        """Bring the observation up to date with the engine."""
+        gm, flat = self.engine.game_map, self._flat
+        if gm.resets != self._map_resets:
+            grid = np.frombuffer(bytes(gm.pellet_grid), dtype=np.uint8)
+            flat[PELLETS] = grid == PELLET_TILE
+            flat[POWER] = grid == POWER_TILE
+            self._map_resets = gm.resets
+            self._erased = len(gm.eaten)
+        elif len(gm.eaten) > self._erased:
+            cells, pellets, power = self._cells, PELLETS*self._plane, POWER*self._plane
+            for i in gm.eaten[self._erased:]:
+                cells[pellets + i] = cells[power + i] = 0
+            self._erased = len(gm.eaten)
+
+        cells, plane, cols, rows = self._cells, self._plane, self.cols, self.rows
+        for i in self._marks:
+            cells[i] = 0
+        engine = self.engine
+        x, y = _tile(engine.pacman.x, engine.pacman.y, cols, rows)
+        marks = [PACMAN*plane + y*cols + x]
+        for g in engine.ghosts:
+            x, y = _tile(g.x, g.y, cols, rows)
+            marks.append(MODE_CHANNEL[g.mode]*plane + y*cols + x)
+        for i in marks:
+            cells[i] = 1
+        self._marks = marks
+
+    def render(self):
+        """The current frame as a (height, width, 3) uint8 view (rgb_array mode; None otherwise)."""
+        if self.frame is None:
+            return None
+        from game.render import draw_board
+        draw_board(self.frame, self.layer, self.atlas, self.engine)
+        return self.pixels[:, :, :3]
+
+    def close(self):
+        self.pixels = self.frame = self.layer = None
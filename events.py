@@ -0,0 +1,209 @@
+# game/events.py
+import argparse
+import struct
+import sys
+import time
+from array import array
+from collections import namedtuple
+from settings import GHOST_POINTS
+
+# File layout (little endian): header "PMEV", version u16, then records
+#   (frame u32, kind u8, detail u8, ghost u16, value u32)
+# and after every START record the level it starts on: (sha1 20 bytes, cols u16, rows u16).
+# Logs are append-only; each GameEngine.reset() starts a new game with a START.
+MAGIC = b"PMEV"
+VERSION = 1
+HEADER = struct.Struct("<4sH")
+RECORD = struct.Struct("<IBBHI")
+LEVEL = struct.Struct("<20sHH")
+
+FLUSH_BYTES = 1 << 16   # buffered bytes that trigger a write
+FLUSH_SECONDS = 2.0     # and the longest a record waits in the buffer (checked as records arrive)
+READ_CHUNK = 1 << 16    # bytes read at a time by read_events()
+
+# event kinds; what detail / ghost / value hold for each:
+#   START        -, ghost count, seed          PELLET, POWER  -, -, tile
+#   GHOST_EATEN  chain index into GHOST_POINTS, ghost, tile
+#   DEATH        lives left, ghost, tile       MODE           0 scatter / 1 chase, -, -
+#   FRIGHTENED   -, -, tile (power pellet)     CALM           - (frightened time ran out)
+#   GAME_OVER    1 if won, -, final score
+KINDS = ("START", "PELLET", "POWER", "GHOST_EATEN", "DEATH", "MODE", "FRIGHTENED", "CALM", "GAME_OVER")
+START, PELLET, POWER, GHOST_EATEN, DEATH, MODE, FRIGHTENED, CALM, GAME_OVER = range(len(KINDS))
+MODE_CODES = {"scatter": 0, "chase": 1}
+
+Event = namedtuple("Event", ["frame", "kind", "detail", "ghost", "value", "level"])
+
+class EventLog:
+    """
+    Buffered, append-only writer of gameplay events (pass one to GameEngine
+    as `events`). Records are packed into a bytearray and written out in
+    FLUSH_BYTES batches, or after FLUSH_SECONDS, so logging costs a
+    struct.pack per event and no I/O on most frames. `out` is a path
+    (opened for appending) or a binary file.
+    """
+
+    def __init__(self, out, flush_bytes=FLUSH_BYTES, flush_seconds=FLUSH_SECONDS):
+        self.owned = isinstance(out, (str, bytes)) or hasattr(out, "__fspath__")
+        self.file = open(out, "ab") if self.owned else out
+        self.flush_bytes = flush_bytes
+        self.flush_seconds = flush_seconds
+        self.buf = bytearray()
+        if self.file.tell() == 0:
+            self.buf += HEADER.pack(MAGIC, VERSION)
+        self.flushed_at = time.monotonic()
+        self.records = 0
+
+    def emit(self, frame, kind, detail=0, ghost=0, value=0):
+        self.buf += RECORD.pack(frame, kind, detail, ghost, value)
+        self.records += 1
+        if len(self.buf) >= self.flush_bytes or time.monotonic() - self.flushed_at >= self.flush_seconds:
+            self.flush()
+
+    def start(self, engine):
+        """Record the start of a game (called by GameEngine.reset())."""
+        gm = engine.game_map
+        seed = engine.seed if engine.seed is not None else 0
+        self.buf += RECORD.pack(engine.frame, START, 0, len(engine.ghosts), seed & 0xFFFFFFFF)
+        self.buf += LEVEL.pack(gm.content_hash, gm.cols, gm.rows)
+        self.records += 1
+
+    def flush(self):
+        if self.buf:
+            self.file.write(self.buf)
+            self.file.flush()
+            del self.buf[:]
+        self.flushed_at = time.monotonic()
+
+    def close(self):
+        self.flush()
+        if self.owned:
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def read_events(path, chunk=READ_CHUNK):
+    """
+    Stream the Events of a log, reading `chunk` bytes at a time, so memory
+    stays flat however long the log is. Each Event carries the
+    (sha1, cols, rows) of the level its game is played on.
+    """
+    with open(path, "rb") as f:
+        head = f.read(HEADER.size)
+        if len(head) < HEADER.size:
+            return
+        magic, version = HEADER.unpack(head)
+        if magic != MAGIC:
+            raise ValueError("not an event log")
+        if version != VERSION:
+            raise ValueError(f"unsupported event log version {version}")
+        buf, pos, level = b"", 0, None
+        size, level_size = RECORD.size, LEVEL.size
+        while True:
+            more = f.read(chunk)
+            if not more:
+                break
+            buf = buf[pos:] + more
+            pos, end = 0, len(buf)
+            while pos + size <= end:
+                frame, kind, detail, ghost, value = RECORD.unpack_from(buf, pos)
+                if kind == START:
+                    if pos + size + level_size > end:
+                        break  # level info continues in the next chunk
+                    level = LEVEL.unpack_from(buf, pos + size)
+                    pos += level_size
+                pos += size
+                yield Event(frame, kind, detail, ghost, value, level)
+
+class LevelStats:
+    """Totals and per-tile heatmaps for the games played on one level."""
+
+    def __init__(self, digest, cols, rows):
+        self.digest, self.cols, self.rows = digest, cols, rows
+        self.games = self.wins = self.frames = self.score = 0
+        self.counts = [0] * len(KINDS)
+        self.chains = [0] * len(GHOST_POINTS)  # ghosts eaten per chain index
+        # heatmaps: one counter per tile
+        self.pellets = array("I", bytes(4 * cols * rows))
+        self.deaths = array("I", bytes(4 * cols * rows))
+        self.ghosts_eaten = array("I", bytes(4 * cols * rows))
+
+    def add(self, ev):
+        kind = ev.kind
+        self.counts[kind] += 1
+        if kind == PELLET or kind == POWER:
+            self.pellets[ev.value] += 1
+        elif kind == DEATH:
+            self.deaths[ev.value] += 1
+        elif kind == GHOST_EATEN:
+            self.ghosts_eaten[ev.value] += 1
+            self.chains[ev.detail] += 1
+        elif kind == START:
+            self.games += 1
+        elif kind == GAME_OVER:
+            self.wins += ev.detail
+            self.frames += ev.frame
+            self.score += ev.value
+
+    def summary(self):
+        finished = self.counts[GAME_OVER]
+        return dict(level=self.digest.hex()[:12], size=f"{self.cols}x{self.rows}", games=self.games,
+                    finished=finished, win_rate=self.wins / finished if finished else 0.0,
+                    mean_score=self.score / finished if finished else 0.0,
+                    mean_frames=self.frames / finished if finished else 0.0,
+                    deaths_per_game=self.counts[DEATH] / self.games if self.games else 0.0,
+                    pellets=self.counts[PELLET], powers=self.counts[POWER],
+                    ghosts_eaten=self.counts[GHOST_EATEN], chains=list(self.chains))
+
+def level_stats(events):
+    """Fold an Event stream into {level sha1: LevelStats}."""
+    levels = {}
+    stats = None
+    for ev in events:
+        if ev.level is None:
+            continue  # records before any START (a log started mid-game)
+        if stats is None or stats.digest != ev.level[0]:
+            stats = levels.get(ev.level[0])
+            if stats is None:
+                stats = levels[ev.level[0]] = LevelStats(*ev.level)
+        stats.add(ev)
+    return levels
+
+SHADES = " .:-=+*#%@"
+
+def heatmap_text(counts, cols, rows):
+    """A heatmap as text, one character per tile, darker where the count is higher."""
+    top = max(counts) or 1
+    lines = []
+    for y in range(rows):
+        row = counts[y*cols:(y+1)*cols]
+        lines.append("".join(SHADES[(c * (len(SHADES) - 1) + top - 1) // top] for c in row))
+    return "\n".join(lines)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Per-level statistics and heatmaps from gameplay event logs.")
+    ap.add_argument("logs", nargs="+", help="event log files (main.py --events)")
+    ap.add_argument("--heatmap", choices=("deaths", "pellets", "ghosts_eaten"), help="also print this heatmap")
+    args = ap.parse_args(argv)
+
+    def stream():
+        for path in args.logs:
+            yield from read_events(path)
+
+    for stats in level_stats(stream()).values():
+        s = stats.summary()
+        print(f"level {s['level']} ({s['size']}): {s['games']} games, {s['finished']} finished, "
+              f"win rate {s['win_rate']:.1%}")
+        print(f"  mean score {s['mean_score']:.0f}, mean length {s['mean_frames']:.0f} frames, "
+              f"{s['deaths_per_game']:.2f} deaths/game")
+        print(f"  pellets {s['pellets']}, power pellets {s['powers']}, ghosts eaten {s['ghosts_eaten']} "
+              f"(by chain {s['chains']})")
+        if args.heatmap:
+            print(heatmap_text(getattr(stats, args.heatmap), stats.cols, stats.rows))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
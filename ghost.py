@@ -1,17 +1,13 @@
 # game/ghost.py
 import random
 from collections import deque
-import pygame
 from settings import TILE_SIZE, GHOST_SPEED, FRIGHTENED_SPEED, RED, PINK, CYAN, ORANGE
+from game.direction import RIGHT, NONE, DX, DY, REVERSE, BIT, CODE_OF_STEP, MASK_CODES, SINGLE
 
-VEC = pygame.math.Vector2
-DIRS = [VEC(1, 0), VEC(-1, 0), VEC(0, 1), VEC(0, -1)]
+# profiler phase names per mode, so the hot path doesn't build strings
+PROFILE_PHASES = {m: "ghost." + m for m in ("scatter", "chase", "frightened", "eaten")}
 
-def aligned_to_grid(rect):
-    return rect.left % TILE_SIZE == 0 and rect.top % TILE_SIZE == 0
-
-def tile_of(rect):
-    return rect.left // TILE_SIZE, rect.top // TILE_SIZE
+HOUSE_WAIT_MS = 1000  # how long ghosts other than Blinky stay in the house at the start
 
 def manhattan(a, b):
     return abs(a[0] - b[0]) + abs(a[1] - b[1])
@@ -36,7 +32,7 @@ def neighbors(game_map, tx, ty):
     return nb
 
 def first_step_bfs(game_map, start, goal):
-    """Return the first step (dx,dy) from start toward goal using BFS; None if no path."""
+    """Direction code of the first step from start toward goal using BFS; None if no path."""
     if start == goal:
         return None
     q = deque([start])
@@ -57,13 +53,24 @@ def first_step_bfs(game_map, start, goal):
         step = came_from[step]
         if step is None:
             return None
-    dx = step[0] - start[0]
-    dy = step[1] - start[1]
-    return VEC(dx, dy)
+    dx, dy = step[0] - start[0], step[1] - start[1]
+    if dx > 1 or dx < -1:
+        dx = -1 if dx > 0 else 1  # wrapped through a tunnel
+    return CODE_OF_STEP[(dx, dy)]
 
 class Ghost:
-    def __init__(self, x, y, name="blinky", color=RED, home_tile=None):
-        self.rect = pygame.Rect(x, y, TILE_SIZE, TILE_SIZE)
+    """
+    One ghost. Position is integer pixels (x, y) of the top-left corner,
+    direction a code from game.direction; the per-frame path allocates
+    nothing but the odd tuple.
+    """
+
+    __slots__ = ("x", "y", "color", "name", "mode", "_prev_mode", "speed", "dir", "scatter_target",
+                 "home_tile", "house_wait", "in_house", "rng", "profiler", "pathing",
+                 "eaten_time", "respawn_delay", "flow", "spatial")
+
+    def __init__(self, x, y, name="blinky", color=RED, home_tile=None, scatter_target=(0, 0)):
+        self.x, self.y = x, y
         self.color = color
         self.name = name
 
@@ -72,162 +79,237 @@ class Ghost:
         self._prev_mode = self.mode
 
         self.speed = GHOST_SPEED
-        self.dir = VEC(1, 0)  # start moving right
+        self.dir = RIGHT  # start moving right
 
-        # Scatter corners (approx)
-        self.scatter_target = {
-            "blinky": (27, 0),
-            "pinky": (0, 0),
-            "inky": (27, 26),
-            "clyde": (0, 26),
-        }[name]
+        # Scatter corner (tile); make_ghosts() picks it from the board size
+        self.scatter_target = scatter_target
 
         # Home tile (reachable outside door); provided by factory
-        self.home_tile = home_tile if home_tile is not None else tile_of(self.rect)
+        self.home_tile = home_tile if home_tile is not None else self.tile()
 
-        # Non-Blinky ghosts wait briefly before leaving at game start
-        self.leave_counter = 60 if name != "blinky" else 0
+        # Non-Blinky ghosts wait briefly before leaving at game start (the
+        # engine lets them out house_wait ms after the game starts)
+        self.house_wait = HOUSE_WAIT_MS if name != "blinky" else 0
         self.in_house = (name != "blinky")
 
+        # Source of randomness for frightened wandering (anything with .choice)
+        self.rng = random
+        # Optional FrameProfiler timing the decision paths (set by GameEngine)
+        self.profiler = None
+        # Scatter/chase steering: "greedy" (Manhattan), "bfs" (shortest path via GameMap.routes)
+        # or "flow" (the engine's shared swarm.SwarmFields, set as `flow`)
+        self.pathing = "greedy"
+        self.flow = None
+        # swarm.SpatialHash this ghost files itself in, when the engine keeps one
+        self.spatial = None
+
         # Eaten/respawn bookkeeping
         self.eaten_time = None          # ms timestamp when eaten
         self.respawn_delay = 2000       # ms to wait at home before respawn
 
+    @property
+    def rect(self):
+        """A fresh Rect at the ghost's position (for drawing and collision tests; move via x/y)."""
+        import pygame
+        return pygame.Rect(self.x, self.y, TILE_SIZE, TILE_SIZE)
+
+    def tile(self):
+        return self.x // TILE_SIZE, self.y // TILE_SIZE
+
+    def legal_mask(self, game_map):
+        """4-bit legal-move mask of the current tile (same wrap rule as movement), precomputed per map."""
+        return game_map.legal_mask(self.x // TILE_SIZE, self.y // TILE_SIZE)
+
     def legal_dirs(self, game_map):
-        tx, ty = tile_of(self.rect)
-        opts = []
-        for d in DIRS:
-            nx, ny = tx + int(d.x), ty + int(d.y)
-            # respect the same wrap rule as movement
-            if ny < 0 or ny >= game_map.rows:
-                continue
-            if nx < 0 or nx >= game_map.cols:
-                if ty in game_map.tunnel_rows:
-                    nx %= game_map.cols
-                else:
-                    continue
-            if not game_map.tile_blocked(nx, ny):
-                opts.append(d)
-        return opts
+        """Open direction codes from the current tile, in code order."""
+        return MASK_CODES[self.legal_mask(game_map)]
+
+    def corridor_dir(self, game_map, forbid_dir):
+        """
+        The only way on when the current tile offers a single non-reverse
+        exit (a corridor, bends included), else None. Every steering rule
+        would pick that exit, so there is nothing to decide.
+        """
+        if forbid_dir == NONE:
+            return None
+        return SINGLE.get(self.legal_mask(game_map) & ~BIT[REVERSE[forbid_dir]])
 
     def choose_dir_greedy(self, game_map, target, forbid_dir):
-        """Greedy Manhattan step toward target. Optionally forbid immediate reverse."""
-        tx, ty = tile_of(self.rect)
+        """Greedy Manhattan step toward target. Optionally forbid immediate reverse (NONE: no restriction)."""
+        tx, ty = self.x // TILE_SIZE, self.y // TILE_SIZE
+        gx, gy = target
+        back = REVERSE[forbid_dir]
         best = None
         bestdist = 1e9
-        for d in self.legal_dirs(game_map):
-            if forbid_dir and d.x == -forbid_dir.x and d.y == -forbid_dir.y:
+        for d in MASK_CODES[self.legal_mask(game_map)]:
+            if d == back:
                 continue
-            nx, ny = tx + int(d.x), ty + int(d.y)
-            dist = manhattan((nx, ny), target)
+            dist = abs(tx + DX[d] - gx) + abs(ty + DY[d] - gy)
             if dist < bestdist:
                 bestdist = dist
                 best = d
         if best is None:
             # dead end -> reverse if possible
-            best = VEC(-forbid_dir.x, -forbid_dir.y) if forbid_dir else VEC(0, 0)
+            best = back
         return best
 
+    def choose_dir_routed(self, game_map, target, forbid_dir):
+        """Shortest-path step toward target; greedy when the target is unreachable or the step would reverse."""
+        step = game_map.routes.first_code(self.x // TILE_SIZE, self.y // TILE_SIZE, *target)
+        if step is None or (forbid_dir != NONE and step == REVERSE[forbid_dir]):
+            return self.choose_dir_greedy(game_map, target, forbid_dir)
+        return step
+
     def frightened_step(self, game_map):
-        choices = self.legal_dirs(game_map)
-        if self.dir != VEC(0, 0) and len(choices) > 1:
+        mask = self.legal_mask(game_map)
+        if self.dir != NONE and mask & (mask - 1):
             # avoid reversing unless forced
-            choices = [d for d in choices if not (d.x == -self.dir.x and d.y == -self.dir.y)] or choices
-        return random.choice(choices) if choices else VEC(0,0)
+            mask &= ~BIT[REVERSE[self.dir]]
+        choices = MASK_CODES[mask]
+        # still draw in corridors, so the random stream stays in step with earlier versions
+        return self.rng.choice(choices) if choices else NONE
 
     def target_tile(self, pac_tile, pac_dir, blinky_tile):
         if self.name == "blinky":
             return pac_tile
         if self.name == "pinky":
-            return (pac_tile[0] + int(pac_dir.x) * 4,
-                    pac_tile[1] + int(pac_dir.y) * 4)
+            return (pac_tile[0] + DX[pac_dir] * 4,
+                    pac_tile[1] + DY[pac_dir] * 4)
         if self.name == "inky":
-            ahead = (pac_tile[0] + int(pac_dir.x) * 2,
-                     pac_tile[1] + int(pac_dir.y) * 2)
+            ahead = (pac_tile[0] + DX[pac_dir] * 2,
+                     pac_tile[1] + DY[pac_dir] * 2)
             vx, vy = ahead[0] - blinky_tile[0], ahead[1] - blinky_tile[1]
             return (ahead[0] + vx, ahead[1] + vy)
         if self.name == "clyde":
-            if manhattan(pac_tile, tile_of(self.rect)) >= 8:
+            if manhattan(pac_tile, self.tile()) >= 8:
                 return pac_tile
             return self.scatter_target
         return pac_tile
 
-    def update(self, game_map, pacman, blinky_tile, frightened=False):
-        now = pygame.time.get_ticks()
-        just_switched = (self.mode != self._prev_mode)
-        self._prev_mode = self.mode
-
-        if aligned_to_grid(self.rect):
-            # 1) initial house wait
-            if self.in_house:
-                self.leave_counter -= 1
-                if self.leave_counter > 0:
-                    return  # hold position in house
-                self.in_house = False  # leave next decision
-
-            pac_tile = tile_of(pacman.rect)
-            pac_dir = pacman.dir
-
-            if self.mode == "frightened":
-                self.speed = FRIGHTENED_SPEED
-                # allow reverse on switch-in to frightened
-                self.dir = self.frightened_step(game_map) if not just_switched \
-                           else self.choose_dir_greedy(game_map, tile_of(self.rect), None)
-
-            elif self.mode == "eaten":
-                self.speed = GHOST_SPEED + 1
-                start_tile = tile_of(self.rect)
-
-                # Use BFS for eaten -> home path (reliable even in tricky mazes)
-                step = first_step_bfs(game_map, start_tile, self.home_tile)
-                if step is None:
-                    # fallback to greedy; allow reverse on mode switch
-                    self.dir = self.choose_dir_greedy(
-                        game_map, self.home_tile, None if just_switched else self.dir
-                    )
-                else:
-                    self.dir = step
+    def _decide(self, game_map, pacman, blinky_tile, now, just_switched):
+        """Pick a new direction on a grid-aligned frame. Returns True while parked at home."""
+        if self.mode == "frightened":
+            self.speed = FRIGHTENED_SPEED
+            # allow reverse on switch-in to frightened
+            self.dir = self.frightened_step(game_map) if not just_switched \
+                       else self.choose_dir_greedy(game_map, self.tile(), NONE)
 
-                # Snap and wait when close to home
-                hx, hy = self.home_tile[0] * TILE_SIZE, self.home_tile[1] * TILE_SIZE
-                if abs(self.rect.left - hx) < 4 and abs(self.rect.top - hy) < 4:
-                    self.rect.topleft = (hx, hy)
-                    self.dir = VEC(0, 0)
-                    if self.eaten_time is None:
-                        self.eaten_time = now
-                    if now - self.eaten_time >= self.respawn_delay:
-                        self.mode = "scatter"
-                        self.eaten_time = None
-                    return  # stay parked until respawn
+        elif self.mode == "eaten":
+            self.speed = GHOST_SPEED + 1
 
+            # Precomputed shortest-path next hop toward home (same answer as first_step_bfs)
+            if self.flow is not None:
+                step = self.flow.home.step(self.x // TILE_SIZE, self.y // TILE_SIZE)
             else:
-                # scatter / chase
-                self.speed = GHOST_SPEED
-                target = self.scatter_target if self.mode == "scatter" \
-                         else self.target_tile(pac_tile, pac_dir, blinky_tile)
-                # permit reverse on scatter<->chase switch
+                step = game_map.routes.first_code(self.x // TILE_SIZE, self.y // TILE_SIZE, *self.home_tile)
+            if step is None:
+                # fallback to greedy; allow reverse on mode switch
                 self.dir = self.choose_dir_greedy(
-                    game_map, target, None if just_switched else self.dir
+                    game_map, self.home_tile, NONE if just_switched else self.dir
                 )
+            else:
+                self.dir = step
+
+            # Snap and wait when close to home
+            hx, hy = self.home_tile[0] * TILE_SIZE, self.home_tile[1] * TILE_SIZE
+            if abs(self.x - hx) < 4 and abs(self.y - hy) < 4:
+                self.x, self.y = hx, hy
+                self.dir = NONE
+                if self.eaten_time is None:
+                    self.eaten_time = now
+                if now - self.eaten_time >= self.respawn_delay:
+                    self.respawn()
+                return True  # stay parked until respawn
+
+        else:
+            # scatter / chase
+            self.speed = GHOST_SPEED
+            if not just_switched:
+                way = self.corridor_dir(game_map, self.dir)
+                if way is not None:
+                    self.dir = way
+                    return False
+            if self.flow is not None and self.mode == "chase":
+                # swarm: every chaser reads the same field toward Pacman
+                step = self.flow.chase.step(self.x // TILE_SIZE, self.y // TILE_SIZE,
+                                            NONE if just_switched else self.dir)
+                if step is not None:
+                    self.dir = step
+                    return False
+            target = self.scatter_target if self.mode == "scatter" \
+                     else self.target_tile(pacman.tile(), pacman.dir, blinky_tile)
+            # permit reverse on scatter<->chase switch
+            choose = self.choose_dir_routed if self.pathing == "bfs" else self.choose_dir_greedy
+            self.dir = choose(game_map, target, NONE if just_switched else self.dir)
+        return False
+
+    def respawn(self):
+        """Back in play once the respawn delay is over; the engine gives it the current mode."""
+        self.mode = "scatter"
+        self.eaten_time = None
+
+    def update(self, game_map, pacman, blinky_tile, now_ms):
+        """
+        Advance one frame. Returns True when the ghost is parked at home
+        (eaten and waiting to respawn, or respawned this frame); the engine
+        stops updating a parked ghost until its respawn timer fires.
+        """
+        now = now_ms
+        just_switched = (self.mode != self._prev_mode)
+        self._prev_mode = self.mode
+
+        if self.x % TILE_SIZE == 0 and self.y % TILE_SIZE == 0:
+            # 1) initial house wait (the engine's timer clears in_house)
+            if self.in_house:
+                return False
+
+            prof = self.profiler
+            if prof:
+                phase = PROFILE_PHASES[self.mode]
+                prof.begin(phase)
+            parked = self._decide(game_map, pacman, blinky_tile, now, just_switched)
+            if prof:
+                prof.end(phase)
+            if self.spatial is not None:
+                self.spatial.move(self)
+            if parked:
+                return True
 
         # move (wrapping only on tunnel rows)
-        self.rect.left += int(self.dir.x) * self.speed
-        self.rect.top  += int(self.dir.y) * self.speed
+        self.x += DX[self.dir] * self.speed
+        self.y += DY[self.dir] * self.speed
 
         cols = game_map.cols
-        if self.rect.top // TILE_SIZE in game_map.tunnel_rows:
-            if self.rect.left < 0:
-                self.rect.left = (cols - 1) * TILE_SIZE
-            elif self.rect.left >= cols * TILE_SIZE:
-                self.rect.left = 0
-
-    def draw(self, screen):
+        if self.y // TILE_SIZE in game_map.tunnel_rows and not 0 <= self.x < cols * TILE_SIZE:
+            self.x = (cols - 1) * TILE_SIZE if self.x < 0 else 0
+            if self.spatial is not None:
+                self.spatial.move(self)
+        return False
+
+    def snapshot(self):
+        return (self.x, self.y, DX[self.dir], DY[self.dir], self.mode,
+                self._prev_mode, self.speed, self.in_house, self.eaten_time)
+
+    def restore(self, state):
+        (self.x, self.y, dx, dy, self.mode, self._prev_mode, self.speed,
+         self.in_house, self.eaten_time) = state
+        self.dir = CODE_OF_STEP[dx, dy]
+
+    def copy(self):
+        other = Ghost.__new__(Ghost)
+        for name in Ghost.__slots__:
+            setattr(other, name, getattr(self, name))
+        return other
+
+    def draw(self, screen, pos=None):
+        import pygame
         color = self.color
         if self.mode == "frightened":
             color = (0, 0, 255)
         elif self.mode == "eaten":
             color = (255, 255, 255)  # white while eyes would be nicer; easy to add later
-        pygame.draw.rect(screen, color, self.rect)
+        x, y = pos if pos is not None else (self.x, self.y)
+        pygame.draw.rect(screen, color, (x, y, TILE_SIZE, TILE_SIZE))
 
 # --------- factory ----------------------------------------------------------
 def _compute_home_outside(spawns, game_map):
@@ -258,18 +340,40 @@ def _compute_home_outside(spawns, game_map):
     ry = max(0, top_y - 1)
     return (cx, ry)
 
-def make_ghosts(spawns):
+GHOST_COLORS = {"blinky": RED, "pinky": PINK, "inky": CYAN, "clyde": ORANGE}
+GHOST_ORDER = ("blinky", "pinky", "inky", "clyde")
+SWARM_RELEASE_MS = 67  # time between house releases for ghosts beyond one per spawn
+
+def make_ghosts(spawns, game_map=None, names=GHOST_ORDER, pathing="greedy", count=None):
     """
     spawns: list of (x_px, y_px) positions for 'G' tiles from the map.
     We compute a reachable 'home-outside' tile and give it to each ghost.
+    names picks the personality for each spawn; pathing is "greedy", "bfs" or "flow".
+    count asks for that many ghosts (swarm mode): spawns and names are reused
+    in turn and the extra ghosts leave the house one by one.
     """
-    # We need a GameMap instance to compute home; import lazily to avoid circular import
-    from game.map import GameMap
-    gmap = GameMap()
-    home_outside = _compute_home_outside(spawns, gmap)
-
-    names_colors = [("blinky", RED), ("pinky", PINK), ("inky", CYAN), ("clyde", ORANGE)]
+    if game_map is None:
+        # We need a GameMap instance to compute home; import lazily to avoid circular import
+        from game.map import GameMap
+        game_map = GameMap()
+    if game_map.home_tile is not None and list(spawns) == game_map.ghost_spawns:
+        home_outside = game_map.home_tile  # precomputed with the compiled level
+    else:
+        home_outside = _compute_home_outside(spawns, game_map)
+
+    # scatter corners follow the board size (the classic maze gives the classic corners)
+    right, bottom = game_map.cols - 1, game_map.rows - 1
+    corners = {"blinky": (right, 0), "pinky": (0, 0), "inky": (right, bottom), "clyde": (0, bottom)}
+
+    if count is None:
+        count = min(len(spawns), len(names))
     ghosts = []
-    for (x, y), (nm, col) in zip(spawns, names_colors):
-        ghosts.append(Ghost(x, y, nm, col, home_outside))
+    for i in range(count):
+        (x, y), nm = spawns[i % len(spawns)], names[i % len(names)]
+        g = Ghost(x, y, nm, GHOST_COLORS[nm], home_outside, corners[nm])
+        g.pathing = pathing
+        if i >= len(spawns):
+            g.in_house = True
+            g.house_wait = HOUSE_WAIT_MS + (i - len(spawns) + 1) * SWARM_RELEASE_MS
+        ghosts.append(g)
     return ghosts
@@ -0,0 +1,48 @@
+# game/junctions.py
+from array import array
+from game.routing import STEPS
+from game.direction import REVERSE
+
+# direction codes index STEPS (R, L, D, U); the legal-move mask of a tile has bit 1 << code set
+BIT_COUNT = tuple(bin(m).count("1") for m in range(16))
+
+class JunctionGraph:
+    """
+    Compressed maze graph built from a GameMap's per-tile adjacency masks.
+
+    Nodes are the walkable tiles where a walker has a real choice or must
+    turn back: junctions (three or four exits) and dead ends. Every other
+    walkable tile lies on a corridor with exactly two exits, bends included.
+    Each node keeps one edge per exit: (direction code, node reached,
+    corridor length in tiles, whether the corridor wraps through a tunnel).
+    """
+
+    def __init__(self, game_map):
+        self.cols, self.rows = cols, rows = game_map.cols, game_map.rows
+        self.mask = mask = game_map.adjacency
+        n = cols * rows
+        self.node_of = array("i", [-1]) * n
+        self.nodes = []
+        for i in range(n):
+            if not game_map.wall_bytes[i] and BIT_COUNT[mask[i]] != 2:
+                self.node_of[i] = len(self.nodes)
+                self.nodes.append((i % cols, i // cols))
+        self.edges = [[self._walk(tx, ty, code) for code in range(4) if mask[ty*cols + tx] >> code & 1]
+                      for tx, ty in self.nodes]
+
+    def _walk(self, tx, ty, code):
+        """Follow the corridor leaving node tile (tx, ty) by `code`; returns the edge tuple."""
+        cols, mask, node_of = self.cols, self.mask, self.node_of
+        first, wraps, length = code, False, 0
+        while True:
+            dx, dy = STEPS[code]
+            tx, ty = tx + dx, ty + dy
+            if tx < 0 or tx >= cols:
+                tx %= cols
+                wraps = True
+            i = ty*cols + tx
+            length += 1
+            if node_of[i] >= 0:
+                return first, node_of[i], length, wraps
+            # two exits: carry on through the one we did not come in by
+            code = (mask[i] & ~(1 << REVERSE[code])).bit_length() - 1
@@ -0,0 +1,235 @@
+# game/level.py
+import hashlib
+import marshal
+import os
+import sys
+import tempfile
+from array import array
+from settings import TILE_SIZE
+
+LEVEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "levels")
+DEFAULT_LEVEL = os.path.join(LEVEL_DIR, "classic.txt")
+CACHE_DIR = os.environ.get("PACMAN_CACHE_DIR") or os.path.join(os.path.expanduser("~"), ".cache", "pacman-game")
+FORMAT_VERSION = 2  # layout of the marshalled CompiledLevel; the compiler's code is keyed separately
+# modules whose code decides what compile_level() produces; their source is part of the disk cache key
+COMPILER_MODULES = ("level", "map", "ghost", "routing", "pathfind", "direction")
+ROUTE_TABLE_MAX_TILES = 2048  # bigger levels route with pathfind.PathFinder instead of an all-pairs table
+
+WALL = "#"
+PELLET = "."
+POWER = "o"
+PACMAN_SPAWN = "P"
+GHOST_SPAWN = "G"
+EMPTY = " "
+
+# pellet layout values
+NO_PELLET = 0
+PELLET_TILE = 1
+POWER_TILE = 2
+
+# adjacency bit per direction, same order as routing.STEPS / game.direction codes
+STEP_BITS = (((1, 0), 1), ((-1, 0), 2), ((0, 1), 4), ((0, -1), 8))
+
+def level_hash(lines):
+    """SHA-1 of a level's layout, used to tie replays and compiled caches to the exact maze."""
+    return hashlib.sha1("\n".join(lines).encode()).digest()
+
+class CompiledLevel:
+    """
+    Immutable, pre-digested structure of one maze, shared by every GameMap
+    built from it: flat wall and pellet grids, derived tunnel rows, spawns,
+    ghost home tile, a 4-bit adjacency mask per tile and either the
+    all-pairs routing table (small levels) or a distance field toward the
+    home tile (large ones).
+    """
+
+    FIELDS = ("content_hash", "rows", "cols", "walls", "pellets", "pellet_count", "tunnel_rows",
+              "pacman_spawn", "ghost_spawns", "home_tile", "adjacency", "route_arrays", "home_field")
+
+    def __init__(self, **fields):
+        for name in self.FIELDS:
+            setattr(self, name, fields.get(name))
+        self.tunnel_rows = frozenset(self.tunnel_rows or ())
+        # derived in-process views, built on demand
+        self._wall_grid = None
+        self._wall_rects = None
+        self._routes = None
+        self._junctions = None
+        self._home_flow = None
+
+    @property
+    def wall_grid(self):
+        """Walls as rows of bools (the GameMap.wall_grid layout); shared, do not mutate."""
+        if self._wall_grid is None:
+            cols = self.cols
+            self._wall_grid = [[bool(b) for b in self.walls[r*cols:(r+1)*cols]] for r in range(self.rows)]
+        return self._wall_grid
+
+    def wall_rects(self):
+        """Wall tiles as pygame Rects, built on first use (only drawing needs them)."""
+        if self._wall_rects is None:
+            import pygame
+            cols = self.cols
+            self._wall_rects = [pygame.Rect((i % cols)*TILE_SIZE, (i // cols)*TILE_SIZE, TILE_SIZE, TILE_SIZE)
+                                for i, w in enumerate(self.walls) if w]
+        return self._wall_rects
+
+    def to_bytes(self):
+        values = [getattr(self, name) for name in self.FIELDS]
+        values[self.FIELDS.index("tunnel_rows")] = tuple(sorted(self.tunnel_rows))
+        return marshal.dumps((FORMAT_VERSION,) + tuple(values))
+
+    @classmethod
+    def from_bytes(cls, data):
+        values = marshal.loads(data)
+        if values[0] != FORMAT_VERSION:
+            raise ValueError("compiled level has an old format")
+        return cls(**dict(zip(cls.FIELDS, values[1:])))
+
+def parse_level(text):
+    """Level text -> list of equal-width rows (trailing blank lines dropped, short rows padded)."""
+    lines = [ln.rstrip("\r") for ln in text.split("\n")]
+    while lines and not lines[-1].strip():
+        lines.pop()
+    width = max(len(ln) for ln in lines)
+    return [ln.ljust(width, WALL) for ln in lines]
+
+# byte translation tables: level character -> wall flag / pellet kind, wall flag -> open flag
+_WALLS = bytes(1 if chr(c) == WALL else 0 for c in range(256))
+_OPEN = bytes([1, 0]) + bytes(254)
+_PELLETS = bytes(PELLET_TILE if chr(c) == PELLET else POWER_TILE if chr(c) == POWER else NO_PELLET
+                 for c in range(256))
+
+def compile_level(lines):
+    """Digest a level's rows into a CompiledLevel (including routes and home tile)."""
+    rows, cols = len(lines), len(lines[0])
+    text = "".join(lines).encode()
+    walls = text.translate(_WALLS)
+    pellets = text.translate(_PELLETS)
+    p = text.find(PACMAN_SPAWN.encode())
+    pacman_spawn = ((p % cols)*TILE_SIZE, (p // cols)*TILE_SIZE) if p >= 0 else None
+    ghost_spawns = []
+    g = text.find(GHOST_SPAWN.encode())
+    while g >= 0:
+        ghost_spawns.append(((g % cols)*TILE_SIZE, (g // cols)*TILE_SIZE))
+        g = text.find(GHOST_SPAWN.encode(), g + 1)
+
+    # a row wraps around when both of its edge tiles are open
+    tunnel_rows = tuple(r for r in range(rows) if not walls[r*cols] and not walls[r*cols + cols-1])
+    tunnels = set(tunnel_rows)
+
+    # legal-move mask per tile, one row at a time: bit per STEP_BITS direction whose neighbour is open
+    adjacency = bytearray()
+    closed = bytes(cols)
+    opened = [walls[r*cols:(r+1)*cols].translate(_OPEN) for r in range(rows)]
+    for r in range(rows):
+        row = opened[r]
+        wrap = r in tunnels
+        right = row[1:] + (row[:1] if wrap else b"\0")
+        left = (row[-1:] if wrap else b"\0") + row[:-1]
+        down = opened[r+1] if r + 1 < rows else closed
+        up = opened[r-1] if r > 0 else closed
+        adjacency += bytes(a | b << 1 | c << 2 | d << 3 for a, b, c, d in zip(right, left, down, up))
+
+    level = CompiledLevel(content_hash=level_hash(lines), rows=rows, cols=cols, walls=walls,
+                          pellets=pellets, pellet_count=len(pellets) - pellets.count(NO_PELLET),
+                          tunnel_rows=tunnel_rows, pacman_spawn=pacman_spawn,
+                          ghost_spawns=tuple(ghost_spawns), adjacency=bytes(adjacency))
+
+    # home tile and routes are derived through a GameMap view of the level
+    from game.map import GameMap
+    from game.ghost import _compute_home_outside
+    gm = GameMap(level)
+    level.home_tile = _compute_home_outside(level.ghost_spawns, gm)
+    if rows*cols - walls.count(1) <= ROUTE_TABLE_MAX_TILES:
+        from game.routing import RoutingTable
+        routes = RoutingTable(gm)
+        level.route_arrays = (routes.index.tobytes(), bytes(routes.next_hop), routes.dist.tobytes())
+        level._routes = routes
+    else:
+        from game.pathfind import distance_field
+        level.home_field = distance_field(level, *level.home_tile).tobytes()
+    return level
+
+_compiled = {}  # content hash -> CompiledLevel, for this process
+_compiler_digest = None
+
+def compiler_hash():
+    """
+    SHA-1 over the source of the compiler modules (and settings), so a change
+    to how levels are compiled gets a new disk cache key without anyone
+    bumping FORMAT_VERSION.
+    """
+    global _compiler_digest
+    if _compiler_digest is None:
+        here = os.path.dirname(os.path.abspath(__file__))
+        paths = [os.path.join(here, name + ".py") for name in COMPILER_MODULES]
+        paths.append(sys.modules["settings"].__file__)
+        h = hashlib.sha1()
+        for path in paths:
+            try:
+                with open(path, "rb") as f:
+                    h.update(f.read())
+            except OSError:
+                h.update(path.encode())  # no source to read (a frozen install): key on the name only
+        _compiler_digest = h.digest()
+    return _compiler_digest
+
+def _cache_path(digest):
+    return os.path.join(CACHE_DIR, f"{digest.hex()}-v{FORMAT_VERSION}-{compiler_hash().hex()[:12]}.pml")
+
+def load_level(path=None):
+    """
+    Load a level text file as a CompiledLevel. Compiled levels are cached in
+    memory and on disk (CACHE_DIR), keyed by the layout's content hash and
+    the compiler's (compiler_hash()), so only the first load of a given maze
+    with a given compiler ever parses it.
+    """
+    with open(path or DEFAULT_LEVEL) as f:
+        return level_from_lines(parse_level(f.read()))
+
+def level_from_lines(lines):
+    """CompiledLevel for level rows (e.g. from mazegen), through the same memory and disk caches."""
+    digest = level_hash(lines)
+    level = _compiled.get(digest)
+    if level is not None:
+        return level
+
+    cache = _cache_path(digest)
+    try:
+        with open(cache, "rb") as f:
+            level = CompiledLevel.from_bytes(f.read())
+    except (OSError, ValueError, EOFError, TypeError):
+        level = None
+    if level is None or level.content_hash != digest:
+        level = compile_level(lines)
+        _write_cache(cache, level.to_bytes())
+    _compiled[digest] = level
+    return level
+
+def _write_cache(path, data):
+    """Best-effort atomic write; an unwritable cache dir just means compiling next time."""
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except OSError:
+        pass
+
+def routes_for(level):
+    """
+    The level's router, built on first use in this process: its RoutingTable
+    rebuilt from the cached arrays, or a PathFinder for levels too big for one.
+    """
+    if level._routes is None:
+        if level.route_arrays is not None:
+            from game.routing import RoutingTable
+            index, next_hop, dist = level.route_arrays
+            level._routes = RoutingTable.from_arrays(level.cols, level.rows,
+                                                     array("i", index), bytearray(next_hop), array("H", dist))
+        else:
+            from game.pathfind import PathFinder
+            level._routes = PathFinder(level)
+    return level._routes
@@ -0,0 +1,134 @@
+# game/loadgen.py
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from game.server import (HELLO, INPUT, STATS, WELCOME, STATE, HELLO_MSG, INPUT_MSG, STATS_MSG, GAME_OVER,
+                         StateMirror, pack, read_message)
+from game.replay import CODE_OF, RESET
+
+INPUT_EVERY = 15  # frames between a bot's random turns
+
+class Bot:
+    """One client: plays a session with random turns and mirrors its state from the deltas."""
+
+    def __init__(self, seed, ghosts=0):
+        self.seed = seed
+        self.ghosts = ghosts
+        self.rng = random.Random(seed)
+        self.mirror = None
+        self.messages = self.bytes = self.gaps = 0
+
+    async def run(self, host, port, stop):
+        reader, writer = await asyncio.open_connection(host, port)
+        writer.write(pack(HELLO_MSG.pack(HELLO, self.seed, self.ghosts)))
+        turns = [CODE_OF[a] for a in ("UP", "DOWN", "LEFT", "RIGHT")]
+        try:
+            while not stop.is_set():
+                msg = await read_message(reader)
+                if msg[0] == WELCOME:
+                    self.mirror = StateMirror(msg)
+                    continue
+                if msg[0] != STATE:
+                    continue
+                self.messages += 1
+                self.bytes += len(msg) + 4
+                if not self.mirror.apply(msg):
+                    self.gaps += 1
+                if self.mirror.flags & GAME_OVER:
+                    writer.write(pack(INPUT_MSG.pack(INPUT, CODE_OF[RESET])))
+                elif self.mirror.frame % INPUT_EVERY == 0:
+                    writer.write(pack(INPUT_MSG.pack(INPUT, self.rng.choice(turns))))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+async def server_stats(host, port):
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(pack(bytes([STATS])))
+    msg = await read_message(reader)
+    writer.close()
+    _, sessions, subscribers, overruns, busy, tick_us = STATS_MSG.unpack(msg)
+    return dict(sessions=sessions, subscribers=subscribers, overruns=overruns, busy=busy, tick_us=tick_us)
+
+async def load(host, port, sessions, seconds, ghosts=0, connect_rate=500):
+    stop = asyncio.Event()
+    bots = [Bot(i + 1, ghosts) for i in range(sessions)]
+    tasks = []
+    for bot in bots:
+        tasks.append(asyncio.create_task(bot.run(host, port, stop)))
+        await asyncio.sleep(1 / connect_rate)
+    await asyncio.sleep(2.0)  # let the server's busy figure settle on the full load
+    start = time.perf_counter()
+    before = sum(b.messages for b in bots), sum(b.bytes for b in bots)
+    samples = []
+    while time.perf_counter() - start < seconds:
+        await asyncio.sleep(1.0)
+        samples.append(await server_stats(host, port))
+    elapsed = time.perf_counter() - start
+    messages = sum(b.messages for b in bots) - before[0]
+    sent = sum(b.bytes for b in bots) - before[1]
+    stop.set()
+    for t in tasks:
+        t.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    busy = sum(s["busy"] for s in samples) / len(samples)
+    tick_us = sum(s["tick_us"] for s in samples) / len(samples)
+    return dict(sessions=samples[-1]["sessions"], busy=busy, tick_us=tick_us, overruns=samples[-1]["overruns"],
+                updates_per_session=messages / elapsed / max(sessions, 1), bytes_per_update=sent / max(messages, 1),
+                gaps=sum(b.gaps for b in bots))
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def spawn_server(port, tick_rate):
+    """Start `python -m game.server` on localhost and wait until it listens."""
+    env = dict(os.environ, PYGAME_HIDE_SUPPORT_PROMPT="1")
+    proc = subprocess.Popen([sys.executable, "-m", "game.server", "--port", str(port), "--tick-rate", str(tick_rate),
+                             "--quiet"], stdout=subprocess.PIPE, text=True, env=env)
+    for line in proc.stdout:
+        if line.startswith("listening"):
+            return proc
+    proc.wait()
+    raise RuntimeError(f"server failed to start (exit status {proc.returncode})")
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Drive a game server on localhost with many bot sessions.")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=7777)
+    ap.add_argument("--spawn", action="store_true", help="start a server on a free local port for the run")
+    ap.add_argument("--tick-rate", type=int, default=60, help="tick rate of a --spawn server")
+    ap.add_argument("--sessions", type=int, nargs="+", default=[100], help="session counts to try in turn")
+    ap.add_argument("--seconds", type=float, default=5.0, help="measurement time per session count")
+    ap.add_argument("--ghosts", type=int, default=0, help="ghosts per session (swarm mode when above 4)")
+    args = ap.parse_args(argv)
+
+    proc = None
+    if args.spawn:
+        args.host, args.port = "127.0.0.1", free_port()
+        proc = spawn_server(args.port, args.tick_rate)
+    try:
+        print(f"{'sessions':>9}{'busy':>8}{'us/tick':>9}{'per core':>10}{'updates/s':>11}{'B/update':>10}"
+              f"{'gaps':>6}{'overruns':>10}")
+        for n in args.sessions:
+            r = asyncio.run(load(args.host, args.port, n, args.seconds, args.ghosts))
+            per_core = r["sessions"] / r["busy"] if r["busy"] else float("inf")
+            print(f"{r['sessions']:>9}{r['busy']:>8.1%}{r['tick_us']:>9.1f}{per_core:>10.0f}"
+                  f"{r['updates_per_session']:>11.1f}{r['bytes_per_update']:>10.1f}{r['gaps']:>6}{r['overruns']:>10}",
+                  flush=True)
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,131 +1,228 @@
+import argparse
+import random
+import sys
+import time
+LAUNCH = time.perf_counter()  # startup is timed from here, before the heavy imports
 import pygame
-from settings import (SCREEN_WIDTH, SCREEN_HEIGHT, HUD_HEIGHT, FPS, WHITE, HUD_BG,
-                      GHOST_POINTS, POWER_DURATION)
-from game.map import GameMap
-from game.pacman import Pacman
-from game.ghost import make_ghosts
-
-def reset_world():
-    gmap = GameMap()
-    pac = Pacman(*gmap.pacman_spawn)
-    ghosts = make_ghosts(gmap.ghost_spawns)
-    return gmap, pac, ghosts
-
-def main():
-    pygame.init()
+from settings import (SCREEN_WIDTH, SCREEN_HEIGHT, HUD_HEIGHT, COLS, ROWS, FPS, RENDER_FPS, MAX_CATCHUP_TICKS,
+                      STARTUP_BUDGET_MS, AUTOPILOT_BUDGET_MS, PIPELINE_DEPTH)
+from game.pacman import keyboard_action
+from game.engine import GameEngine, FRAME_MS
+from game.render import Renderer, CameraRenderer, LazyFont, entity_positions
+# everything behind a command-line flag (mazes, replays, events, autopilot,
+# pipeline, profiler) is imported in main() only when that flag is given
+
+SEEK_FRAMES = 5 * FPS  # Left/Right arrow seek step while watching a replay
+
+def maze_size(text):
+    """argparse type for --maze: "WxH" in tiles."""
+    try:
+        w, h = (int(v) for v in text.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected WIDTHxHEIGHT, got {text!r}")
+    return w, h
+
+class StartupTimer:
+    """Milliseconds spent in each startup phase, from LAUNCH to the first drawn frame."""
+
+    def __init__(self, start=LAUNCH):
+        self.last = start
+        self.phases = []
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.phases.append((phase, (now - self.last) * 1000))
+        self.last = now
+
+    @property
+    def total(self):
+        return sum(ms for _, ms in self.phases)
+
+    def report(self, out=sys.stdout):
+        for phase, ms in self.phases:
+            print(f"{phase:<12}{ms:8.1f} ms", file=out)
+        print(f"{'total':<12}{self.total:8.1f} ms (budget {STARTUP_BUDGET_MS} ms)", file=out)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Pac-Man")
+    ap.add_argument("--seed", type=int, default=None, help="seed for a reproducible game")
+    ap.add_argument("--record", metavar="PATH", help="save a replay of this session on exit")
+    ap.add_argument("--replay", metavar="PATH", help="watch a recorded replay (Left/Right to seek)")
+    ap.add_argument("--trace", metavar="PATH", help="record per-phase trace events and write them here on exit")
+    ap.add_argument("--maze", metavar="WxH", type=maze_size, help="play on a generated maze of about this many tiles")
+    ap.add_argument("--maze-seed", type=int, default=0, help="seed for --maze (pass the same two to watch its replays)")
+    ap.add_argument("--swarm", metavar="N", type=int, help="swarm mode: N ghosts sharing one flow field toward Pacman")
+    ap.add_argument("--autopilot", metavar="MS", type=float, nargs="?", const=AUTOPILOT_BUDGET_MS,
+                    help=f"let the search autopilot play, thinking MS per frame (default {AUTOPILOT_BUDGET_MS})")
+    ap.add_argument("--events", metavar="PATH", help="append gameplay events to this log (see python -m game.events)")
+    ap.add_argument("--pipeline", metavar="DEPTH", type=int, nargs="?", const=PIPELINE_DEPTH,
+                    help=f"simulate on a second thread, up to DEPTH ticks ahead of drawing (default {PIPELINE_DEPTH})")
+    ap.add_argument("--startup", action="store_true", help="print startup time per phase and quit after the first frame")
+    args = ap.parse_args(argv)
+    if args.pipeline and args.replay:
+        ap.error("--pipeline plays live games only, not --replay")
+    ghosts = dict(ghost_count=args.swarm, ghost_pathing="flow") if args.swarm else {}
+    startup = StartupTimer()
+    startup.mark("imports")
+
+    # only the display: fonts open on first use, and nothing here needs audio or joysticks
+    pygame.display.init()
     screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
     pygame.display.set_caption("Pac-Man")
     clock = pygame.time.Clock()
-    font = pygame.font.SysFont(None, 28)
-    bigfont = pygame.font.SysFont(None, 64)   # Bigger for GAME OVER
-    midfont = pygame.font.SysFont(None, 36)   # Medium for Restart text
-
-    game_map, pacman, ghosts = reset_world()
-
-    # mode timers
-    schedule = []
-    t = 0
-    scatter = True
-    for i, secs in enumerate([7,20,7,20,5,20,5]):
-        schedule.append((t*1000, "scatter" if scatter else "chase"))
-        t += secs
-        scatter = not scatter
-    cycle_length = t*1000
-
-    start_time = pygame.time.get_ticks()
-    frightened_until = 0
-    eaten_chain = 0
-    game_over = False
+    font = LazyFont(28)
+    bigfont = LazyFont(64)    # Bigger for GAME OVER
+    midfont = LazyFont(36)    # Medium for Restart text
+    smallfont = LazyFont(16)  # Profiler overlay (F3)
+    startup.mark("display")
+
+    # the profiler starts with --trace, or on the first F3 press (see enable_profiler below)
+    profiler = overlay = None
+    if args.trace:
+        from game.profiler import FrameProfiler
+        profiler = FrameProfiler(tracing=True)
+
+    game_map = None
+    if args.maze:
+        from game.map import GameMap
+        from game.level import level_from_lines
+        from game.mazegen import generate_level
+        game_map = GameMap(level_from_lines(generate_level(*args.maze, seed=args.maze_seed)))
+
+    # Simulated time (one frame per tick) keeps every session reproducible from seed + inputs
+    player = recorder = pilot = None
+    if args.replay:
+        from game.replay import Replay, ReplayPlayer
+        replay = Replay.load(args.replay)
+        player = ReplayPlayer(replay, GameEngine(seed=replay.seed, game_map=game_map, profiler=profiler, **ghosts))
+        engine = player.engine
+    else:
+        seed = args.seed if args.seed is not None else random.randrange(2**31)
+        events = None
+        if args.events:
+            from game.events import EventLog
+            events = EventLog(args.events)
+        # a pipelined engine lives on the simulation thread: keys are read here and passed over,
+        # and the profiler (not thread-safe) times the render side only
+        engine = GameEngine(input_source=None if args.pipeline else keyboard_action, seed=seed, game_map=game_map,
+                            profiler=None if args.pipeline else profiler, events=events, **ghosts)
+        if args.autopilot:
+            from game.autopilot import Autopilot
+            pilot = Autopilot(args.autopilot)
+            engine.input_source = lambda: pilot(engine)
+        if args.record:
+            from game.replay import ReplayRecorder
+            recorder = ReplayRecorder(engine)
+    sim = recorder or engine
+    startup.mark("world")
+
+    # maps bigger than the window scroll with Pacman
+    gm = engine.game_map
+    renderer_type = CameraRenderer if gm.cols > COLS or gm.rows > ROWS else Renderer
+    renderer = renderer_type(screen, font, bigfont, midfont, profiler, overlay)
+    startup.mark("renderer")
+
+    pipe = view = None
+    if args.pipeline:
+        from game.pipeline import Pipeline, SnapshotView
+        pipe = Pipeline(sim, engine, args.pipeline)
+        view = SnapshotView(engine)
+        pipe.start()
+
+    def enable_profiler():
+        """Profile from now on and show the overlay (F3 without --trace)."""
+        nonlocal profiler, overlay
+        from game.profiler import FrameProfiler, ProfilerOverlay
+        if profiler is None:
+            profiler = FrameProfiler()
+            if not pipe:  # a pipelined engine is stepped on another thread
+                engine.profiler = profiler
+                for g in engine.ghosts:
+                    g.profiler = profiler
+            renderer.profiler = profiler
+        overlay = renderer.overlay = ProfilerOverlay(
+            profiler, smallfont, pygame.Rect(SCREEN_WIDTH - 150, SCREEN_HEIGHT - HUD_HEIGHT + 4, 146, HUD_HEIGHT - 8))
+
+    def tick():
+        if player:
+            player.step()
+        elif engine.game_over and pygame.key.get_pressed()[pygame.K_r]:
+            sim.reset()
+        else:
+            sim.step()  # a finished game just keeps its frame count ticking
 
+    # Fixed timestep: the simulation advances in whole FRAME_MS ticks, however
+    # fast or slow frames are drawn; the leftover fraction of a tick is used to
+    # interpolate entity positions between the last two ticks.
     running = True
+    prev = None
+    lag = FRAME_MS  # run one tick before the first frame
+    last = time.perf_counter()
     while running:
-        now = pygame.time.get_ticks()
+        prof = profiler  # F3 may start the profiler mid-frame; it times whole frames from the next one
+        if prof:
+            prof.begin("frame")
+            prof.begin("input")
         for e in pygame.event.get():
             if e.type == pygame.QUIT:
                 running = False
-
-        keys = pygame.key.get_pressed()
-        if game_over:
-            if keys[pygame.K_r]:
-                game_map, pacman, ghosts = reset_world()
-                start_time = pygame.time.get_ticks()
-                frightened_until = 0
-                eaten_chain = 0
-                game_over = False
-            # Still draw frame
+            elif e.type == pygame.KEYDOWN and e.key == pygame.K_F3:
+                if overlay is None:
+                    enable_profiler()
+                overlay.toggle()
+            elif player and e.type == pygame.KEYDOWN and e.key in (pygame.K_LEFT, pygame.K_RIGHT):
+                player.seek(player.position + (SEEK_FRAMES if e.key == pygame.K_RIGHT else -SEEK_FRAMES))
+
+        if prof:
+            prof.end("input")
+
+        if pipe:
+            # the simulation thread keeps its own fixed timestep; this thread only feeds input and draws
+            restart = view.game_over and pygame.key.get_pressed()[pygame.K_r]
+            pipe.input.set(None if pilot else keyboard_action(), restart=restart)
+            pipe.draw(renderer, view)
         else:
-            pacman.handle_input()
-            ate_power = pacman.update(game_map, now)
-
-            # set ghost global mode (scatter/chase) unless frightened/eaten
-            elapsed = (now - start_time) % cycle_length
-            mode = "chase"
-            for ts, m in schedule:
-                if elapsed >= ts:
-                    mode = m
-
-            if ate_power:
-                frightened_until = now + POWER_DURATION
-                eaten_chain = 0
-                for g in ghosts:
-                    if g.mode != "eaten":
-                        g.mode = "frightened"
-
-            # update ghosts
-            blinky_tile = ghosts[0].rect.left // 16, ghosts[0].rect.top // 16
-            for g in ghosts:
-                if now < frightened_until and g.mode != "eaten":
-                    g.mode = "frightened"
-                elif g.mode != "eaten":
-                    g.mode = mode
-                g.update(game_map, pacman, blinky_tile)
-
-            # collisions
-            for g in ghosts:
-                if pacman.rect.colliderect(g.rect):
-                    if g.mode == "frightened":
-                        pacman.score += GHOST_POINTS[min(eaten_chain, 3)]
-                        eaten_chain += 1
-                        g.mode = "eaten"
-                        g.eaten_time = now
-                    elif g.mode != "eaten" and now >= pacman.invincible_until:
-                        pacman.hit_by_ghost(now)
-                        if pacman.lives <= 0:
-                            game_over = True
-
-            # win: all pellets eaten
-            if not game_over and not game_map.pellets and not game_map.power_pellets:
-                game_over = True
-
-        # ----- draw -----
-        screen.fill((0,0,0))
-        # play area
-        game_map.draw(screen)
-        pacman.draw(screen, flashing=(now < pacman.invincible_until))
-        for g in ghosts:
-            g.draw(screen)
-
-        # HUD
-        pygame.draw.rect(screen, HUD_BG, (0, SCREEN_HEIGHT-HUD_HEIGHT, SCREEN_WIDTH, HUD_HEIGHT))
-        score_text = font.render(f"Score: {pacman.score}", True, WHITE)
-        lives_text = font.render(f"Lives: {max(0, pacman.lives)}", True, WHITE)
-        screen.blit(score_text, (16, SCREEN_HEIGHT-HUD_HEIGHT+24))
-        screen.blit(lives_text, (200, SCREEN_HEIGHT-HUD_HEIGHT+24))
-
-        # GAME OVER message
-        if game_over:
-            msg1 = bigfont.render("GAME OVER", True, (255, 60, 60))
-            msg2 = midfont.render("Press R to Restart", True, WHITE)
-
-            msg1_rect = msg1.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT//2 - 40))
-            msg2_rect = msg2.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT//2 + 20))
-
-            screen.blit(msg1, msg1_rect)
-            screen.blit(msg2, msg2_rect)
-
-        pygame.display.flip()
-        clock.tick(FPS)
-
+            t = time.perf_counter()
+            lag += (t - last) * 1000
+            last = t
+            ticks = int(lag // FRAME_MS)
+            if ticks > MAX_CATCHUP_TICKS:
+                # after a long stall catch up a little, then let the game slow down rather than spiral
+                ticks = MAX_CATCHUP_TICKS
+                lag = ticks * FRAME_MS
+            for i in range(ticks):
+                if i == ticks - 1:
+                    prev = entity_positions(engine)
+                tick()
+            lag -= ticks * FRAME_MS
+
+            renderer.draw(engine, engine.now(), prev, lag / FRAME_MS)
+        if startup is not None:
+            startup.mark("first frame")
+            if args.startup:
+                startup.report()
+                running = False
+            elif startup.total > STARTUP_BUDGET_MS:
+                print(f"slow start: {startup.total:.0f} ms to the first frame (budget {STARTUP_BUDGET_MS} ms)",
+                      file=sys.stderr)
+            startup = None
+        if prof:
+            prof.end("frame")
+            prof.end_frame()
+        clock.tick(RENDER_FPS)
+
+    if pipe:
+        pipe.stop()
+        pipe.stats.report("pipelined")
+    if recorder:
+        recorder.save(args.record)
+    if engine.events is not None:
+        engine.events.close()
+    if pilot is not None:
+        print(f"autopilot: {pilot.nodes_per_second():.0f} nodes/s, {pilot.iterations_per_second():.0f} iterations/s, "
+              f"longest call {pilot.longest_call * 1000:.1f} ms")
+    if args.trace:
+        profiler.write_trace(args.trace)
     pygame.quit()
 
 if __name__ == "__main__":
@@ -1,86 +1,148 @@
 # game/map.py
-import pygame
 from settings import TILE_SIZE, BLUE, WHITE
 
-# 28 columns × 27 rows
-LEVEL_MAP = [
-    "############################",
-    "#............##............#",
-    "#.####.#####.##.#####.####.#",
-    "#o####.#####.##.#####.####o#",
-    "#.####.#####.##.#####.####.#",
-    "#..........................#",
-    "#.####.##.########.##.####.#",
-    "#.####.##.########.##.####.#",
-    "#......##....##....##......#",
-    "######.##### ## #####.######",
-    "######.##### ## #####.######",
-    "######.##          ##.######",
-    "######.## ###GGGG####.######",
-    "######.## #      #   .######",
-    "######.## #      #   .######",
-    "######.## ########   .######",
-    "######.## ######## ##.######",
-    "#............##............#",
-    "#.####.#####.##.#####.####.#",
-    "#o..##................##..o#",
-    "###.##.##.########.##.##.###",
-    "###.##.##.########.##.##.###",
-    "#......##....P.....##......#",
-    "#.##########.##.##########.#",
-    "#.##########.##.##########.#",
-    "#..........................#",
-    "############################",
-]
-
-WALL = "#"
-PELLET = "."
-POWER = "o"
-PACMAN_SPAWN = "P"
-GHOST_SPAWN = "G"
-EMPTY = " "
+from game.level import (load_level, routes_for, CompiledLevel, NO_PELLET, PELLET_TILE, POWER_TILE,
+                        WALL, PELLET, POWER, PACMAN_SPAWN, GHOST_SPAWN, EMPTY)
+
+# (offset inside the tile, size) of each pellet kind's hit box
+PELLET_BOX = {PELLET_TILE: (6, 4), POWER_TILE: (4, 8)}
+PELLET_RADIUS = {PELLET_TILE: 2, POWER_TILE: 6}
 
 class GameMap:
-    def __init__(self):
-        self.rows = len(LEVEL_MAP)
-        self.cols = len(LEVEL_MAP[0])
-        self.walls = []
-        self.wall_grid = [[False]*self.cols for _ in range(self.rows)]
-        self.pellets = []
-        self.power_pellets = []
-        self.pacman_spawn = None
-        self.ghost_spawns = []
-
-        for r, row in enumerate(LEVEL_MAP):
-            for c, ch in enumerate(row):
-                x, y = c*TILE_SIZE, r*TILE_SIZE
-                if ch == WALL:
-                    rect = pygame.Rect(x, y, TILE_SIZE, TILE_SIZE)
-                    self.walls.append(rect)
-                    self.wall_grid[r][c] = True
-                elif ch == PELLET:
-                    self.pellets.append(pygame.Rect(x+6, y+6, 4, 4))
-                elif ch == POWER:
-                    self.power_pellets.append(pygame.Rect(x+4, y+4, 8, 8))
-                elif ch == PACMAN_SPAWN:
-                    self.pacman_spawn = (x, y)
-                elif ch == GHOST_SPAWN:
-                    self.ghost_spawns.append((x, y))
-
-        # tunnel columns (wrap)
-        self.tunnel_rows = {9, 17, 22}  # a few rows with long horizontal corridors
+    """
+    One playable board: the shared CompiledLevel structure (walls, tunnel
+    rows, spawns, home tile, routes) plus this game's own pellet state.
+    `level` is a CompiledLevel, a level file path, or None for the default.
+    """
+
+    def __init__(self, level=None):
+        if not isinstance(level, CompiledLevel):
+            level = load_level(level)
+        self.level = level
+        self.content_hash = level.content_hash
+        self.rows = level.rows
+        self.cols = level.cols
+        self.wall_bytes = level.walls  # one byte per tile, 1 = wall
+        self.tunnel_rows = level.tunnel_rows
+        self.adjacency = level.adjacency  # 4-bit legal-move mask per tile
+        self.pacman_spawn = level.pacman_spawn
+        self.ghost_spawns = list(level.ghost_spawns)
+        self.home_tile = level.home_tile
+
+        # pellet index: one byte per tile (NO_PELLET / PELLET_TILE / POWER_TILE)
+        self.pellet_grid = bytearray(level.pellets)
+        self.pellets_left = level.pellet_count
+        self.eaten = []  # tile indices in the order they were eaten (lets renderers erase incrementally)
+        self._initial_pellets = level.pellets
+        self._initial_pellets_left = level.pellet_count
+        self.resets = 0  # bumped by reset_pellets() so renderers notice a refilled board
+        self._routes = None
+
+    @property
+    def walls(self):
+        return self.level.wall_rects()
+
+    @property
+    def wall_grid(self):
+        """Walls as rows of bools, built on first use (the flat wall_bytes is what the game reads)."""
+        return self.level.wall_grid
+
+    @property
+    def routes(self):
+        """
+        Router for this map, shared by its level: the all-pairs RoutingTable
+        on small levels, a PathFinder (A* plus cached distance fields) on big ones.
+        """
+        if self._routes is None:
+            self._routes = routes_for(self.level)
+        return self._routes
+
+    @property
+    def junctions(self):
+        """JunctionGraph of this map's corridors and decision points (shared by its level)."""
+        if self.level._junctions is None:
+            from game.junctions import JunctionGraph
+            self.level._junctions = JunctionGraph(self)
+        return self.level._junctions
+
+    def legal_mask(self, tx, ty):
+        """4-bit mask of the directions (routing.STEPS order) open from tile (tx, ty)."""
+        if 0 <= tx < self.cols and 0 <= ty < self.rows:
+            return self.adjacency[ty*self.cols + tx]
+        # off the board (an entity pushed past the edge): apply the same rule directly
+        mask = 0
+        for bit, (dx, dy) in ((1, (1, 0)), (2, (-1, 0)), (4, (0, 1)), (8, (0, -1))):
+            nx, ny = tx + dx, ty + dy
+            if ny < 0 or ny >= self.rows:
+                continue
+            if (nx < 0 or nx >= self.cols) and ty not in self.tunnel_rows:
+                continue
+            if not self.tile_blocked(nx, ny):
+                mask |= bit
+        return mask
 
     def tile_blocked(self, tx, ty):
         if ty < 0 or ty >= self.rows:
             return True
         # horizontal wrap allowed on tunnel rows
-        tx %= self.cols
-        return self.wall_grid[ty][tx]
+        return self.wall_bytes[ty*self.cols + tx % self.cols]
+
+    def fork(self):
+        """
+        A GameMap sharing this one's immutable structure (walls, tunnel rows,
+        spawns, routes) but with its own pellet state.
+        """
+        other = object.__new__(GameMap)
+        other.__dict__.update(self.__dict__)
+        other.pellet_grid = bytearray(self.pellet_grid)
+        other.eaten = []
+        other.resets = 0
+        return other
+
+    def reset_pellets(self):
+        """Put every pellet back, so one map can be reused across games."""
+        self.pellet_grid[:] = self._initial_pellets
+        self.pellets_left = self._initial_pellets_left
+        self.eaten.clear()
+        self.resets += 1
+
+    def pellet_tiles(self):
+        """Yield (tx, ty, kind) for every pellet still on the board."""
+        cols = self.cols
+        for i, kind in enumerate(self.pellet_grid):
+            if kind:
+                yield i % cols, i // cols, kind
+
+    def eat_pellets(self, x, y, size=TILE_SIZE):
+        """
+        Remove the pellets whose hit box overlaps the size x size square at
+        pixel (x, y), looking only at the tiles it covers. Returns
+        (pellets_eaten, power_pellets_eaten).
+        """
+        left, top, right, bottom = x, y, x + size, y + size
+        grid, cols = self.pellet_grid, self.cols
+        pellets = powers = 0
+        for ty in range(max(top // TILE_SIZE, 0), min((bottom-1) // TILE_SIZE, self.rows-1) + 1):
+            for tx in range(max(left // TILE_SIZE, 0), min((right-1) // TILE_SIZE, cols-1) + 1):
+                kind = grid[ty*cols + tx]
+                if not kind:
+                    continue
+                off, psize = PELLET_BOX[kind]
+                px, py = tx*TILE_SIZE + off, ty*TILE_SIZE + off
+                if left < px+psize and right > px and top < py+psize and bottom > py:
+                    grid[ty*cols + tx] = NO_PELLET
+                    self.pellets_left -= 1
+                    self.eaten.append(ty*cols + tx)
+                    if kind == POWER_TILE:
+                        powers += 1
+                    else:
+                        pellets += 1
+        return pellets, powers
 
     def draw(self, screen):
+        import pygame
         for wall in self.walls:
             pygame.draw.rect(screen, BLUE, wall)
-        for p in self.pellets:
-            pygame.draw.circle(screen, WHITE, p.center, 2)
-        for p in self.power_pellets:
-            pygame.draw.circle(screen, WHITE, p.center, 6)
+        half = TILE_SIZE // 2
+        for tx, ty, kind in self.pellet_tiles():
+            pygame.draw.circle(screen, WHITE, (tx*TILE_SIZE + half, ty*TILE_SIZE + half), PELLET_RADIUS[kind])
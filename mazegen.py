@@ -0,0 +1,140 @@
+# game/mazegen.py
+import random
+from collections import deque
+from game.level import WALL, PELLET, POWER, PACMAN_SPAWN, GHOST_SPAWN, EMPTY
+
+MIN_SIZE = 21        # smallest board that fits the ghost house with a corridor around it
+LOOP_CHANCE = 0.12   # extra walls knocked through per cell, on top of braiding
+TUNNEL_EVERY = 40    # rows per side tunnel (at least one)
+POWER_EVERY = 1500   # open tiles per extra power pellet, beyond the four corners
+
+# ghost house, stamped at the centre: an open ring around a walled box whose
+# top row holds the four spawns (same arrangement as the classic maze)
+HOUSE = (
+    "             ",
+    " ##G G G G## ",
+    " #         # ",
+    " #         # ",
+    " ########### ",
+    "             ",
+)
+
+def generate_level(cols, rows, seed=None):
+    """
+    A Pac-Man style maze as level rows (the levels/*.txt format).
+
+    The left half is carved as a random spanning tree over a lattice of cells
+    (odd coordinates), braided so there are no dead ends and given extra
+    loops, then mirrored onto the right half. A ghost house goes in the
+    middle, side tunnels wrap around every TUNNEL_EVERY rows, and anything
+    Pacman can't reach is walled in. Sizes are rounded up to odd numbers,
+    widths to 4k + 3 so the mirror axis runs along a cell column.
+    """
+    rng = random.Random(seed)
+    cols, rows = max(cols, MIN_SIZE) | 1, max(rows, MIN_SIZE) | 1
+    if cols // 2 % 2 == 0:
+        cols += 2  # keep the mirror axis on a cell column
+    grid = bytearray(b"\1") * (cols * rows)  # 1 = wall
+    mid = cols // 2
+
+    def is_cell(x, y):
+        return 1 <= x <= mid and 1 <= y <= rows - 2
+
+    def closed_walls(x, y):
+        """Closed walls between cell (x, y) and its neighbouring cells, as (x, y) tiles."""
+        return [(x + dx // 2, y + dy // 2) for dx, dy in ((2, 0), (-2, 0), (0, 2), (0, -2))
+                if is_cell(x + dx, y + dy) and grid[(y + dy // 2)*cols + x + dx // 2]]
+
+    # randomized depth-first spanning tree (iterative: boards can be thousands of tiles across)
+    start = (1, 1)
+    grid[cols + 1] = 0
+    stack = [start]
+    while stack:
+        x, y = stack[-1]
+        options = [(x + dx, y + dy) for dx, dy in ((2, 0), (-2, 0), (0, 2), (0, -2))
+                   if is_cell(x + dx, y + dy) and grid[(y + dy)*cols + x + dx]]
+        if not options:
+            stack.pop()
+            continue
+        nx, ny = rng.choice(options)
+        grid[((y + ny) // 2)*cols + (x + nx) // 2] = 0
+        grid[ny*cols + nx] = 0
+        stack.append((nx, ny))
+
+    # braid away dead ends, then knock through some extra loops
+    for y in range(1, rows - 1, 2):
+        for x in range(1, mid + 1, 2):
+            walls = closed_walls(x, y)
+            open_sides = sum(1 for dx, dy in ((1, 0), (-1, 0), (0, 1), (0, -1))
+                             if not grid[(y + dy)*cols + x + dx])
+            if walls and (open_sides <= 1 or rng.random() < LOOP_CHANCE):
+                wx, wy = rng.choice(walls)
+                grid[wy*cols + wx] = 0
+
+    # mirror the left half onto the right
+    for y in range(rows):
+        row = y * cols
+        for x in range(mid):
+            grid[row + cols - 1 - x] = grid[row + x]
+
+    # side tunnels on cell rows away from the house
+    cy = rows // 2
+    tunnel_rows = [y for y in range(TUNNEL_EVERY // 2 | 1, rows - 1, TUNNEL_EVERY) if abs(y - cy) > 4]
+    if not tunnel_rows:
+        tunnel_rows = [3]
+    for y in tunnel_rows:
+        grid[y*cols] = grid[y*cols + cols - 1] = 0
+
+    # ghost house, with corridors dug up and down from its ring to the maze
+    h, w = len(HOUSE), len(HOUSE[0])
+    top, left = cy - h // 2, mid - w // 2
+    for i, line in enumerate(HOUSE):
+        for j, ch in enumerate(line):
+            grid[(top + i)*cols + left + j] = 1 if ch == WALL else 0
+    for step, y in ((-1, top - 1), (1, top + h)):
+        while 0 < y < rows - 1 and grid[y*cols + mid]:
+            grid[y*cols + mid] = 0
+            y += step
+    pacman = (mid, top + h)
+
+    # wall in whatever Pacman can't reach
+    seen = bytearray(cols * rows)
+    seen[pacman[1]*cols + pacman[0]] = 1
+    q = deque([pacman])
+    tunnels = set(tunnel_rows)
+    while q:
+        x, y = q.popleft()
+        for dx, dy in ((1, 0), (-1, 0), (0, 1), (0, -1)):
+            nx, ny = x + dx, y + dy
+            if nx < 0 or nx >= cols:
+                if y not in tunnels:
+                    continue
+                nx %= cols
+            i = ny*cols + nx
+            if 0 <= ny < rows and not grid[i] and not seen[i]:
+                seen[i] = 1
+                q.append((nx, ny))
+
+    chars = bytearray(seen.translate(bytes.maketrans(b"\0\1", (WALL + PELLET).encode())))
+    # no pellets in the house area or on tunnel mouths
+    for i, line in enumerate(HOUSE):
+        for j, ch in enumerate(line):
+            k = (top + i)*cols + left + j
+            chars[k] = ord(ch) if ch != EMPTY or seen[k] else ord(WALL)
+    for y in tunnel_rows:
+        chars[y*cols] = chars[y*cols + cols - 1] = ord(EMPTY)
+    chars[pacman[1]*cols + pacman[0]] = ord(PACMAN_SPAWN)
+
+    # power pellets in the four corners plus a sprinkling across big boards
+    for i in (cols + 1, 2*cols - 2, (rows - 2)*cols + 1, (rows - 1)*cols - 2):
+        if chars[i] == ord(PELLET):
+            chars[i] = ord(POWER)
+    extra = chars.count(ord(PELLET)) // POWER_EVERY
+    while extra:
+        i = rng.randrange(cols * rows)
+        if chars[i] == ord(PELLET):
+            chars[i] = ord(POWER)
+            extra -= 1
+
+    text = chars.decode()
+    return [text[y*cols:(y+1)*cols] for y in range(rows)]
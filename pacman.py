@@ -1,92 +1,117 @@
 # game/pacman.py
-import pygame
 from settings import TILE_SIZE, PACMAN_SPEED, YELLOW, PELLET_POINTS, POWER_POINTS, RESPAWN_INVINCIBLE
+from game.direction import CODES, NONE, DX, DY, CODE_OF_STEP
 
-VEC = pygame.math.Vector2
-DIRS = {
-    "UP": VEC(0, -1),
-    "DOWN": VEC(0, 1),
-    "LEFT": VEC(-1, 0),
-    "RIGHT": VEC(1, 0),
-    "NONE": VEC(0, 0),
-}
+# direction name -> game.direction code
+DIRS = CODES
 
-def aligned_to_grid(rect):
-    return rect.left % TILE_SIZE == 0 and rect.top % TILE_SIZE == 0
+# pygame key constant -> direction name (pygame is only imported by what draws or reads the keyboard)
+KEY_DIRS = (
+    ("K_UP", "UP"),
+    ("K_DOWN", "DOWN"),
+    ("K_LEFT", "LEFT"),
+    ("K_RIGHT", "RIGHT"),
+)
+
+def keyboard_action():
+    """Name of the direction currently held on the arrow keys, or None."""
+    import pygame
+    keys = pygame.key.get_pressed()
+    for key, name in KEY_DIRS:
+        if keys[getattr(pygame, key)]:
+            return name
+    return None
 
 class Pacman:
+    """Pacman at integer pixel position (x, y); dir/want are game.direction codes."""
+
+    __slots__ = ("x", "y", "dir", "want", "speed", "score", "lives", "invincible_until")
+
     def __init__(self, x, y):
-        self.rect = pygame.Rect(x, y, TILE_SIZE, TILE_SIZE)
-        self.dir = DIRS["NONE"]
-        self.want = DIRS["NONE"]
+        self.x, self.y = x, y
+        self.dir = NONE
+        self.want = NONE
         self.speed = PACMAN_SPEED
         self.score = 0
         self.lives = 3
         self.invincible_until = 0
 
+    @property
+    def rect(self):
+        """A fresh Rect at Pacman's position (for drawing and collision tests; move via x/y)."""
+        import pygame
+        return pygame.Rect(self.x, self.y, TILE_SIZE, TILE_SIZE)
+
+    def tile(self):
+        return self.x // TILE_SIZE, self.y // TILE_SIZE
+
     def handle_input(self):
-        keys = pygame.key.get_pressed()
-        if keys[pygame.K_UP]:
-            self.want = DIRS["UP"]
-        elif keys[pygame.K_DOWN]:
-            self.want = DIRS["DOWN"]
-        elif keys[pygame.K_LEFT]:
-            self.want = DIRS["LEFT"]
-        elif keys[pygame.K_RIGHT]:
-            self.want = DIRS["RIGHT"]
+        action = keyboard_action()
+        if action is not None:
+            self.want = DIRS[action]
 
     def can_move(self, game_map, direction):
-        nx = self.rect.left + int(direction.x) * TILE_SIZE
-        ny = self.rect.top + int(direction.y) * TILE_SIZE
-        tx, ty = nx // TILE_SIZE, ny // TILE_SIZE
-        return not game_map.tile_blocked(tx, ty)
+        return not game_map.tile_blocked((self.x // TILE_SIZE) + DX[direction],
+                                         (self.y // TILE_SIZE) + DY[direction])
 
     def update(self, game_map, now_ms):
+        aligned = self.x % TILE_SIZE == 0 and self.y % TILE_SIZE == 0
         # try turn on grid
-        if aligned_to_grid(self.rect) and self.want != self.dir and self.can_move(game_map, self.want):
+        if aligned and self.want != self.dir and self.can_move(game_map, self.want):
             self.dir = self.want
 
         # block if next tile is wall
-        if aligned_to_grid(self.rect) and not self.can_move(game_map, self.dir):
-            self.dir = DIRS["NONE"]
+        if aligned and not self.can_move(game_map, self.dir):
+            self.dir = NONE
 
         # move
-        self.rect.left += int(self.dir.x) * self.speed
-        self.rect.top  += int(self.dir.y) * self.speed
+        self.x += DX[self.dir] * self.speed
+        self.y += DY[self.dir] * self.speed
 
         # horizontal wrap on tunnels
         cols = game_map.cols
-        if self.rect.top // TILE_SIZE in game_map.tunnel_rows:
-            if self.rect.left < 0:
-                self.rect.left = (cols-1)*TILE_SIZE
-            elif self.rect.left >= cols*TILE_SIZE:
-                self.rect.left = 0
-
-        # eat pellets
-        ate_power = False
-        for p in game_map.pellets[:]:
-            if self.rect.colliderect(p):
-                game_map.pellets.remove(p)
-                self.score += PELLET_POINTS
-        for p in game_map.power_pellets[:]:
-            if self.rect.colliderect(p):
-                game_map.power_pellets.remove(p)
-                self.score += POWER_POINTS
-                ate_power = True
-        return ate_power
+        if self.y // TILE_SIZE in game_map.tunnel_rows:
+            if self.x < 0:
+                self.x = (cols-1)*TILE_SIZE
+            elif self.x >= cols*TILE_SIZE:
+                self.x = 0
+
+        # eat pellets (only the tiles under Pacman are looked at)
+        pellets, powers = game_map.eat_pellets(self.x, self.y)
+        if pellets or powers:
+            self.score += pellets * PELLET_POINTS + powers * POWER_POINTS
+        return powers > 0
 
     def hit_by_ghost(self, now_ms):
         if now_ms >= self.invincible_until and self.lives > 0:
             self.lives -= 1
             self.invincible_until = now_ms + RESPAWN_INVINCIBLE
             # simple respawn near spawn tile
-            self.rect.topleft = (self.rect.left//TILE_SIZE*TILE_SIZE, self.rect.top//TILE_SIZE*TILE_SIZE)
-            self.dir = DIRS["NONE"]
-            self.want = DIRS["NONE"]
+            self.x, self.y = self.x//TILE_SIZE*TILE_SIZE, self.y//TILE_SIZE*TILE_SIZE
+            self.dir = NONE
+            self.want = NONE
+
+    def snapshot(self):
+        return (self.x, self.y, DX[self.dir], DY[self.dir],
+                DX[self.want], DY[self.want], self.score, self.lives, self.invincible_until)
+
+    def restore(self, state):
+        self.x, self.y, dx, dy, wx, wy, self.score, self.lives, self.invincible_until = state
+        self.dir, self.want = CODE_OF_STEP[dx, dy], CODE_OF_STEP[wx, wy]
+
+    def copy(self):
+        other = Pacman.__new__(Pacman)
+        for name in Pacman.__slots__:
+            setattr(other, name, getattr(self, name))
+        return other
 
-    def draw(self, screen, flashing=False):
+    def draw(self, screen, flashing=False, now=None, pos=None):
+        """Draw at `pos` (default: the current position); `now` (ms) times the invincibility blink."""
+        import pygame
         if flashing:
             # blink while invincible
-            if (pygame.time.get_ticks() // 120) % 2 == 0:
+            if ((pygame.time.get_ticks() if now is None else now) // 120) % 2 == 0:
                 return
-        pygame.draw.circle(screen, YELLOW, self.rect.center, TILE_SIZE//2)
+        x, y = pos if pos is not None else (self.x, self.y)
+        half = TILE_SIZE//2
+        pygame.draw.circle(screen, YELLOW, (x + half, y + half), half)
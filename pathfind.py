@@ -0,0 +1,166 @@
+# game/pathfind.py
+import heapq
+from array import array
+from collections import OrderedDict, deque
+from game.direction import DX, DY, MASK_CODES
+from game.routing import STEPS
+
+FIELD_CACHE = 8        # distance fields kept per level, least recently used dropped first
+MAX_EXPANSIONS = 2048  # A* nodes expanded per query before settling for the most promising step
+
+def distance_field(level, gx, gy):
+    """Walking distance from every tile to (gx, gy) as an array('i'); -1 where unreachable."""
+    cols, mask = level.cols, level.adjacency
+    dist = array("i", [-1]) * (cols * level.rows)
+    goal = gy*cols + gx
+    dist[goal] = 0
+    q = deque([goal])
+    while q:
+        i = q.popleft()
+        d = dist[i] + 1
+        x = i % cols
+        for c in MASK_CODES[mask[i]]:
+            nx = x + DX[c]
+            j = i + DX[c] + DY[c]*cols
+            if nx < 0:
+                j += cols
+            elif nx >= cols:
+                j -= cols
+            if dist[j] < 0:
+                dist[j] = d
+                q.append(j)
+    return dist
+
+class PathFinder:
+    """
+    Router for levels too big for an all-pairs RoutingTable, with the same
+    first_code/first_step/distance interface.
+
+    Goals that have a distance field (the ghost home tile always does, from
+    the compiled level; others via field()) are answered in O(1) by stepping
+    downhill. Anything else runs an A* search capped at MAX_EXPANSIONS nodes;
+    when the cap is hit the step toward the most promising node so far is
+    returned, so a query's cost never grows with the size of the maze.
+    """
+
+    def __init__(self, level, max_expansions=MAX_EXPANSIONS, field_cache=FIELD_CACHE):
+        self.cols, self.rows = level.cols, level.rows
+        self.level = level
+        self.mask = level.adjacency
+        self.wraps = bool(level.tunnel_rows)
+        self.max_expansions = max_expansions
+        self.field_cache = field_cache
+        self.fields = OrderedDict()  # goal tile index -> distance_field()
+        self.home = None
+        if level.home_field is not None:
+            hx, hy = level.home_tile
+            home = array("i")
+            home.frombytes(level.home_field)
+            self.home = (hy*self.cols + hx, home)  # pinned, never evicted
+
+    def field(self, gx, gy):
+        """Distance field toward (gx, gy), computed once and kept in a small LRU cache."""
+        goal = gy*self.cols + gx
+        if self.home is not None and self.home[0] == goal:
+            return self.home[1]
+        dist = self.fields.get(goal)
+        if dist is None:
+            dist = self.fields[goal] = distance_field(self.level, gx, gy)
+            if len(self.fields) > self.field_cache:
+                self.fields.popitem(last=False)
+        else:
+            self.fields.move_to_end(goal)
+        return dist
+
+    def _cached_field(self, goal):
+        if self.home is not None and self.home[0] == goal:
+            return self.home[1]
+        return self.fields.get(goal)
+
+    def _neighbor(self, i, c):
+        cols = self.cols
+        nx = i % cols + DX[c]
+        j = i + DX[c] + DY[c]*cols
+        if nx < 0:
+            j += cols
+        elif nx >= cols:
+            j -= cols
+        return j
+
+    def _h(self, i, goal):
+        cols = self.cols
+        dx = abs(i % cols - goal % cols)
+        if self.wraps:
+            dx = min(dx, cols - dx)
+        return dx + abs(i // cols - goal // cols)
+
+    def _search(self, start, goal):
+        """A* from start to goal: (first step code, path length) or (best first code, None) if capped/unreachable."""
+        mask, h = self.mask, self._h
+        best = {start: 0}
+        heap = []
+        for c in MASK_CODES[mask[start]]:
+            j = self._neighbor(start, c)
+            best[j] = 1
+            heapq.heappush(heap, (1 + h(j, goal), 1, j, c))
+        closest, closest_h = None, None
+        for _ in range(self.max_expansions):
+            if not heap:
+                return closest, None
+            f, g, i, first = heapq.heappop(heap)
+            if i == goal:
+                return first, g
+            if g > best.get(i, g):
+                continue  # stale entry
+            hi = f - g
+            if closest_h is None or hi < closest_h:
+                closest, closest_h = first, hi
+            for c in MASK_CODES[mask[i]]:
+                j = self._neighbor(i, c)
+                if g + 1 < best.get(j, 1 << 30):
+                    best[j] = g + 1
+                    heapq.heappush(heap, (g + 1 + h(j, goal), g + 1, j, first))
+        return closest, None
+
+    def _indices(self, tx, ty, gx, gy):
+        cols, rows = self.cols, self.rows
+        if not (0 <= tx < cols and 0 <= ty < rows and 0 <= gx < cols and 0 <= gy < rows):
+            return None
+        start, goal = ty*cols + tx, gy*cols + gx
+        if self.level.walls[start] or self.level.walls[goal]:
+            return None
+        return start, goal
+
+    def first_code(self, tx, ty, gx, gy):
+        """Direction code of the first step from (tx, ty) toward (gx, gy); None if none."""
+        pair = self._indices(tx, ty, gx, gy)
+        if pair is None or pair[0] == pair[1]:
+            return None
+        start, goal = pair
+        dist = self._cached_field(goal)
+        if dist is not None:
+            d = dist[start]
+            if d <= 0:
+                return None
+            for c in MASK_CODES[self.mask[start]]:
+                if dist[self._neighbor(start, c)] == d - 1:
+                    return c
+            return None
+        return self._search(start, goal)[0]
+
+    def first_step(self, start, goal):
+        code = self.first_code(start[0], start[1], goal[0], goal[1])
+        return None if code is None else STEPS[code]
+
+    def distance(self, a, b):
+        """Walking distance in tiles from a to b; None if unreachable (or beyond the search cap)."""
+        pair = self._indices(a[0], a[1], b[0], b[1])
+        if pair is None:
+            return None
+        start, goal = pair
+        if start == goal:
+            return 0
+        dist = self._cached_field(goal)
+        if dist is not None:
+            return dist[start] if dist[start] >= 0 else None
+        return self._search(start, goal)[1]
@@ -0,0 +1,406 @@
+# game/pipeline.py
+import argparse
+import bisect
+import os
+import random
+import sys
+import threading
+import time
+from collections import deque, namedtuple
+from settings import MAX_CATCHUP_TICKS, RENDER_FPS, PIPELINE_DEPTH
+from game.engine import GameEngine, FRAME_MS
+from game.level import NO_PELLET
+
+BUFFER_DEPTH = PIPELINE_DEPTH  # snapshots the simulation may run ahead of the renderer
+INPUT_EVERY = (0.15, 0.35)  # seconds between the benchmark's scripted turns (uniform, off the tick grid)
+
+# One simulated frame as the renderer needs it. entities are (x, y, dir, mode)
+# with Pacman first (mode None); eaten holds the pellet tiles eaten since the
+# previous snapshot, and pellets the whole pellet grid when the board was
+# refilled or restored since then. input_time is when the main loop saw the
+# input this frame was the first to simulate, made when the snapshot was taken
+# (both time.perf_counter()).
+FrameSnapshot = namedtuple("FrameSnapshot", [
+    "frame", "now", "entities", "eaten", "pellets", "score", "lives", "invincible_until", "game_over",
+    "input_time", "made",
+])
+
+class FrameSource:
+    """Takes FrameSnapshots of an engine; each carries only the pellets eaten since the one before."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.map_resets = None
+        self.sent = 0
+
+    def snapshot(self, input_time=None):
+        engine = self.engine
+        gm, pac = engine.game_map, engine.pacman
+        pellets, eaten = None, ()
+        if gm.resets != self.map_resets:
+            pellets = bytes(gm.pellet_grid)
+            self.map_resets = gm.resets
+        elif len(gm.eaten) > self.sent:
+            eaten = tuple(gm.eaten[self.sent:])
+        self.sent = len(gm.eaten)
+        entities = ((pac.x, pac.y, pac.dir, None),) + tuple((g.x, g.y, g.dir, g.mode) for g in engine.ghosts)
+        return FrameSnapshot(engine.frame, engine.now(), entities, eaten, pellets, pac.score, pac.lives,
+                             pac.invincible_until, engine.game_over, input_time, time.perf_counter())
+
+class SnapshotBuffer:
+    """
+    Bounded FIFO of snapshots between the simulation thread and the render
+    thread. put() waits while `depth` snapshots are unread, so the
+    simulation never runs more than `depth` frames ahead; take() hands the
+    renderer everything that arrived since its last frame, in order.
+    """
+
+    def __init__(self, depth=BUFFER_DEPTH):
+        self.depth = depth
+        self.items = deque()
+        self.closed = False
+        self.cond = threading.Condition()
+        self.blocked = 0.0  # seconds put() spent waiting for room
+
+    def put(self, snap):
+        """Queue `snap`; returns False once the buffer is closed."""
+        with self.cond:
+            if len(self.items) >= self.depth and not self.closed:
+                start = time.perf_counter()
+                while len(self.items) >= self.depth and not self.closed:
+                    self.cond.wait()
+                self.blocked += time.perf_counter() - start
+            if self.closed:
+                return False
+            self.items.append(snap)
+            self.cond.notify_all()
+            return True
+
+    def take(self, timeout=None):
+        """Every queued snapshot, oldest first; waits up to `timeout` seconds for one when empty."""
+        with self.cond:
+            if not self.items and timeout:
+                self.cond.wait(timeout)
+            items = list(self.items)
+            self.items.clear()
+            self.cond.notify_all()
+            return items
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+class InputSlot:
+    """
+    The latest input from the main thread for the simulation thread. A new
+    direction is stamped with the time it was seen; the stamp goes out with
+    the first frame simulated with it, for latency measurement.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.action = None
+        self.seen = None
+        self.restart = False
+
+    def set(self, action, restart=False):
+        with self.lock:
+            if action != self.action:
+                self.action = action
+                self.seen = time.perf_counter() if action is not None else None
+            self.restart = self.restart or restart
+
+    def take(self):
+        """(action, seen time or None, restart requested)."""
+        with self.lock:
+            seen, self.seen = self.seen, None
+            restart, self.restart = self.restart, False
+            return self.action, seen, restart
+
+class _Pacman:
+    __slots__ = ("x", "y", "dir", "score", "lives", "invincible_until")
+
+class _Ghost:
+    __slots__ = ("x", "y", "dir", "mode", "name")
+
+    def __init__(self, name):
+        self.name = name
+
+class SnapshotView:
+    """
+    Engine-shaped picture of the game rebuilt from FrameSnapshots on the
+    render thread: Renderer and CameraRenderer draw it as they draw a
+    GameEngine, without touching the engine the simulation thread is
+    stepping. The map is a fork with its own pellets and eaten log.
+    """
+
+    def __init__(self, engine):
+        self.game_map = engine.game_map.fork()
+        self.pacman = _Pacman()
+        self.ghosts = [_Ghost(g.name) for g in engine.ghosts]
+        self.frame = self.time = 0
+        self.game_over = False
+
+    def now(self):
+        return self.time
+
+    def apply(self, snap):
+        gm = self.game_map
+        if snap.pellets is not None:
+            gm.pellet_grid[:] = snap.pellets
+            gm.eaten.clear()
+            gm.resets += 1
+        elif snap.eaten:
+            grid = gm.pellet_grid
+            for i in snap.eaten:
+                grid[i] = NO_PELLET
+            gm.eaten.extend(snap.eaten)
+        pac = self.pacman
+        (pac.x, pac.y, pac.dir, _) = snap.entities[0]
+        pac.score, pac.lives, pac.invincible_until = snap.score, snap.lives, snap.invincible_until
+        for g, (x, y, d, mode) in zip(self.ghosts, snap.entities[1:]):
+            g.x, g.y, g.dir, g.mode = x, y, d, mode
+        self.frame, self.time, self.game_over = snap.frame, snap.now, snap.game_over
+
+    def positions(self):
+        return [(self.pacman.x, self.pacman.y)] + [(g.x, g.y) for g in self.ghosts]
+
+class LoopStats:
+    """
+    Throughput and input latency of a game loop: simulation ticks and drawn
+    frames per second, draw time, and for each input the time from the main
+    loop seeing it to the display update of the first frame simulated with it.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.ticks = self.frames = 0
+        self.draw_time = 0.0
+        self.blocked = 0.0  # seconds a pipelined simulation waited for the renderer
+        self.latencies = []
+
+    def summary(self):
+        elapsed = time.perf_counter() - self.start
+        lat = sorted(self.latencies)
+        pick = lambda q: lat[min(int(q * len(lat)), len(lat) - 1)] * 1000 if lat else 0.0
+        return dict(ticks_per_s=self.ticks / elapsed, fps=self.frames / elapsed,
+                    draw_ms=self.draw_time / max(self.frames, 1) * 1000, inputs=len(lat),
+                    latency_p50=pick(0.5), latency_p95=pick(0.95), latency_max=lat[-1] * 1000 if lat else 0.0)
+
+    def report(self, name, out=sys.stdout):
+        s = self.summary()
+        print(f"{name}: {s['ticks_per_s']:.1f} ticks/s, {s['fps']:.1f} frames/s, draw {s['draw_ms']:.2f} ms, "
+              f"input latency p50 {s['latency_p50']:.1f} / p95 {s['latency_p95']:.1f} ms ({s['inputs']} inputs)",
+              file=out)
+
+class Pipeline:
+    """
+    Runs a simulation (a GameEngine, or a ReplayRecorder around one) on its
+    own thread at the fixed tick rate, handing the render thread an
+    immutable FrameSnapshot per tick through a SnapshotBuffer, so frame N+1
+    is simulated while frame N is drawn and presented. The engine must not
+    be touched from other threads while the pipeline runs: inputs go through
+    `input`, and the picture comes back through draw(). An exception on the
+    simulation thread stops it and is raised again by the next draw() or
+    stop() on the caller's thread.
+
+    CPython runs one thread's Python code at a time, so the two overlap
+    where the render thread waits without holding the interpreter (pygame's
+    display update and a vsync'd flip); draws that are all Python still
+    take turns with the simulation.
+    """
+
+    def __init__(self, sim, engine, depth=BUFFER_DEPTH, stats=None):
+        self.sim = sim
+        self.source = FrameSource(engine)
+        self.buffer = SnapshotBuffer(depth)
+        self.input = InputSlot()
+        self.stats = stats if stats is not None else LoopStats()
+        self.thread = threading.Thread(target=self._run, name="simulation", daemon=True)
+        self.prev = self.newest = None
+        self.error = None  # exception that ended the simulation thread, until raised by draw() / stop()
+
+    def start(self):
+        self.buffer.put(self.source.snapshot())
+        self.thread.start()
+
+    def stop(self):
+        self.buffer.close()
+        self.thread.join()
+        self.stats.blocked = self.buffer.blocked
+        self._raise()
+
+    def _raise(self):
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+    def _run(self):
+        try:
+            self._simulate()
+        except BaseException as e:
+            self.error = e
+            self.buffer.close()
+
+    def _simulate(self):
+        sim, stats, tick = self.sim, self.stats, FRAME_MS / 1000
+        due = time.perf_counter() + tick
+        while True:
+            wait = due - time.perf_counter()
+            if wait > 0:
+                time.sleep(wait)
+            elif wait < -MAX_CATCHUP_TICKS * tick:
+                due = time.perf_counter()  # after a long stall, carry on from now rather than race to catch up
+            action, seen, restart = self.input.take()
+            if restart:
+                sim.reset()
+            else:
+                sim.step(action)
+            stats.ticks += 1
+            if not self.buffer.put(self.source.snapshot(seen)):
+                return
+            due += tick
+
+    def draw(self, renderer, view, timeout=None):
+        """
+        Apply the snapshots that arrived to `view` and draw it, entities
+        interpolated from the previous tick by the time since the newest
+        was taken (as the serial loop does with its leftover lag).
+        """
+        self._raise()
+        stats = self.stats
+        snaps = self.buffer.take(timeout)
+        for snap in snaps:
+            self.prev = view.positions() if self.newest is not None else None
+            view.apply(snap)
+            self.newest = snap
+        if self.newest is None:
+            return
+        start = time.perf_counter()
+        alpha = min((start - self.newest.made) * 1000 / FRAME_MS, 1.0)
+        renderer.draw(view, view.now(), self.prev, alpha)
+        done = time.perf_counter()
+        stats.draw_time += done - start
+        stats.frames += 1
+        for snap in snaps:
+            if snap.input_time is not None:
+                stats.latencies.append(done - snap.input_time)
+
+# --------- benchmark ----------------------------------------------------------
+class ScriptedInput:
+    """A seeded sequence of turns at irregular times, the same for every loop measured."""
+
+    def __init__(self, seed):
+        rng = random.Random(seed)
+        self.times, self.actions, t = [], [], 0.0
+        while t < 3600:
+            t += rng.uniform(*INPUT_EVERY)
+            self.times.append(t)
+            self.actions.append(rng.choice(("UP", "DOWN", "LEFT", "RIGHT")))
+
+    def at(self, elapsed):
+        """The direction held `elapsed` seconds into the run."""
+        i = bisect.bisect(self.times, elapsed)
+        return self.actions[i - 1] if i else None
+
+def run_serial(engine, renderer, seconds, script, present_ms=0.0, capped=True):
+    """main.py's serial loop (fixed-timestep ticks, then draw) on scripted input; returns its LoopStats."""
+    import pygame
+    from game.render import entity_positions
+    stats, clock = LoopStats(), pygame.time.Clock()
+    prev, lag, want, seen = None, FRAME_MS, None, None
+    last = start = time.perf_counter()
+    while last - start < seconds:
+        t = time.perf_counter()
+        action = script.at(t - start)
+        if action != want:
+            want, seen = action, t
+        lag += (t - last) * 1000
+        last = t
+        ticks = int(lag // FRAME_MS)
+        if ticks > MAX_CATCHUP_TICKS:
+            ticks = MAX_CATCHUP_TICKS
+            lag = ticks * FRAME_MS
+        applied = None
+        for i in range(ticks):
+            if i == ticks - 1:
+                prev = entity_positions(engine)
+            if engine.game_over:
+                engine.reset()
+            else:
+                engine.step(want)
+            if seen is not None:
+                applied, seen = seen, None
+        lag -= ticks * FRAME_MS
+        stats.ticks += ticks
+        t = time.perf_counter()
+        renderer.draw(engine, engine.now(), prev, lag / FRAME_MS)
+        done = time.perf_counter()
+        stats.draw_time += done - t
+        stats.frames += 1
+        if applied is not None:
+            stats.latencies.append(done - applied)
+        if present_ms:
+            time.sleep(present_ms / 1000)
+        if capped:
+            clock.tick(RENDER_FPS)
+    return stats
+
+def run_pipelined(engine, renderer, seconds, script, present_ms=0.0, capped=True, depth=BUFFER_DEPTH):
+    """The same on a Pipeline: simulation thread plus this thread drawing SnapshotViews."""
+    import pygame
+    clock = pygame.time.Clock()
+    pipe = Pipeline(engine, engine, depth)
+    view = SnapshotView(engine)
+    pipe.start()
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        pipe.input.set(script.at(time.perf_counter() - start), restart=view.game_over)
+        pipe.draw(renderer, view)
+        if present_ms:
+            time.sleep(present_ms / 1000)
+        if capped:
+            clock.tick(RENDER_FPS)
+    pipe.stop()
+    return pipe.stats
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Compare the serial game loop with the pipelined one "
+                                             "(simulation thread + render thread).")
+    ap.add_argument("--seconds", type=float, default=5.0, help="run time per loop")
+    ap.add_argument("--depth", type=int, default=BUFFER_DEPTH, help="snapshot buffer depth (2 double, 3 triple)")
+    ap.add_argument("--present-ms", type=float, default=0.0,
+                    help="extra wait after each draw, as a vsync'd flip blocks (without holding the GIL)")
+    ap.add_argument("--uncapped", action="store_true", help=f"draw as fast as possible instead of {RENDER_FPS} fps")
+    ap.add_argument("--offscreen", action="store_true", help="render with SDL's dummy video driver")
+    ap.add_argument("--swarm", metavar="N", type=int, help="simulate N ghosts (swarm mode) for a heavier tick")
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args(argv)
+
+    if args.offscreen:
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    import pygame
+    from settings import SCREEN_WIDTH, SCREEN_HEIGHT
+    from game.render import Renderer, LazyFont
+    pygame.display.init()
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    ghosts = dict(ghost_count=args.swarm, ghost_pathing="flow") if args.swarm else {}
+
+    print(f"{'loop':<11}{'ticks/s':>9}{'frames/s':>10}{'draw ms':>9}{'inputs':>8}{'lat p50':>9}{'lat p95':>9}"
+          f"{'lat max':>9}{'sim blocked':>13}")
+    for name, run in (("serial", run_serial), ("pipelined", run_pipelined)):
+        engine = GameEngine(seed=args.seed, **ghosts)
+        renderer = Renderer(screen, LazyFont(28), LazyFont(64), LazyFont(36))
+        kwargs = dict(depth=args.depth) if run is run_pipelined else {}
+        stats = run(engine, renderer, args.seconds, ScriptedInput(args.seed), args.present_ms, not args.uncapped,
+                    **kwargs)
+        s = stats.summary()
+        blocked = f"{stats.blocked / args.seconds:.0%}" if run is run_pipelined else "-"
+        print(f"{name:<11}{s['ticks_per_s']:>9.1f}{s['fps']:>10.1f}{s['draw_ms']:>9.2f}{s['inputs']:>8}"
+              f"{s['latency_p50']:>9.1f}{s['latency_p95']:>9.1f}{s['latency_max']:>9.1f}{blocked:>13}", flush=True)
+    pygame.quit()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+# game/profiler.py
+import json
+import os
+import threading
+from collections import deque, defaultdict
+from time import perf_counter_ns
+
+WINDOW = 240            # frames of history kept per phase (4 s at 60 FPS)
+TRACE_LIMIT = 500_000   # most recent trace events kept while tracing
+
+class FrameProfiler:
+    """
+    Per-phase frame timings.
+
+    Hot code brackets a phase with begin(name)/end(name) (callers guard with
+    `if profiler:` so a disabled profiler costs one test). Time spent in each
+    phase is summed over the frame; end_frame() moves those sums into rolling
+    windows used for percentiles. With tracing on, every begin/end pair is
+    also kept as a complete ("X") event for Chrome/Perfetto trace files.
+    """
+
+    def __init__(self, window=WINDOW, tracing=False):
+        self.window = window
+        self.tracing = tracing
+        self.history = defaultdict(lambda: deque(maxlen=self.window))  # phase -> per-frame ms
+        self.events = deque(maxlen=TRACE_LIMIT)
+        self._open = {}
+        self._frame = defaultdict(int)  # phase -> ns so far this frame
+        self._t0 = perf_counter_ns()
+        self._pid = os.getpid()
+
+    def begin(self, name):
+        self._open[name] = perf_counter_ns()
+
+    def end(self, name):
+        t = perf_counter_ns()
+        start = self._open.pop(name)
+        self._frame[name] += t - start
+        if self.tracing:
+            self.events.append((name, start, t - start, threading.get_ident()))
+
+    def end_frame(self):
+        for name, ns in self._frame.items():
+            self.history[name].append(ns / 1e6)
+        self._frame.clear()
+
+    def stats(self):
+        """{phase: (mean, p50, p95, p99, max)} in ms over the rolling window."""
+        out = {}
+        for name, samples in self.history.items():
+            if not samples:
+                continue
+            s = sorted(samples)
+            n = len(s)
+            out[name] = (sum(s) / n, s[n // 2], s[min(n-1, n*95 // 100)], s[min(n-1, n*99 // 100)], s[-1])
+        return out
+
+    def report(self):
+        lines = [f"{'phase':<22}{'mean':>8}{'p50':>8}{'p95':>8}{'p99':>8}{'max':>8}  (ms)"]
+        for name, row in sorted(self.stats().items(), key=lambda kv: -kv[1][2]):
+            lines.append(f"{name:<22}" + "".join(f"{v:>8.3f}" for v in row))
+        return "\n".join(lines)
+
+    def write_trace(self, path):
+        """Dump the recorded events in Chrome trace-event JSON (chrome://tracing, Perfetto)."""
+        events = [{"name": name, "ph": "X", "ts": (start - self._t0) / 1000, "dur": dur / 1000,
+                   "pid": self._pid, "tid": tid}
+                  for name, start, dur, tid in self.events]
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+class ProfilerOverlay:
+    """Small per-phase p50/p95 readout drawn into the HUD; text is refreshed a few times a second."""
+
+    REFRESH = 15  # frames between text refreshes
+
+    def __init__(self, profiler, font, rect, color=(180, 255, 180)):
+        self.profiler = profiler
+        self.font = font
+        self.rect = rect
+        self.color = color
+        self.visible = False
+        self.lines = []
+        self._age = self.REFRESH
+
+    def toggle(self):
+        self.visible = not self.visible
+        self._age = self.REFRESH
+
+    def draw(self, screen, bg):
+        """Draw into self.rect and return it (as a dirty rect), or None when hidden."""
+        if not self.visible:
+            return None
+        self._age += 1
+        if self._age >= self.REFRESH:
+            self._age = 0
+            rows = sorted(self.profiler.stats().items(), key=lambda kv: -kv[1][2])
+            per_line = self.font.get_linesize()
+            self.lines = [self.font.render(f"{name[:12]:<12}{p50:6.2f}{p95:6.2f}", True, self.color)
+                          for name, (_, p50, p95, _, _) in rows[:max(1, self.rect.height // per_line)]]
+        screen.fill(bg, self.rect)
+        y = self.rect.top
+        for surf in self.lines:
+            screen.blit(surf, (self.rect.left, y))
+            y += surf.get_height()
+        return self.rect
@@ -0,0 +1,383 @@
+# game/render.py
+import re
+from collections import OrderedDict
+import pygame
+from settings import TILE_SIZE, SCREEN_WIDTH, SCREEN_HEIGHT, HUD_HEIGHT, BLACK, BLUE, WHITE, HUD_BG
+from game.sprites import SpriteAtlas
+
+BLINK_MS = 120     # Pacman's invincibility blink half-period
+CHUNK_TILES = 32   # CameraRenderer caches the maze in square chunks this many tiles across
+CHUNK_CACHE = 64   # chunk surfaces kept, least recently drawn dropped first
+
+HUD_RECT = pygame.Rect(0, SCREEN_HEIGHT-HUD_HEIGHT, SCREEN_WIDTH, HUD_HEIGHT)
+
+def entity_positions(engine):
+    """Pixel positions of Pacman and the ghosts, in draw order (input for interpolated drawing)."""
+    return [(engine.pacman.x, engine.pacman.y)] + [(g.x, g.y) for g in engine.ghosts]
+
+def interpolate(prev, cur, alpha):
+    """
+    Draw positions `alpha` of the way from the previous tick's positions to
+    the current ones. Moves longer than a tile (tunnel wraps, respawns,
+    resets, replay seeks) are jumps, not motion, and snap to the current spot.
+    """
+    if prev is None or len(prev) != len(cur):
+        return cur
+    out = []
+    for (px, py), (x, y) in zip(prev, cur):
+        if abs(x - px) > TILE_SIZE or abs(y - py) > TILE_SIZE:
+            out.append((x, y))
+        else:
+            out.append((round(px + (x - px) * alpha), round(py + (y - py) * alpha)))
+    return out
+
+class LazyFont:
+    """
+    A pygame Font of `size` opened on first use (initializing pygame.font
+    then). It is pygame's bundled default font, opened by path, so there's
+    no system font scan; fonts are shared per size.
+    """
+
+    _open = {}
+
+    def __init__(self, size):
+        self.size = size
+
+    def __getattr__(self, name):
+        font = LazyFont._open.get(self.size)
+        if font is None:
+            if not pygame.font.get_init():
+                pygame.font.init()
+            font = LazyFont._open[self.size] = pygame.font.Font(None, self.size)
+        return getattr(font, name)
+
+class TextCache:
+    """Keeps a rendered text surface and only re-renders it when the text changes."""
+
+    def __init__(self, font, color):
+        self.font = font
+        self.color = color
+        self.text = None
+        self.surface = None
+
+    def render(self, text):
+        if text != self.text:
+            self.text = text
+            self.surface = self.font.render(text, True, self.color)
+        return self.surface
+
+class MazeLayer:
+    """
+    A GameMap's walls and remaining pellets on one surface. The walls are
+    drawn once per maze (kept while the content hash matches); pellets come
+    from a SpriteAtlas and are erased as the map's eaten log grows. `like`
+    picks the pixel format (default: the display's).
+    """
+
+    def __init__(self, atlas, like=None):
+        self.atlas = atlas
+        self.like = like
+        self.walls = None
+        self.walls_hash = None
+        self.surface = None
+        self.game_map = None
+        self.resets = 0
+        self.erased = 0  # how much of game_map.eaten is already erased
+
+    def stale(self, game_map):
+        """True when `game_map` is not the board on the surface (another map, or refilled since)."""
+        return game_map is not self.game_map or game_map.resets != self.resets
+
+    def rebuild(self, game_map):
+        if game_map.content_hash != self.walls_hash:
+            self.walls_hash = game_map.content_hash
+            walls = pygame.Surface((game_map.cols*TILE_SIZE, game_map.rows*TILE_SIZE))
+            self.walls = walls.convert(self.like) if self.like is not None else walls.convert()
+            self.walls.fill(BLACK)
+            for wall in game_map.walls:
+                pygame.draw.rect(self.walls, BLUE, wall)
+        self.surface = self.walls.copy()
+        pellets = self.atlas.pellets
+        self.surface.blits([(pellets[kind], (tx*TILE_SIZE, ty*TILE_SIZE)) for tx, ty, kind in game_map.pellet_tiles()],
+                           doreturn=False)
+        self.game_map = game_map
+        self.resets = game_map.resets
+        self.erased = len(game_map.eaten)
+
+    def erase_eaten(self):
+        """Erase pellets eaten since the last call; returns the tile rects that changed."""
+        gm = self.game_map
+        eaten, cols = gm.eaten, gm.cols
+        tiles = []
+        for i in range(self.erased, len(eaten)):
+            tile = pygame.Rect(eaten[i] % cols * TILE_SIZE, eaten[i] // cols * TILE_SIZE, TILE_SIZE, TILE_SIZE)
+            self.surface.blit(self.walls, tile, tile)
+            tiles.append(tile)
+        self.erased = len(eaten)
+        return tiles
+
+def draw_board(surface, layer, atlas, engine):
+    """
+    Draw a whole frame of `engine`'s board (no HUD) onto `surface`: the
+    MazeLayer brought up to date, then the entities as atlas sprites. For
+    offscreen frames (PacmanEnv, the spectator wall) that are redrawn whole.
+    """
+    gm, pacman = engine.game_map, engine.pacman
+    if layer.stale(gm):
+        layer.rebuild(gm)
+    else:
+        layer.erase_eaten()
+    surface.blit(layer.surface, (0, 0))
+    positions = entity_positions(engine)
+    batch = [(atlas.ghost(g), pos) for g, pos in zip(engine.ghosts, positions[1:])]
+    now = engine.now()
+    if not (now < pacman.invincible_until and (now // BLINK_MS) % 2 == 0):
+        batch.insert(0, (atlas.pacman(pacman.dir, pacman.x, pacman.y), positions[0]))
+    surface.blits(batch, doreturn=False)
+
+class Renderer:
+    """
+    Dirty-rectangle renderer for a GameEngine.
+
+    The walls are drawn once into a cached surface; a persistent MazeLayer
+    (walls + remaining pellets) is copied from it on each new map and pellets
+    are erased from it as they get eaten. Pellets and entities are sprites
+    from a SpriteAtlas, blitted in Surface.blits() batches. Each frame only the regions that
+    changed (entity old/new rects, eaten pellet tiles, HUD when its values
+    move) are redrawn and pushed with pygame.display.update(rects).
+    """
+
+    def __init__(self, screen, font, bigfont, midfont, profiler=None, overlay=None, atlas=None):
+        self.screen = screen
+        self.atlas = atlas if atlas is not None else SpriteAtlas()
+        self.profiler = profiler
+        self.overlay = overlay  # optional ProfilerOverlay drawn into the HUD
+        self.score_text = TextCache(font, WHITE)
+        self.lives_text = TextCache(font, WHITE)
+        self.game_over_text = TextCache(bigfont, (255, 60, 60))
+        self.restart_text = TextCache(midfont, WHITE)
+        self.layer = MazeLayer(self.atlas)
+        self.entity_rects = []     # rects drawn last frame, restored next frame
+        self.hud_values = None
+        self.full_redraw = True
+        self._overlay_shown = False
+
+    def set_map(self, game_map):
+        self.layer.rebuild(game_map)
+        self.full_redraw = True
+
+    def draw_hud(self, pacman):
+        screen = self.screen
+        screen.fill(HUD_BG, HUD_RECT)
+        screen.blit(self.score_text.render(f"Score: {pacman.score}"), (16, SCREEN_HEIGHT-HUD_HEIGHT+24))
+        screen.blit(self.lives_text.render(f"Lives: {max(0, pacman.lives)}"), (200, SCREEN_HEIGHT-HUD_HEIGHT+24))
+
+    def draw_game_over(self):
+        msg1 = self.game_over_text.render("GAME OVER")
+        msg2 = self.restart_text.render("Press R to Restart")
+        self.screen.blit(msg1, msg1.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT//2 - 40)))
+        self.screen.blit(msg2, msg2.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT//2 + 20)))
+
+    def _draw_hud_layer(self, engine, full, dirty):
+        """HUD values, profiler overlay and game-over text; appends what changed to `dirty`."""
+        screen, pacman = self.screen, engine.pacman
+        hud_values = (pacman.score, pacman.lives)
+        if full or hud_values != self.hud_values:
+            self.hud_values = hud_values
+            self.draw_hud(pacman)
+            dirty.append(HUD_RECT)
+        if self.overlay is not None:
+            area = self.overlay.draw(screen, HUD_BG)
+            if area is None and self._overlay_shown:
+                screen.fill(HUD_BG, self.overlay.rect)  # clear it once after hiding
+                area = self.overlay.rect
+            self._overlay_shown = self.overlay.visible
+            if area is not None:
+                dirty.append(area)
+        if engine.game_over:
+            self.draw_game_over()
+        self.full_redraw = engine.game_over
+
+    def draw(self, engine, now, prev=None, alpha=1.0):
+        """
+        Draw the current engine state and push the changed regions to the
+        display. With `prev` (entity_positions() before the last tick) the
+        entities are drawn `alpha` of a tick past it, for smooth motion when
+        rendering and simulation run at different rates.
+        """
+        screen = self.screen
+        game_map, pacman, ghosts = engine.game_map, engine.pacman, engine.ghosts
+        if self.layer.stale(game_map):
+            self.set_map(game_map)
+
+        prof = self.profiler
+        if prof:
+            prof.begin("render.maze")
+
+        # erase eaten pellets from the persistent maze layer
+        dirty = self.layer.erase_eaten()
+
+        # a game-over screen is static, so just redraw it whole
+        full = self.full_redraw or engine.game_over
+        maze = self.layer.surface
+        if full:
+            screen.blit(maze, (0, 0))
+            dirty = [screen.get_rect()]
+        else:
+            screen.blits([(maze, r, r) for r in dirty] + [(maze, r, r) for r in self.entity_rects], doreturn=False)
+            dirty.extend(self.entity_rects)
+        if prof:
+            prof.end("render.maze")
+            prof.begin("render.entities")
+
+        cur = entity_positions(engine)
+        positions = interpolate(prev, cur, alpha) if prev is not None else cur
+        atlas = self.atlas
+        batch = [(atlas.ghost(g), pos) for g, pos in zip(ghosts, positions[1:])]
+        if not (now < pacman.invincible_until and (now // BLINK_MS) % 2 == 0):
+            x, y = positions[0]
+            batch.insert(0, (atlas.pacman(pacman.dir, x, y), positions[0]))
+        screen.blits(batch, doreturn=False)
+        self.entity_rects = [pygame.Rect(x, y, TILE_SIZE, TILE_SIZE) for x, y in positions]
+        if not full:
+            dirty.extend(self.entity_rects)
+        if prof:
+            prof.end("render.entities")
+            prof.begin("render.hud")
+
+        self._draw_hud_layer(engine, full, dirty)
+        if prof:
+            prof.end("render.hud")
+            prof.begin("display")
+
+        pygame.display.update(dirty)
+        if prof:
+            prof.end("display")
+
+class CameraRenderer(Renderer):
+    """
+    Renderer for maps bigger than the window: a camera follows Pacman over
+    the play area and only what it can see is drawn.
+
+    The maze is cut into CHUNK_TILES square chunks, each rasterized (wall
+    runs plus pellet sprites) the first time it comes into view and kept in
+    a small LRU cache, so memory stays flat however big the map is. Eaten
+    pellets are erased from cached chunks; entities outside the view are
+    skipped. The play area scrolls, so it is pushed whole every frame.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.view = pygame.Rect(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT - HUD_HEIGHT)
+        self.chunks = OrderedDict()  # (cx, cy) -> Surface
+        self.camera = (0, 0)         # map pixel at the view's top-left corner
+        self.game_map = None
+        self.map_resets = 0
+        self.erased = 0              # how much of game_map.eaten is already erased
+
+    def set_map(self, game_map):
+        self.game_map = game_map
+        self.map_resets = game_map.resets
+        self.erased = len(game_map.eaten)
+        self.chunks.clear()
+        self.full_redraw = True
+
+    def _chunk(self, cx, cy):
+        key = (cx, cy)
+        surf = self.chunks.get(key)
+        if surf is not None:
+            self.chunks.move_to_end(key)
+            return surf
+        gm, size = self.game_map, CHUNK_TILES*TILE_SIZE
+        surf = pygame.Surface((size, size)).convert()
+        surf.fill(BLACK)
+        x0, y0 = cx*CHUNK_TILES, cy*CHUNK_TILES
+        x1, y1 = min(x0 + CHUNK_TILES, gm.cols), min(y0 + CHUNK_TILES, gm.rows)
+        grid, pellets, batch = gm.pellet_grid, self.atlas.pellets, []
+        for ty in range(y0, y1):
+            row = ty*gm.cols
+            py = (ty - y0)*TILE_SIZE
+            for run in re.finditer(b"\x01+", gm.wall_bytes[row + x0:row + x1]):
+                surf.fill(BLUE, (run.start()*TILE_SIZE, py, (run.end() - run.start())*TILE_SIZE, TILE_SIZE))
+            for tx in range(x0, x1):
+                kind = grid[row + tx]
+                if kind:
+                    batch.append((pellets[kind], ((tx - x0)*TILE_SIZE, py)))
+        surf.blits(batch, doreturn=False)
+        self.chunks[key] = surf
+        if len(self.chunks) > CHUNK_CACHE:
+            self.chunks.popitem(last=False)
+        return surf
+
+    def follow(self, x, y):
+        """Centre the camera on map pixel (x, y), clamped to the map (centred when the map is smaller)."""
+        view, gm = self.view, self.game_map
+        w, h = gm.cols*TILE_SIZE, gm.rows*TILE_SIZE
+        cx = min(max(x - view.w // 2, 0), w - view.w) if w > view.w else (w - view.w) // 2
+        cy = min(max(y - view.h // 2, 0), h - view.h) if h > view.h else (h - view.h) // 2
+        self.camera = (cx, cy)
+
+    def draw(self, engine, now, prev=None, alpha=1.0):
+        screen, view = self.screen, self.view
+        game_map, pacman, ghosts = engine.game_map, engine.pacman, engine.ghosts
+        if game_map is not self.game_map or game_map.resets != self.map_resets:
+            self.set_map(game_map)
+
+        prof = self.profiler
+        if prof:
+            prof.begin("render.maze")
+
+        # erase eaten pellets from the chunks that are cached (others are built without them)
+        eaten, cols = game_map.eaten, game_map.cols
+        for i in range(self.erased, len(eaten)):
+            tx, ty = eaten[i] % cols, eaten[i] // cols
+            surf = self.chunks.get((tx // CHUNK_TILES, ty // CHUNK_TILES))
+            if surf is not None:
+                surf.fill(BLACK, ((tx % CHUNK_TILES)*TILE_SIZE, (ty % CHUNK_TILES)*TILE_SIZE, TILE_SIZE, TILE_SIZE))
+        self.erased = len(eaten)
+
+        cur = entity_positions(engine)
+        positions = interpolate(prev, cur, alpha) if prev is not None else cur
+        half = TILE_SIZE // 2
+        self.follow(positions[0][0] + half, positions[0][1] + half)
+        camx, camy = self.camera
+        ox, oy = view.x - camx, view.y - camy  # map pixel -> screen pixel
+
+        screen.set_clip(view)
+        screen.fill(BLACK, view)
+        size = CHUNK_TILES*TILE_SIZE
+        cx0, cy0 = max(camx, 0) // size, max(camy, 0) // size
+        cx1 = min((camx + view.w - 1) // size, (game_map.cols - 1) // CHUNK_TILES)
+        cy1 = min((camy + view.h - 1) // size, (game_map.rows - 1) // CHUNK_TILES)
+        screen.blits([(self._chunk(cx, cy), (ox + cx*size, oy + cy*size))
+                      for cy in range(cy0, cy1 + 1) for cx in range(cx0, cx1 + 1)], doreturn=False)
+        if prof:
+            prof.end("render.maze")
+            prof.begin("render.entities")
+
+        # entities: skip whatever is outside the view
+        left, top = camx - TILE_SIZE, camy - TILE_SIZE
+        right, bottom = camx + view.w, camy + view.h
+        atlas, batch = self.atlas, []
+        if not (now < pacman.invincible_until and (now // BLINK_MS) % 2 == 0):
+            x, y = positions[0]
+            batch.append((atlas.pacman(pacman.dir, x, y), (x + ox, y + oy)))
+        for g, (x, y) in zip(ghosts, positions[1:]):
+            if left < x < right and top < y < bottom:
+                batch.append((atlas.ghost(g), (x + ox, y + oy)))
+        screen.blits(batch, doreturn=False)
+        screen.set_clip(None)
+        if prof:
+            prof.end("render.entities")
+            prof.begin("render.hud")
+
+        full = self.full_redraw or engine.game_over
+        dirty = [screen.get_rect()] if full else [view]
+        self._draw_hud_layer(engine, full, dirty)
+        if prof:
+            prof.end("render.hud")
+            prof.begin("display")
+
+        pygame.display.update(dirty)
+        if prof:
+            prof.end("display")
@@ -0,0 +1,173 @@
+# game/replay.py
+import bisect
+import marshal
+import struct
+import zlib
+from game.engine import GameEngine, EngineState
+
+# File layout (little endian):
+#   header    "PMRP", version u16, keyframe interval u16, map sha1 (20 bytes),
+#             seed i64, frame count u32, input run count u32, keyframe count u32
+#   inputs    run-length encoded per-frame inputs: (code u8, run length varint) ...
+#   keyframes (frame u32, blob length u32, zlib(marshal(tuple(engine.snapshot())))) ...
+MAGIC = b"PMRP"
+VERSION = 2  # 2: engine snapshots carry the timer state
+HEADER = struct.Struct("<4sHH20sqIII")
+KEYFRAME = struct.Struct("<II")
+KEYFRAME_INTERVAL = 600  # frames (10 s at 60 FPS)
+
+# per-frame input codes
+INPUT_CODES = (None, "UP", "DOWN", "LEFT", "RIGHT", "RESET")
+CODE_OF = {name: code for code, name in enumerate(INPUT_CODES)}
+RESET = "RESET"
+
+def _write_varint(out, n):
+    while n >= 0x80:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+def _read_varint(buf, pos):
+    n = shift = 0
+    while True:
+        b = buf[pos]
+        pos += 1
+        n |= (b & 0x7F) << shift
+        if b < 0x80:
+            return n, pos
+        shift += 7
+
+class ReplayRecorder:
+    """
+    Records a seeded, simulated-time GameEngine: one input code per step()
+    (RESET for a restart) plus a full-state keyframe every `interval` frames.
+    """
+
+    def __init__(self, engine, interval=KEYFRAME_INTERVAL):
+        if engine.clock is not None or engine.seed is None:
+            raise ValueError("replays need a seeded engine running on simulated time")
+        self.engine = engine
+        self.interval = interval
+        self.inputs = bytearray()
+        self.keyframes = []  # (replay frame, compressed state)
+
+    def _maybe_keyframe(self):
+        if len(self.inputs) % self.interval == 0:
+            blob = zlib.compress(marshal.dumps(tuple(self.engine.snapshot())))
+            self.keyframes.append((len(self.inputs), blob))
+
+    def step(self, action=None):
+        self._maybe_keyframe()
+        over = self.engine.step(action)
+        self.inputs.append(CODE_OF[self.engine.last_action])
+        return over
+
+    def reset(self):
+        self._maybe_keyframe()
+        self.engine.reset()
+        self.inputs.append(CODE_OF[RESET])
+
+    def to_bytes(self):
+        runs = bytearray()
+        count = 0
+        i, n = 0, len(self.inputs)
+        while i < n:
+            j = i
+            while j < n and self.inputs[j] == self.inputs[i]:
+                j += 1
+            runs.append(self.inputs[i])
+            _write_varint(runs, j - i)
+            count += 1
+            i = j
+        out = bytearray(HEADER.pack(MAGIC, VERSION, self.interval, self.engine.game_map.content_hash,
+                                    self.engine.seed, n, count, len(self.keyframes)))
+        out += runs
+        for frame, blob in self.keyframes:
+            out += KEYFRAME.pack(frame, len(blob))
+            out += blob
+        return bytes(out)
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(self.to_bytes())
+
+class Replay:
+    """A decoded replay: per-frame inputs plus keyframe offsets for seeking."""
+
+    def __init__(self, data):
+        (magic, version, self.interval, self.map_hash, self.seed,
+         self.frames, runs, keyframes) = HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("not a replay file (or unsupported version)")
+        pos = HEADER.size
+        self.inputs = bytearray()
+        for _ in range(runs):
+            code = data[pos]
+            n, pos = _read_varint(data, pos + 1)
+            self.inputs += bytes([code]) * n
+        self.keyframe_frames = []
+        self.keyframe_blobs = []
+        for _ in range(keyframes):
+            frame, size = KEYFRAME.unpack_from(data, pos)
+            pos += KEYFRAME.size
+            self.keyframe_frames.append(frame)
+            self.keyframe_blobs.append(data[pos:pos+size])
+            pos += size
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            return cls(f.read())
+
+    def keyframe_state(self, i):
+        return marshal.loads(zlib.decompress(self.keyframe_blobs[i]))
+
+class ReplayPlayer:
+    """
+    Drives a GameEngine from a Replay. seek(frame) restores the nearest
+    keyframe at or before `frame` and re-simulates only the frames after it.
+    """
+
+    def __init__(self, replay, engine=None):
+        self.replay = replay
+        self.engine = engine if engine is not None else GameEngine(seed=replay.seed)
+        if self.engine.game_map.content_hash != replay.map_hash:
+            raise ValueError("replay was recorded on a different map")
+        if self.engine.seed != replay.seed:
+            raise ValueError("engine seed does not match the replay")
+        self.engine.reset()
+        if replay.keyframe_frames[:1] == [0]:
+            state = replay.keyframe_state(0)
+            if len(state[EngineState._fields.index("ghosts")]) != len(self.engine.ghosts):
+                raise ValueError("replay was recorded with a different number of ghosts")
+            self.engine.restore(state)
+        self.position = 0  # replay frames applied so far
+
+    @property
+    def finished(self):
+        return self.position >= self.replay.frames
+
+    def step(self):
+        """Apply the next recorded input; returns False once the replay is exhausted."""
+        if self.finished:
+            return False
+        action = INPUT_CODES[self.replay.inputs[self.position]]
+        if action == RESET:
+            self.engine.reset()
+        else:
+            self.engine.step(action)
+        self.position += 1
+        return True
+
+    def seek(self, frame):
+        frame = max(0, min(frame, self.replay.frames))
+        k = bisect.bisect_right(self.replay.keyframe_frames, frame) - 1
+        # replaying forward from where we are beats a keyframe behind us
+        if k >= 0 and not (self.position <= frame and self.replay.keyframe_frames[k] <= self.position):
+            self.engine.restore(self.replay.keyframe_state(k))
+            self.position = self.replay.keyframe_frames[k]
+        elif frame < self.position:
+            self.engine.reset()
+            self.position = 0
+        while self.position < frame:
+            self.step()
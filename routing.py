@@ -0,0 +1,115 @@
+# game/routing.py
+from array import array
+from collections import deque
+from game.ghost import neighbors
+
+NO_ROUTE = 0xFF       # next-hop byte for "no path" / "already there"
+UNREACHABLE = 0xFFFF  # distance for "no path"
+
+# next-hop codes, same as the game.direction codes
+STEPS = ((1, 0), (-1, 0), (0, 1), (0, -1))
+
+class RoutingTable:
+    """
+    All-pairs next-hop table over the walkable tiles of a GameMap.
+
+    Built once per map with one BFS per source tile, expanding neighbors in the
+    same order as first_step_bfs(), so first_step() picks the same next hop as
+    that BFS. Walkable tiles are numbered densely; for every (source, target)
+    pair we keep a one-byte next-hop code and a two-byte distance.
+    """
+
+    def __init__(self, game_map):
+        self.cols, self.rows = game_map.cols, game_map.rows
+        self.index = array("i", [-1]) * (self.cols * self.rows)
+        tiles = []
+        for ty in range(self.rows):
+            for tx in range(self.cols):
+                if not game_map.tile_blocked(tx, ty):
+                    self.index[ty*self.cols + tx] = len(tiles)
+                    tiles.append((tx, ty))
+        self.tiles = tiles
+        n = self.size = len(tiles)
+        self.next_hop = bytearray([NO_ROUTE]) * (n * n)
+        self.dist = array("H", [UNREACHABLE]) * (n * n)
+
+        adj = [[self.index[ny*self.cols + nx] for nx, ny in neighbors(game_map, tx, ty)]
+               for tx, ty in tiles]
+        # step code from a tile to each of its neighbors
+        codes = []
+        for (tx, ty), nbs in zip(tiles, adj):
+            row = {}
+            for j in nbs:
+                nx, ny = tiles[j]
+                dx, dy = nx - tx, ny - ty
+                # wrapped neighbors on tunnel rows are one step the other way
+                if dx > 1:
+                    dx = -1
+                elif dx < -1:
+                    dx = 1
+                row[j] = STEPS.index((dx, dy))
+            codes.append(row)
+
+        for s in range(n):
+            self._bfs_from(s, adj, codes[s])
+
+    @classmethod
+    def from_arrays(cls, cols, rows, index, next_hop, dist):
+        """Rebuild a table from its index/next_hop/dist arrays (e.g. a compiled level cache)."""
+        self = object.__new__(cls)
+        self.cols, self.rows = cols, rows
+        self.index = index
+        self.tiles = [(i % cols, i // cols) for i, j in enumerate(index) if j >= 0]
+        self.size = len(self.tiles)
+        self.next_hop = next_hop
+        self.dist = dist
+        return self
+
+    def _bfs_from(self, s, adj, first_codes):
+        base = s * self.size
+        hops, dist = self.next_hop, self.dist
+        dist[base + s] = 0
+        q = deque([s])
+        while q:
+            cur = q.popleft()
+            d = dist[base + cur] + 1
+            hop = hops[base + cur]
+            for nxt in adj[cur]:
+                if dist[base + nxt] == UNREACHABLE:
+                    dist[base + nxt] = d
+                    hops[base + nxt] = first_codes[nxt] if cur == s else hop
+                    q.append(nxt)
+
+    def _pair(self, a, b):
+        ia = self.index[a[1]*self.cols + a[0]] if 0 <= a[0] < self.cols and 0 <= a[1] < self.rows else -1
+        ib = self.index[b[1]*self.cols + b[0]] if 0 <= b[0] < self.cols and 0 <= b[1] < self.rows else -1
+        if ia < 0 or ib < 0:
+            return -1
+        return ia * self.size + ib
+
+    def first_step(self, start, goal):
+        """First step (dx, dy) from start toward goal; None if no path or already there."""
+        k = self._pair(start, goal)
+        if k < 0:
+            return None
+        code = self.next_hop[k]
+        return None if code == NO_ROUTE else STEPS[code]
+
+    def first_code(self, tx, ty, gx, gy):
+        """first_step() as a game.direction code, from tile (tx, ty) to (gx, gy); None if no step."""
+        cols, rows = self.cols, self.rows
+        if not (0 <= tx < cols and 0 <= ty < rows and 0 <= gx < cols and 0 <= gy < rows):
+            return None
+        ia, ib = self.index[ty*cols + tx], self.index[gy*cols + gx]
+        if ia < 0 or ib < 0:
+            return None
+        code = self.next_hop[ia*self.size + ib]
+        return None if code == NO_ROUTE else code
+
+    def distance(self, a, b):
+        """Shortest walking distance in tiles from a to b; None if unreachable."""
+        k = self._pair(a, b)
+        if k < 0:
+            return None
+        d = self.dist[k]
+        return None if d == UNREACHABLE else d
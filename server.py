@@ -0,0 +1,340 @@
+# game/server.py
+import argparse
+import asyncio
+import itertools
+import struct
+import time
+from array import array
+from settings import FPS, MAX_CATCHUP_TICKS
+from game.map import GameMap
+from game.engine import GameEngine
+from game.replay import INPUT_CODES, RESET
+
+# Wire format (little endian). Every message is a u32 body length followed by
+# the body, whose first byte is the message type.
+#
+# client -> server
+#   HELLO   seed i64, ghost count u16 (0 = the map's four; more = swarm mode, at most MAX_GHOSTS)
+#   WATCH   session id u32                      (spectate a running session)
+#   INPUT   input code u8                       (replay.INPUT_CODES)
+#   STATS
+# server -> client
+#   WELCOME session id u32, map sha1 (20 bytes), cols u16, rows u16, tick rate u16 (one game frame per tick), ghosts u16
+#   STATE   frame u32, score i32, lives u8, flags u8, entity count u16, pellet count u32,
+#           then the changed entities, then the tile indices (u32) of pellets eaten since
+#           the previous STATE. An entity is index u16 (0 = Pacman, 1.. = ghosts) + dir u8 +
+#           mode u8 + its move as dx, dy i8 or, with ABSOLUTE set in the index, x, y i32.
+#           With FULL in the flags the STATE restarts the picture: every entity, absolute,
+#           and every pellet eaten from a freshly filled board.
+#   STATS   sessions u32, subscribers u32, overruns u32, busy fraction f64, tick us per session f64
+#           (busy: server process CPU time over wall time, network handling included)
+# A client message of the wrong size for its type, or carrying an unknown input
+# code, is a protocol error and the server drops the connection.
+HELLO, WATCH, INPUT, STATS = 1, 2, 3, 4
+WELCOME, STATE = 1, 2
+
+LENGTH = struct.Struct("<I")
+HELLO_MSG = struct.Struct("<BqH")
+WATCH_MSG = struct.Struct("<BI")
+INPUT_MSG = struct.Struct("<BB")
+WELCOME_MSG = struct.Struct("<BI20sHHHH")
+STATE_HEADER = struct.Struct("<BIiBBHI")
+ENTITY_MOVE = struct.Struct("<HBBbb")
+ENTITY_ABS = struct.Struct("<HBBii")
+STATS_MSG = struct.Struct("<BIIIdd")
+REQUEST_SIZES = {HELLO: HELLO_MSG.size, WATCH: WATCH_MSG.size, INPUT: INPUT_MSG.size, STATS: 1}
+MAX_REQUEST = max(REQUEST_SIZES.values())
+
+GAME_OVER, WON, FULL, FRIGHTENED = 1, 2, 4, 8
+ABSOLUTE = 0x8000
+MODES = ("scatter", "chase", "frightened", "eaten")
+MODE_CODE = {m: i for i, m in enumerate(MODES)}
+
+MAX_GHOSTS = 1000       # most ghosts a HELLO can ask for (swarm mode)
+HIGH_WATER = 64 * 1024  # bytes queued for a subscriber before it is skipped until it drains
+STATS_EVERY = 5.0       # seconds between server log lines
+
+def pack(body):
+    return LENGTH.pack(len(body)) + body
+
+async def read_message(reader, limit=None):
+    """
+    Next message body from `reader`; raises IncompleteReadError at end of
+    stream and ValueError for a body longer than `limit` bytes.
+    """
+    (size,) = LENGTH.unpack(await reader.readexactly(LENGTH.size))
+    if limit is not None and size > limit:
+        raise ValueError(f"message of {size} bytes")
+    return await reader.readexactly(size)
+
+class StateMirror:
+    """
+    Client-side picture of a session rebuilt from WELCOME and STATE messages:
+    entity positions/directions/modes, the set of eaten pellet tiles, frame,
+    score, lives and flags. apply() returns False when a delta arrives out of
+    sequence (a FULL state always resynchronises).
+    """
+
+    def __init__(self, welcome):
+        _, self.session, self.map_hash, self.cols, self.rows, self.tick_rate, ghosts = WELCOME_MSG.unpack(welcome)
+        self.entities = [None] * (ghosts + 1)  # (x, y, dir, mode)
+        self.eaten = set()
+        self.frame = self.score = self.lives = self.flags = 0
+
+    def apply(self, msg):
+        _, frame, self.score, self.lives, self.flags, n, pellets = STATE_HEADER.unpack_from(msg)
+        in_sequence = bool(self.flags & FULL) or frame == self.frame + 1
+        self.frame = frame
+        if self.flags & FULL:
+            self.eaten.clear()
+        pos = STATE_HEADER.size
+        ents = self.entities
+        for _ in range(n):
+            i = msg[pos] | msg[pos + 1] << 8
+            if i & ABSOLUTE:
+                _, d, m, x, y = ENTITY_ABS.unpack_from(msg, pos)
+                ents[i & ~ABSOLUTE] = (x, y, d, m)
+                pos += ENTITY_ABS.size
+            else:
+                _, d, m, dx, dy = ENTITY_MOVE.unpack_from(msg, pos)
+                x, y, _, _ = ents[i]
+                ents[i] = (x + dx, y + dy, d, m)
+                pos += ENTITY_MOVE.size
+        tiles = array("I")
+        tiles.frombytes(msg[pos:pos + 4*pellets])
+        self.eaten.update(tiles)
+        return in_sequence
+
+class Session:
+    """
+    One hosted game and the connections watching it.
+
+    The engine steps once per server tick with the latest input. After each
+    tick a single STATE delta against the previous tick (moved entities,
+    newly eaten pellets) is encoded and written to every subscriber that is
+    keeping up; one that falls behind is skipped and resynchronised with a
+    FULL state once its send buffer drains.
+    """
+
+    def __init__(self, sid, engine, tick_rate=FPS):
+        self.id = sid
+        self.engine = engine
+        self.tick_rate = tick_rate
+        self.subscribers = []  # asyncio.StreamWriter
+        self.stale = set()     # subscribers owed a FULL state
+        self.pending = None    # input for the next tick
+        self.entities = self._entities()
+        self.sent_eaten = len(engine.game_map.eaten)
+        self.map_resets = engine.game_map.resets
+
+    def _entities(self):
+        engine = self.engine
+        pac = engine.pacman
+        return [(pac.x, pac.y, pac.dir, 0)] + [(g.x, g.y, g.dir, MODE_CODE[g.mode]) for g in engine.ghosts]
+
+    def welcome(self):
+        gm = self.engine.game_map
+        return pack(WELCOME_MSG.pack(WELCOME, self.id, gm.content_hash, gm.cols, gm.rows, self.tick_rate,
+                                     len(self.engine.ghosts)))
+
+    def tick(self):
+        action, self.pending = self.pending, None
+        if action == RESET:
+            self.engine.reset()
+        else:
+            self.engine.step(action)
+
+    def _header(self, full, entities, pellets):
+        engine = self.engine
+        pac = engine.pacman
+        flags = ((GAME_OVER if engine.game_over else 0) | (WON if engine.won else 0) | (FULL if full else 0)
+                 | (FRIGHTENED if engine.frightened else 0))
+        return STATE_HEADER.pack(STATE, engine.frame, pac.score, max(0, min(pac.lives, 255)), flags,
+                                 entities, pellets)
+
+    def full_state(self):
+        ents = self.entities
+        body = bytearray()
+        for i, (x, y, d, m) in enumerate(ents):
+            body += ENTITY_ABS.pack(i | ABSOLUTE, d, m, x, y)
+        eaten = self.engine.game_map.eaten
+        body += array("I", eaten).tobytes()
+        return pack(self._header(True, len(ents), len(eaten)) + body)
+
+    def delta(self):
+        """STATE for this tick against the previous one; a FULL state after the board was refilled."""
+        gm = self.engine.game_map
+        cur = self._entities()
+        if gm.resets != self.map_resets:
+            self.map_resets = gm.resets
+            self.entities = cur
+            self.sent_eaten = len(gm.eaten)
+            return self.full_state()
+        body = bytearray()
+        changed = 0
+        for i, (new, old) in enumerate(zip(cur, self.entities)):
+            if new != old:
+                dx, dy = new[0] - old[0], new[1] - old[1]
+                if -128 <= dx < 128 and -128 <= dy < 128:
+                    body += ENTITY_MOVE.pack(i, new[2], new[3], dx, dy)
+                else:
+                    body += ENTITY_ABS.pack(i | ABSOLUTE, new[2], new[3], new[0], new[1])
+                changed += 1
+        self.entities = cur
+        eaten = gm.eaten[self.sent_eaten:]
+        self.sent_eaten = len(gm.eaten)
+        body += array("I", eaten).tobytes()
+        return pack(self._header(False, changed, len(eaten)) + body)
+
+    def broadcast(self):
+        msg = self.delta()
+        for w in self.subscribers:
+            if w.transport.get_write_buffer_size() > HIGH_WATER:
+                self.stale.add(w)
+            elif w in self.stale:
+                self.stale.discard(w)
+                w.write(self.full_state())
+            else:
+                w.write(msg)
+
+class GameServer:
+    """
+    Hosts any number of independent sessions on one asyncio loop.
+
+    Every session plays on a fork of one shared GameMap (walls, adjacency and
+    routes are built once), and a single scheduler task ticks them all at
+    `tick_rate`, catching up at most MAX_CATCHUP_TICKS after a stall. `busy`
+    is the process's CPU time over wall time (ticking, encoding and all the
+    socket work), so sessions / busy is how many sessions one core sustains
+    at this rate; `tick_cost` is the simulation + encoding part per session.
+    """
+
+    def __init__(self, level=None, tick_rate=FPS):
+        self.base_map = GameMap(level)
+        self.tick_rate = tick_rate
+        self.sessions = {}
+        self.ids = itertools.count(1)
+        self.overruns = 0
+        self.busy = 0.0
+        self.tick_cost = 0.0  # seconds per session tick, smoothed
+        self._window = [0.0, 0, time.perf_counter(), time.process_time()]  # tick seconds, session ticks, starts
+
+    def stats(self):
+        subscribers = sum(len(s.subscribers) for s in self.sessions.values())
+        return STATS_MSG.pack(STATS, len(self.sessions), subscribers, self.overruns, self.busy,
+                              self.tick_cost * 1e6)
+
+    def new_session(self, seed, ghosts):
+        ghosts = min(ghosts, MAX_GHOSTS)
+        kwargs = dict(ghost_count=ghosts, ghost_pathing="flow") if ghosts else {}
+        engine = GameEngine(seed=seed, game_map=self.base_map.fork(), **kwargs)
+        session = Session(next(self.ids), engine, self.tick_rate)
+        self.sessions[session.id] = session
+        return session
+
+    def tick_all(self):
+        t = time.perf_counter()
+        for session in self.sessions.values():
+            session.tick()
+            session.broadcast()
+        done = time.perf_counter()
+        window = self._window
+        window[0] += done - t
+        window[1] += len(self.sessions)
+        if done - window[2] >= 1.0:
+            cpu = time.process_time()
+            self.busy = (cpu - window[3]) / (done - window[2])
+            self.tick_cost = window[0] / window[1] if window[1] else 0.0
+            self._window = [0.0, 0, done, cpu]
+
+    async def run_ticks(self):
+        loop = asyncio.get_running_loop()
+        period = 1.0 / self.tick_rate
+        next_tick = loop.time()
+        while True:
+            now = loop.time()
+            due = int((now - next_tick) // period) + 1
+            if due > MAX_CATCHUP_TICKS:
+                # too far behind: run a few ticks and let the games slow down rather than spiral
+                self.overruns += due - MAX_CATCHUP_TICKS
+                next_tick = now - (MAX_CATCHUP_TICKS - 1) * period
+                due = MAX_CATCHUP_TICKS
+            for _ in range(max(due, 0)):
+                self.tick_all()
+            next_tick += max(due, 0) * period
+            await asyncio.sleep(max(0.0, next_tick - loop.time()))
+
+    async def handle(self, reader, writer):
+        session = None
+        try:
+            while True:
+                msg = await read_message(reader, MAX_REQUEST)
+                if not msg or len(msg) != REQUEST_SIZES.get(msg[0]):
+                    break  # protocol error
+                kind = msg[0]
+                if kind == INPUT and session is not None:
+                    code = INPUT_MSG.unpack(msg)[1]
+                    if code >= len(INPUT_CODES):
+                        break
+                    session.pending = INPUT_CODES[code]
+                elif kind == HELLO and session is None:
+                    _, seed, ghosts = HELLO_MSG.unpack(msg)
+                    session = self.new_session(seed, ghosts)
+                    writer.write(session.welcome() + session.full_state())
+                    session.subscribers.append(writer)
+                elif kind == WATCH:
+                    watched = self.sessions.get(WATCH_MSG.unpack(msg)[1])
+                    if watched is None:
+                        break
+                    writer.write(watched.welcome() + watched.full_state())
+                    watched.subscribers.append(writer)
+                elif kind == STATS:
+                    writer.write(pack(self.stats()))
+                else:
+                    break  # protocol error
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            for s in list(self.sessions.values()):
+                if writer in s.subscribers:
+                    s.subscribers.remove(writer)
+                    s.stale.discard(writer)
+            if session is not None:
+                del self.sessions[session.id]  # the player left: the game ends, spectators are dropped
+                for w in session.subscribers:
+                    w.close()
+            writer.close()
+
+    async def log_stats(self, every=STATS_EVERY):
+        while True:
+            await asyncio.sleep(every)
+            print(f"sessions {len(self.sessions):5d}  busy {self.busy:6.1%}  "
+                  f"{self.tick_cost*1e6:7.1f} us/session tick  overruns {self.overruns}", flush=True)
+
+    async def serve(self, host, port, quiet=False):
+        server = await asyncio.start_server(self.handle, host, port)
+        addr = server.sockets[0].getsockname()
+        print(f"listening on {addr[0]}:{addr[1]} at {self.tick_rate} ticks/s", flush=True)
+        tasks = [asyncio.create_task(self.run_ticks())]
+        if not quiet:
+            tasks.append(asyncio.create_task(self.log_stats()))
+        async with server:
+            await server.serve_forever()
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Host many Pac-Man sessions behind a local socket.")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=7777)
+    ap.add_argument("--tick-rate", type=int, default=FPS,
+                    help=f"ticks per second; game time advances one frame per tick, so rates other than {FPS} "
+                         f"play the game slower or faster")
+    ap.add_argument("--level", metavar="PATH", help="level file (default: the classic maze)")
+    ap.add_argument("--quiet", action="store_true", help="no periodic stats lines")
+    args = ap.parse_args(argv)
+    try:
+        asyncio.run(GameServer(args.level, args.tick_rate).serve(args.host, args.port, args.quiet))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
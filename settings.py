@@ -2,14 +2,19 @@
 
 TILE_SIZE = 16
 
-# Map size: 28 cols × 27 rows (see LEVEL_MAP)
+# Map size: 28 cols × 27 rows (see levels/classic.txt)
 COLS = 28
 ROWS = 27
 HUD_HEIGHT = 72
 
 SCREEN_WIDTH = COLS * TILE_SIZE
 SCREEN_HEIGHT = ROWS * TILE_SIZE + HUD_HEIGHT
-FPS = 60
+FPS = 60                # simulation ticks per second (engine time and speeds are per tick)
+RENDER_FPS = 120        # cap on drawn frames per second; entities are interpolated between ticks
+MAX_CATCHUP_TICKS = 5   # most ticks run in one frame after a stall; time beyond that is dropped
+STARTUP_BUDGET_MS = 400 # launch to first drawn frame; main.py warns when startup takes longer
+AUTOPILOT_BUDGET_MS = 4.0  # autopilot search time per frame (main.py --autopilot)
+PIPELINE_DEPTH = 2      # ticks the simulation may run ahead of drawing (main.py --pipeline; 2: double buffering)
 
 # Colors
 BLACK = (0, 0, 0)
@@ -22,7 +27,7 @@ ORANGE = (255, 165, 0)     # Clyde
 BLUE = (0, 0, 255)         # Walls
 HUD_BG = (10, 10, 10)
 
-# Speeds (pixels per frame)
+# Speeds (pixels per tick)
 PACMAN_SPEED = 2
 GHOST_SPEED = 2
 FRIGHTENED_SPEED = 1
@@ -0,0 +1,122 @@
+# game/sprites.py
+import math
+import pygame
+from settings import TILE_SIZE, YELLOW, WHITE
+from game.direction import RIGHT, LEFT, DOWN, UP, NONE, DX, DY
+from game.map import PELLET_RADIUS, PELLET_TILE, POWER_TILE
+from game.ghost import GHOST_COLORS
+
+MOUTH_ANGLES = (0, 20, 40, 55, 40, 20)  # half-opening in degrees over one chomp cycle
+CHOMP_PIXELS = 2                        # pixels travelled per animation frame
+FRIGHTENED_COLOR = (0, 0, 255)
+FRIGHTENED_FACE = (255, 184, 151)
+PUPIL_COLOR = (33, 33, 200)
+CLEAR = (0, 0, 0, 0)
+COLORKEY = (255, 0, 255)  # transparent in the blit-ready sprites; no sprite uses it
+
+def _pacman(surf, code, angle):
+    half = TILE_SIZE // 2
+    pygame.draw.circle(surf, YELLOW, (half, half), half)
+    if angle:
+        # cut the mouth out as a transparent wedge facing `code`
+        facing = math.atan2(DY[code], DX[code])
+        reach = TILE_SIZE
+        a, b = facing - math.radians(angle), facing + math.radians(angle)
+        pygame.draw.polygon(surf, CLEAR, [(half, half),
+                                          (half + reach*math.cos(a), half + reach*math.sin(a)),
+                                          (half + reach*math.cos(facing), half + reach*math.sin(facing)),
+                                          (half + reach*math.cos(b), half + reach*math.sin(b))])
+
+def _eyes(surf, code):
+    t = TILE_SIZE
+    for ex in (t*5 // 16, t*11 // 16):
+        pygame.draw.ellipse(surf, WHITE, (ex - t*3 // 32, t*3 // 16, t*3 // 16, t // 4))
+        pygame.draw.rect(surf, PUPIL_COLOR, (ex - t // 16 + DX[code]*t // 16, t*5 // 16 + DY[code]*t // 16,
+                                             t // 8, t // 8))
+
+def _body(surf, color):
+    t, half = TILE_SIZE, TILE_SIZE // 2
+    pygame.draw.circle(surf, color, (half, half - 1), half - 1)
+    pygame.draw.rect(surf, color, (1, half - 1, t - 2, half - 1))
+    # ragged hem: three notches along the bottom edge
+    step = (t - 2) // 3
+    for i in range(3):
+        x = 1 + i*step + step // 2
+        pygame.draw.polygon(surf, CLEAR, [(x - 2, t - 1), (x, t - 4), (x + 2, t - 1)])
+
+def _frightened(surf):
+    _body(surf, FRIGHTENED_COLOR)
+    t = TILE_SIZE
+    for ex in (t*5 // 16, t*10 // 16):
+        pygame.draw.rect(surf, FRIGHTENED_FACE, (ex, t*5 // 16, t // 8, t // 8))
+    # wavy mouth
+    pts = [(t*3 // 16 + i*t // 8, t*11 // 16 + (i % 2)) for i in range(6)]
+    pygame.draw.lines(surf, FRIGHTENED_FACE, False, pts)
+
+def _pellet(surf, kind):
+    pygame.draw.circle(surf, WHITE, (TILE_SIZE // 2, TILE_SIZE // 2), PELLET_RADIUS[kind])
+
+class SpriteAtlas:
+    """
+    Every entity and pellet image, rasterized once into a single surface.
+
+    Each sprite is a TILE_SIZE cell of the sheet: Pacman's chomp frames per
+    direction, each ghost's body per eye direction, the frightened body,
+    eaten ghosts' eyes and the two pellet kinds. Renderers look sprites up
+    per entity and blit them all in one Surface.blits() batch.
+    """
+
+    def __init__(self):
+        cells = []  # (key, painter)
+        for code in (RIGHT, LEFT, DOWN, UP):
+            for frame, angle in enumerate(MOUTH_ANGLES):
+                cells.append((("pacman", code, frame), lambda s, c=code, a=angle: _pacman(s, c, a)))
+        for name, color in GHOST_COLORS.items():
+            for code in (RIGHT, LEFT, DOWN, UP, NONE):
+                cells.append((("ghost", name, code), lambda s, c=color, d=code: (_body(s, c), _eyes(s, d))))
+        cells.append((("frightened",), _frightened))
+        for code in (RIGHT, LEFT, DOWN, UP, NONE):
+            cells.append((("eyes", code), lambda s, d=code: _eyes(s, d)))
+        for kind in (PELLET_TILE, POWER_TILE):
+            cells.append((("pellet", kind), lambda s, k=kind: _pellet(s, k)))
+
+        per_row = 8
+        rows = (len(cells) + per_row - 1) // per_row
+        sheet = pygame.Surface((per_row*TILE_SIZE, rows*TILE_SIZE), pygame.SRCALPHA)
+        cut = lambda i: ((i % per_row)*TILE_SIZE, (i // per_row)*TILE_SIZE, TILE_SIZE, TILE_SIZE)
+        for i, (_, paint) in enumerate(cells):
+            paint(sheet.subsurface(cut(i)))
+        self.surface = sheet
+        # Sprites have hard edges, so each is cut out as its own colorkeyed,
+        # RLE-encoded surface in the display format: the cheapest kind to blit.
+        self.sprites = {}
+        for i, (key, _) in enumerate(cells):
+            sprite = pygame.Surface((TILE_SIZE, TILE_SIZE))
+            sprite.fill(COLORKEY)
+            sprite.blit(sheet, (0, 0), cut(i))
+            if pygame.display.get_surface() is not None:
+                sprite = sprite.convert()
+            sprite.set_colorkey(COLORKEY, pygame.RLEACCEL)
+            self.sprites[key] = sprite
+
+        sp = self.sprites
+        # hot-path lookup tables
+        self.pacman_frames = [[sp["pacman", c, f] for f in range(len(MOUTH_ANGLES))] for c in (RIGHT, LEFT, DOWN, UP)]
+        self.pacman_idle = sp["pacman", RIGHT, 0]  # mouth shut: the same in every direction
+        self.ghost_bodies = {name: [sp["ghost", name, c] for c in range(5)] for name in GHOST_COLORS}
+        self.frightened = sp["frightened",]
+        self.eyes = [sp["eyes", c] for c in range(5)]
+        self.pellets = {kind: sp["pellet", kind] for kind in (PELLET_TILE, POWER_TILE)}
+
+    def pacman(self, code, x, y):
+        """Pacman facing `code`; the chomp frame follows distance travelled, so it's the same at any frame rate."""
+        if code == NONE:
+            return self.pacman_idle
+        return self.pacman_frames[code][((x + y) // CHOMP_PIXELS) % len(MOUTH_ANGLES)]
+
+    def ghost(self, ghost):
+        if ghost.mode == "frightened":
+            return self.frightened
+        if ghost.mode == "eaten":
+            return self.eyes[ghost.dir]
+        return self.ghost_bodies[ghost.name][ghost.dir]
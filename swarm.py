@@ -0,0 +1,185 @@
+# game/swarm.py
+from array import array
+from settings import TILE_SIZE
+from game.direction import NONE, DX, DY, REVERSE, MASK_CODES
+
+FLOW_RADIUS = 64        # steps the chase field reaches out from Pacman; ghosts beyond it steer greedily
+SPATIAL_HASH_MIN = 16   # ghost count from which GameEngine buckets ghosts for collision tests
+STRIDE = 1 << 16        # bucket key = tx + ty * STRIDE (fits any board, ghosts a little off-board included)
+
+def _edge_tiles(game_map):
+    """Tiles on the left and right edge of tunnel rows: their sideways neighbour wraps around."""
+    cols = game_map.cols
+    return frozenset(i for r in game_map.tunnel_rows for i in (r*cols, r*cols + cols - 1))
+
+class FlowField:
+    """
+    Walking distance from every tile within `radius` steps of one goal tile,
+    shared by all the ghosts heading there: each one reads its next step off
+    the field in O(1) instead of planning a route of its own.
+
+    retarget() recomputes the field only when the goal tile changes. The
+    distance buffer is allocated once and only the tiles the last search
+    reached are cleared, so a recompute costs O(radius^2) however large the
+    map is. radius=None covers the whole map.
+    """
+
+    def __init__(self, game_map, radius=FLOW_RADIUS):
+        self.cols, self.rows = game_map.cols, game_map.rows
+        self.mask = game_map.adjacency
+        self.radius = radius
+        self.dist = array("i", [-1]) * (self.cols * self.rows)
+        self.reached = array("i")  # tile indices set by the last search
+        self.goal = None
+        self.edges = _edge_tiles(game_map)
+
+    @classmethod
+    def from_distances(cls, game_map, goal, dist):
+        """A whole-map field from an existing distance array (e.g. the level's compiled home field)."""
+        field = object.__new__(cls)
+        field.cols, field.rows = game_map.cols, game_map.rows
+        field.mask = game_map.adjacency
+        field.radius = None
+        field.dist = dist
+        field.reached = array("i")
+        field.goal = goal
+        field.edges = _edge_tiles(game_map)
+        return field
+
+    def retarget(self, tx, ty):
+        """Point the field at tile (tx, ty); a no-op when it already is, or when the tile is off the board."""
+        if (tx, ty) == self.goal or not (0 <= tx < self.cols and 0 <= ty < self.rows):
+            return
+        self.goal = (tx, ty)
+        cols, mask, dist, reached = self.cols, self.mask, self.dist, self.reached
+        for i in reached:
+            dist[i] = -1
+        del reached[:]
+        goal = ty*cols + tx
+        limit = self.radius if self.radius is not None else len(dist)
+        offsets = (1, -1, cols, -cols)  # index step per direction code, away from the side edges
+        edges = self.edges
+        dist[goal] = 0
+        reached.append(goal)
+        frontier, d = [goal], 0
+        while frontier and d < limit:
+            d += 1
+            nxt = []
+            for i in frontier:
+                wraps = i in edges
+                for c in MASK_CODES[mask[i]]:
+                    j = self._neighbor(i, c) if wraps else i + offsets[c]
+                    if dist[j] < 0:
+                        dist[j] = d
+                        nxt.append(j)
+            reached.extend(nxt)
+            frontier = nxt
+
+    def _neighbor(self, i, c):
+        cols = self.cols
+        nx = i % cols + DX[c]
+        j = i + DX[c] + DY[c]*cols
+        if nx < 0:
+            j += cols
+        elif nx >= cols:
+            j -= cols
+        return j
+
+    def step(self, tx, ty, forbid=NONE):
+        """
+        Downhill direction code from tile (tx, ty), avoiding the reverse of
+        `forbid` unless it's the only way; None outside the field.
+        """
+        if not (0 <= tx < self.cols and 0 <= ty < self.rows):
+            return None
+        cols, dist = self.cols, self.dist
+        i = ty*cols + tx
+        d = dist[i]
+        if d <= 0:
+            return None
+        back = REVERSE[forbid]
+        best, best_d, fallback = None, d + 2, None
+        offsets = (1, -1, cols, -cols)
+        wraps = i in self.edges
+        for c in MASK_CODES[self.mask[i]]:
+            j = self._neighbor(i, c) if wraps else i + offsets[c]
+            dj = dist[j]
+            if dj < 0:
+                continue
+            if c == back:
+                fallback = c
+            elif dj < best_d:
+                best, best_d = c, dj
+        return best if best is not None else fallback
+
+class SwarmFields:
+    """
+    The shared fields of a swarm game: `chase` toward Pacman's tile (radius
+    limited, recomputed when Pacman changes tile) and `home` toward the ghost
+    home tile for eaten ghosts (whole map, built once per level).
+    """
+
+    def __init__(self, game_map, radius=FLOW_RADIUS):
+        self.game_map = game_map
+        self.chase = FlowField(game_map, radius)
+        level = game_map.level
+        if level._home_flow is None:
+            if level.home_field is not None:
+                dist = array("i")
+                dist.frombytes(level.home_field)
+            else:
+                from game.pathfind import distance_field
+                dist = distance_field(level, *level.home_tile)
+            level._home_flow = FlowField.from_distances(game_map, level.home_tile, dist)
+        self.home = level._home_flow
+
+class SpatialHash:
+    """
+    Ghosts bucketed by tile for Pacman collision tests.
+
+    A ghost files itself (move()) on the frames it is grid-aligned and on
+    tunnel wraps, not every tick. Collidable ghosts move 1 or 2 pixels a
+    tick, which divides TILE_SIZE, so between those frames a ghost is never
+    more than a tile from the tile it is filed under; near() therefore looks
+    at the 5 x 5 buckets around a position. Eaten ghosts (3 pixels a tick,
+    so they can drift off the grid) may be filed stale, but they don't
+    collide. Positions set from outside (restore) need a fresh SpatialHash.
+    """
+
+    def __init__(self, ghosts):
+        self.buckets = {}
+        self.keys = []
+        self.index = {}
+        for i, g in enumerate(ghosts):
+            key = g.x // TILE_SIZE + g.y // TILE_SIZE * STRIDE
+            self.keys.append(key)
+            self.index[id(g)] = i
+            self.buckets.setdefault(key, set()).add(i)
+            g.spatial = self
+
+    def move(self, ghost):
+        """Re-file `ghost` under the tile it is on now."""
+        i = self.index[id(ghost)]
+        key = ghost.x // TILE_SIZE + ghost.y // TILE_SIZE * STRIDE
+        old = self.keys[i]
+        if key != old:
+            buckets = self.buckets
+            bucket = buckets[old]
+            bucket.discard(i)
+            if not bucket:
+                del buckets[old]
+            buckets.setdefault(key, set()).add(i)
+            self.keys[i] = key
+
+    def near(self, x, y):
+        """Indices, in ghost order, of the ghosts that may overlap a TILE_SIZE square at pixel (x, y)."""
+        centre = x // TILE_SIZE + y // TILE_SIZE * STRIDE
+        found = []
+        get = self.buckets.get
+        for row in range(centre - 2*STRIDE, centre + 3*STRIDE, STRIDE):
+            for key in range(row - 2, row + 3):
+                bucket = get(key)
+                if bucket:
+                    found.extend(bucket)
+        found.sort()
+        return found
@@ -0,0 +1,14 @@
+# tests/conftest.py
+import os
+import sys
+import types
+
+# The modules live at the repository root and import each other as the `game`
+# package (and `settings` at top level), so expose the root under both names.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+if "game" not in sys.modules:
+    game = types.ModuleType("game")
+    game.__path__ = [ROOT]
+    sys.modules["game"] = game
@@ -0,0 +1,15 @@
+# tests/test_batch.py
+import pytest
+from game.batch import check_consistency
+from game.level import level_from_lines
+from game.map import GameMap
+from game.mazegen import generate_level
+
+@pytest.mark.parametrize("seed", [0, 1, 2, 3])
+def test_batch_matches_engine(seed):
+    assert check_consistency(games=8, frames=2000, seed=seed) == []
+
+@pytest.mark.parametrize("maze_seed", [5, 11])
+def test_batch_matches_engine_on_generated_maze(maze_seed):
+    game_map = GameMap(level_from_lines(generate_level(41, 35, seed=maze_seed)))
+    assert check_consistency(games=8, frames=2000, seed=maze_seed, game_map=game_map) == []
@@ -0,0 +1,44 @@
+# tests/test_engine.py
+import random
+from game.engine import GameEngine
+from game.profiler import FrameProfiler
+
+MOVES = ("UP", "DOWN", "LEFT", "RIGHT")
+
+def wander(seed):
+    """A seeded policy turning somewhere new every 12 frames, so games differ and pellets get eaten."""
+    rng = random.Random(seed)
+    def policy(engine):
+        return rng.choice(MOVES) if engine.frame % 12 == 0 else None
+    return policy
+
+def test_restore_rewinds_to_the_snapshot():
+    engine = GameEngine(seed=3)
+    engine.run(400, wander(1))
+    state = engine.snapshot()
+    engine.run(300, wander(2))
+    ahead = engine.snapshot()
+    assert ahead != state
+    engine.restore(state)
+    assert engine.snapshot() == state
+    # and the game replays identically from there
+    engine.run(300, wander(2))
+    assert engine.snapshot() == ahead
+
+def test_clone_does_not_share_state():
+    engine = GameEngine(seed=7, profiler=FrameProfiler())
+    engine.run(200, wander(4))
+    state = engine.snapshot()
+    pellets = bytes(engine.game_map.pellet_grid)
+    other = engine.clone()
+    assert other.snapshot() == state
+    assert other.profiler is None and all(g.profiler is None for g in other.ghosts)
+    other.run(500, wander(5))
+    assert other.snapshot() != state
+    assert engine.snapshot() == state
+    assert bytes(engine.game_map.pellet_grid) == pellets
+    # the clone's moves came from its own rng copy; the source still plays the same game
+    twin = engine.clone()
+    engine.run(300, wander(6))
+    twin.run(300, wander(6))
+    assert twin.snapshot() == engine.snapshot()
@@ -0,0 +1,60 @@
+# tests/test_events.py
+import random
+from types import SimpleNamespace
+from game import events
+from game.engine import GameEngine
+from game.events import Event, EventLog, heatmap_text, level_stats, read_events
+
+LEVEL = (bytes(range(20)), 28, 31)
+
+def fake_engine(frame, seed, ghosts):
+    game_map = SimpleNamespace(content_hash=LEVEL[0], cols=LEVEL[1], rows=LEVEL[2])
+    return SimpleNamespace(game_map=game_map, frame=frame, seed=seed, ghosts=[None] * ghosts)
+
+def test_write_read_round_trip(tmp_path):
+    path = tmp_path / "events.pmev"
+    expected = [
+        Event(0, events.START, 0, 4, 42, LEVEL),
+        Event(3, events.PELLET, 0, 0, 57, LEVEL),
+        Event(9, events.POWER, 0, 0, 58, LEVEL),
+        Event(9, events.FRIGHTENED, 0, 0, 58, LEVEL),
+        Event(15, events.GHOST_EATEN, 1, 2, 300, LEVEL),
+        Event(70000, events.GAME_OVER, 0, 0, 123456, LEVEL),
+    ]
+    with EventLog(str(path), flush_bytes=16) as log:
+        log.start(fake_engine(0, 42, 4))
+        for ev in expected[1:]:
+            log.emit(ev.frame, ev.kind, ev.detail, ev.ghost, ev.value)
+    # appending starts a second game without another header
+    with EventLog(path) as log:
+        log.start(fake_engine(0, 43, 4))
+        log.emit(5, events.DEATH, 2, 1, 90)
+    expected += [Event(0, events.START, 0, 4, 43, LEVEL), Event(5, events.DEATH, 2, 1, 90, LEVEL)]
+
+    assert list(read_events(path)) == expected
+    # records (and the level after a START) split across read chunks
+    for chunk in (1, 7, 12, 23):
+        assert list(read_events(path, chunk=chunk)) == expected
+
+def test_stats_from_a_logged_game(tmp_path):
+    path = tmp_path / "game.pmev"
+    rng = random.Random(2)
+    with EventLog(path) as log:
+        engine = GameEngine(seed=2, events=log)
+        gm = engine.game_map
+        engine.run(20000, lambda e: rng.choice(("UP", "DOWN", "LEFT", "RIGHT")) if e.frame % 10 == 0 else None)
+    assert engine.game_over
+
+    (stats,) = level_stats(read_events(path)).values()
+    assert (stats.digest, stats.cols, stats.rows) == (gm.content_hash, gm.cols, gm.rows)
+    s = stats.summary()
+    assert (s["games"], s["finished"]) == (1, 1)
+    assert s["mean_score"] == engine.pacman.score
+    assert s["pellets"] + s["powers"] == sum(stats.pellets) == len(gm.eaten)
+    assert all(stats.pellets[i] == 1 for i in gm.eaten)
+    assert sum(stats.deaths) == s["deaths_per_game"] == 3
+
+    lines = heatmap_text(stats.pellets, stats.cols, stats.rows).split("\n")
+    assert len(lines) == gm.rows and all(len(line) == gm.cols for line in lines)
+    for i, n in enumerate(stats.pellets):
+        assert (lines[i // gm.cols][i % gm.cols] != " ") == (n > 0)
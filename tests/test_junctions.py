@@ -0,0 +1,33 @@
+# tests/test_junctions.py
+from collections import Counter
+from game.direction import MASK_CODES
+from game.junctions import BIT_COUNT
+from game.map import GameMap
+
+def test_nodes_are_the_decision_points():
+    gm = GameMap()
+    graph = gm.junctions
+    for i in range(gm.cols * gm.rows):
+        walkable = not gm.wall_bytes[i]
+        assert (graph.node_of[i] >= 0) == (walkable and BIT_COUNT[gm.adjacency[i]] != 2)
+    for n, (tx, ty) in enumerate(graph.nodes):
+        assert graph.node_of[ty*gm.cols + tx] == n
+        assert tuple(code for code, _, _, _ in graph.edges[n]) == MASK_CODES[gm.adjacency[ty*gm.cols + tx]]
+
+def test_corridors_join_both_ends():
+    gm = GameMap()
+    graph = gm.junctions
+    out = Counter((a, b, length, wraps) for a, edges in enumerate(graph.edges) for _, b, length, wraps in edges)
+    back = Counter((b, a, length, wraps) for (a, b, length, wraps), k in out.items() for _ in range(k))
+    assert out == back
+    # each corridor tile lies on one corridor, walked once from each end
+    corridor_tiles = sum(1 for i in range(gm.cols * gm.rows) if not gm.wall_bytes[i] and graph.node_of[i] < 0)
+    assert sum(length - 1 for edges in graph.edges for _, _, length, _ in edges) == 2 * corridor_tiles
+
+def test_corridor_lengths_match_shortest_paths():
+    gm = GameMap()
+    graph = gm.junctions
+    for a, edges in enumerate(graph.edges):
+        for _, b, length, _ in edges:
+            d = gm.routes.distance(graph.nodes[a], graph.nodes[b])
+            assert d is not None and d <= length
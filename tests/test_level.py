@@ -0,0 +1,66 @@
+# tests/test_level.py
+import marshal
+import pytest
+from game import level
+from game.mazegen import generate_level
+
+LINES = generate_level(21, 19, seed=4)
+
+@pytest.fixture
+def compiles(tmp_path, monkeypatch):
+    """Cache into a fresh dir with an empty in-process cache; returns the list of compile_level() calls."""
+    monkeypatch.setattr(level, "CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(level, "_compiled", {})
+    calls = []
+    compile_level = level.compile_level
+    def counting(lines):
+        calls.append(lines)
+        return compile_level(lines)
+    monkeypatch.setattr(level, "compile_level", counting)
+    return calls
+
+def cache_files(tmp_path):
+    return sorted(p.name for p in tmp_path.iterdir())
+
+def test_disk_cache_hit(compiles, tmp_path):
+    first = level.level_from_lines(LINES)
+    assert len(compiles) == 1
+    assert level.level_from_lines(LINES) is first  # in-process cache
+    (name,) = cache_files(tmp_path)
+    assert name.endswith(f"-{level.compiler_hash().hex()[:12]}.pml")
+
+    level._compiled.clear()
+    loaded = level.level_from_lines(LINES)
+    assert len(compiles) == 1
+    assert loaded is not first
+    for field in level.CompiledLevel.FIELDS:
+        assert getattr(loaded, field) == getattr(first, field), field
+
+@pytest.mark.parametrize("data", [
+    b"not a compiled level",
+    b"",
+    marshal.dumps((level.FORMAT_VERSION - 1, b"old", 3, 4)),
+])
+def test_unreadable_cache_recompiles(compiles, tmp_path, data):
+    level.level_from_lines(LINES)
+    (path,) = tmp_path.iterdir()
+    path.write_bytes(data)
+
+    level._compiled.clear()
+    recompiled = level.level_from_lines(LINES)
+    assert len(compiles) == 2
+    assert recompiled.content_hash == level.level_hash(LINES)
+    # and the bad file was replaced with a good one
+    assert level.CompiledLevel.from_bytes(path.read_bytes()).content_hash == recompiled.content_hash
+
+def test_compiler_change_gets_a_new_key(compiles, tmp_path, monkeypatch):
+    level.level_from_lines(LINES)
+    before = cache_files(tmp_path)
+    assert level.compiler_hash() == level.compiler_hash()
+
+    monkeypatch.setattr(level, "_compiler_digest", bytes(20))
+    level._compiled.clear()
+    level.level_from_lines(LINES)
+    assert len(compiles) == 2
+    after = cache_files(tmp_path)
+    assert len(after) == 2 and set(before) < set(after)
@@ -0,0 +1,33 @@
+# tests/test_replay.py
+import random
+from game.engine import GameEngine
+from game.replay import Replay, ReplayPlayer, ReplayRecorder
+
+MOVES = ("UP", "DOWN", "LEFT", "RIGHT")
+
+def record(frames, seed, interval):
+    """A seeded wandering game, restarted (as with R) whenever it ends."""
+    rng = random.Random(seed)
+    recorder = ReplayRecorder(GameEngine(seed=seed), interval=interval)
+    for n in range(frames):
+        if recorder.engine.game_over:
+            recorder.reset()
+        else:
+            recorder.step(rng.choice(MOVES) if n % 10 == 0 else None)
+    return Replay(recorder.to_bytes())
+
+def test_seek_matches_a_straight_replay():
+    replay = record(1500, seed=9, interval=200)  # game over and restart at frame 853
+    straight = ReplayPlayer(replay)
+    states = [straight.engine.snapshot()]
+    while straight.step():
+        states.append(straight.engine.snapshot())
+    assert len(states) == replay.frames + 1
+
+    player = ReplayPlayer(replay)
+    # forward within a keyframe span, across spans, back past keyframes, onto
+    # a keyframe, around the reset and to both ends
+    for frame in (150, 170, 1234, 1000, 400, 399, 600, 854, 852, 0, 1500, 7):
+        player.seek(frame)
+        assert player.position == frame
+        assert player.engine.snapshot() == states[frame], frame
@@ -0,0 +1,70 @@
+# game/timers.py
+import heapq
+
+class Scheduler:
+    """
+    One-shot timers in game time (ms), kept in a binary heap ordered by due
+    time, ties in the order they were set. The owner polls due(now) once per
+    frame, which costs a comparison when nothing is due; all other work is
+    per timer fired.
+
+    Timers are plain (time, seq, kind, arg) tuples of ints, so state() is a
+    value that snapshots, replays and clones can hold, and load() puts it
+    back. There is no cancel: an owner that may supersede a timer checks on
+    firing whether it still applies (the engine compares a frightened
+    timer's time with the current frightened_until).
+    """
+
+    def __init__(self):
+        self.heap = []
+        self.seq = 0  # set order, so timers due together fire in the order they were set
+
+    def __len__(self):
+        return len(self.heap)
+
+    def at(self, time, kind, arg=0):
+        """Fire `kind` (with `arg`) once the clock reaches `time`."""
+        heapq.heappush(self.heap, (time, self.seq, kind, arg))
+        self.seq += 1
+
+    def next_time(self):
+        """Due time of the earliest timer, None when there is none."""
+        return self.heap[0][0] if self.heap else None
+
+    def due(self, now):
+        """
+        Yield (time, kind, arg) for each timer due by `now`, earliest first,
+        removing them. Timers set while iterating fire in the same pass when
+        they are due too, so a clock that jumps ahead (a fast-forward, a stall
+        of a real-time clock) fires every timer in between in order, each
+        with its own due time for the owner to re-arm periodic timers from.
+        """
+        heap = self.heap
+        while heap and heap[0][0] <= now:
+            time, _, kind, arg = heapq.heappop(heap)
+            yield time, kind, arg
+
+    def shift(self, delta):
+        """Move every pending timer `delta` ms later (resuming a paused real-time clock)."""
+        # a uniform shift keeps the heap ordered
+        self.heap = [(time + delta, seq, kind, arg) for time, seq, kind, arg in self.heap]
+
+    def pending(self, kind):
+        """Args of the pending timers of `kind`."""
+        return [arg for _, _, k, arg in self.heap if k == kind]
+
+    def state(self):
+        return self.seq, tuple(self.heap)
+
+    def load(self, state):
+        self.seq, heap = state
+        self.heap = list(heap)  # a heap's list order is itself a valid heap
+
+    def copy(self):
+        other = Scheduler()
+        other.seq, other.heap = self.seq, list(self.heap)
+        return other
+
+    def clear(self):
+        self.heap.clear()
+        self.seq = 0
@@ -0,0 +1,200 @@
+# game/tournament.py
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+from settings import TILE_SIZE
+from game.map import GameMap
+from game.engine import GameEngine
+from game.ghost import GHOST_ORDER
+from game.routing import STEPS
+from game.autopilot import Autopilot
+
+MAX_FRAMES = 20000
+
+# ghost AI variants under test: personalities per spawn + steering
+GHOST_VARIANTS = {
+    "classic": dict(ghost_names=GHOST_ORDER, ghost_pathing="greedy"),
+    "classic-bfs": dict(ghost_names=GHOST_ORDER, ghost_pathing="bfs"),
+    "blinky-pack": dict(ghost_names=("blinky",) * 4, ghost_pathing="greedy"),
+    "blinky-pack-bfs": dict(ghost_names=("blinky",) * 4, ghost_pathing="bfs"),
+}
+
+STEP_ACTIONS = {(0, -1): "UP", (0, 1): "DOWN", (-1, 0): "LEFT", (1, 0): "RIGHT"}
+
+# --------- Pacman policies ---------------------------------------------------
+# A policy factory takes a seed and returns policy(engine) -> action or None.
+
+def random_policy(seed):
+    """Pick a new random direction every 15 frames."""
+    rng = random.Random(seed)
+    actions = list(STEP_ACTIONS.values())
+    return lambda engine: rng.choice(actions) if engine.frame % 15 == 0 else None
+
+def greedy_pellet_policy(seed):
+    """At each tile, head one step along the shortest path to the nearest pellet."""
+    def policy(engine):
+        pac = engine.pacman
+        if pac.x % TILE_SIZE or pac.y % TILE_SIZE:
+            return None
+        gm = engine.game_map
+        here = pac.tile()
+        best, bestdist = None, None
+        for tx, ty, _ in gm.pellet_tiles():
+            d = gm.routes.distance(here, (tx, ty))
+            if d is not None and (bestdist is None or d < bestdist):
+                best, bestdist = (tx, ty), d
+        if best is None:
+            return None
+        step = gm.routes.first_step(here, best)
+        return STEP_ACTIONS[step] if step is not None else None
+    return policy
+
+def cautious_policy(seed):
+    """Greedy pellet chasing, but turn away when a dangerous ghost is within 4 tiles."""
+    greedy = greedy_pellet_policy(seed)
+    def policy(engine):
+        pac = engine.pacman
+        if pac.x % TILE_SIZE or pac.y % TILE_SIZE:
+            return None
+        gm = engine.game_map
+        here = pac.tile()
+        near = []
+        for g in engine.ghosts:
+            if g.mode in ("scatter", "chase"):
+                d = gm.routes.distance(here, g.tile())
+                if d is not None and d <= 4:
+                    near.append(g.tile())
+        if not near:
+            return greedy(engine)
+        best, bestscore = None, -1
+        for dx, dy in STEPS:
+            nxt = (here[0] + dx, here[1] + dy)
+            if gm.tile_blocked(*nxt):
+                continue
+            score = min(gm.routes.distance(nxt, t) or 0 for t in near)
+            if score > bestscore:
+                best, bestscore = (dx, dy), score
+        return STEP_ACTIONS[best] if best is not None else None
+    return policy
+
+AUTOPILOT_MS = 1.0  # search time per frame for the autopilot policy
+
+def autopilot_policy(seed):
+    """The MCTS autopilot (opt-in: it searches AUTOPILOT_MS every frame, so a game takes a while)."""
+    return Autopilot(AUTOPILOT_MS)
+
+POLICIES = {
+    "random": random_policy,
+    "greedy": greedy_pellet_policy,
+    "cautious": cautious_policy,
+    "autopilot": autopilot_policy,
+}
+DEFAULT_POLICIES = ("random", "greedy", "cautious")
+
+# --------- workers -------------------------------------------------------------
+_worker_map = None
+
+def _init_worker():
+    """Build the one GameMap (and its routing table) this worker reuses for every game."""
+    global _worker_map
+    _worker_map = GameMap()
+    _worker_map.routes
+
+def run_game(task):
+    """Play one seeded headless game; returns its result record."""
+    variant, policy_name, seed, max_frames = task
+    game_map = _worker_map if _worker_map is not None else GameMap()
+    engine = GameEngine(game_map=game_map, seed=seed, **GHOST_VARIANTS[variant])
+    frames = engine.run(max_frames, POLICIES[policy_name](seed))
+    return {
+        "variant": variant,
+        "policy": policy_name,
+        "seed": seed,
+        "score": engine.pacman.score,
+        "lives_lost": 3 - max(0, engine.pacman.lives),
+        "frames": frames,
+        "ghosts_eaten": engine.ghosts_eaten,
+        "won": engine.won,
+    }
+
+def run_tournament(variants, policies, games, workers=None, max_frames=MAX_FRAMES, seed=0):
+    """Yield result records as the games finish, spread over a process pool."""
+    tasks = [(v, p, seed + i, max_frames) for v in variants for p in policies for i in range(games)]
+    workers = workers or os.cpu_count() or 1
+    chunk = max(1, len(tasks) // (workers * 8))
+    with multiprocessing.Pool(workers, initializer=_init_worker) as pool:
+        yield from pool.imap_unordered(run_game, tasks, chunksize=chunk)
+
+# --------- aggregation ---------------------------------------------------------
+FIELDS = ("score", "lives_lost", "frames", "ghosts_eaten")
+
+class Summary:
+    """Running per-(variant, policy) sums, so results can be folded in as they stream."""
+
+    def __init__(self):
+        self.count = defaultdict(int)
+        self.wins = defaultdict(int)
+        self.sums = defaultdict(lambda: dict.fromkeys(FIELDS, 0))
+        self.squares = defaultdict(lambda: dict.fromkeys(FIELDS, 0))
+
+    def add(self, result):
+        key = (result["variant"], result["policy"])
+        self.count[key] += 1
+        self.wins[key] += result["won"]
+        for f in FIELDS:
+            self.sums[key][f] += result[f]
+            self.squares[key][f] += result[f] ** 2
+
+    def rows(self):
+        for key in sorted(self.count):
+            n = self.count[key]
+            mean = {f: self.sums[key][f] / n for f in FIELDS}
+            sd = math.sqrt(max(0.0, self.squares[key]["score"] / n - mean["score"] ** 2))
+            yield key, n, mean, sd, self.wins[key] / n
+
+    def table(self):
+        head = f"{'variant':<16}{'policy':<10}{'games':>7}{'score':>10}{'±sd':>9}{'lives':>7}{'frames':>9}{'ghosts':>8}{'win%':>7}"
+        lines = [head, "-" * len(head)]
+        for (variant, policy), n, mean, sd, winrate in self.rows():
+            lines.append(f"{variant:<16}{policy:<10}{n:>7}{mean['score']:>10.1f}{sd:>9.1f}"
+                         f"{mean['lives_lost']:>7.2f}{mean['frames']:>9.0f}{mean['ghosts_eaten']:>8.2f}"
+                         f"{100 * winrate:>7.1f}")
+        return "\n".join(lines)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Seeded headless Pac-Man tournament across CPU cores.")
+    ap.add_argument("--games", type=int, default=100, help="games per variant/policy pair")
+    ap.add_argument("--variants", nargs="+", default=list(GHOST_VARIANTS), choices=list(GHOST_VARIANTS))
+    ap.add_argument("--policies", nargs="+", default=list(DEFAULT_POLICIES), choices=list(POLICIES))
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--max-frames", type=int, default=MAX_FRAMES)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", help="append each result as a JSON line to this file")
+    args = ap.parse_args(argv)
+
+    summary = Summary()
+    out = open(args.out, "a") if args.out else None
+    total = args.games * len(args.variants) * len(args.policies)
+    start = time.perf_counter()
+    try:
+        for done, result in enumerate(run_tournament(args.variants, args.policies, args.games,
+                                                     args.workers, args.max_frames, args.seed), 1):
+            summary.add(result)
+            if out:
+                out.write(json.dumps(result) + "\n")
+            print(f"\r{done}/{total} games", end="", file=sys.stderr, flush=True)
+    finally:
+        if out:
+            out.close()
+    elapsed = time.perf_counter() - start
+    print(f"\r{total} games in {elapsed:.1f}s ({total / elapsed:.1f} games/s)", file=sys.stderr)
+    print(summary.table())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,317 @@
+# game/wall.py
+import argparse
+import math
+import multiprocessing
+import os
+import sys
+import time
+from multiprocessing import shared_memory
+import numpy as np
+from settings import TILE_SIZE, FPS, RENDER_FPS, MAX_CATCHUP_TICKS, WHITE, HUD_BG
+from game.map import GameMap
+from game.engine import GameEngine
+from game.tournament import POLICIES
+
+GAMES = 16
+SCALE = 0.5        # tile size relative to the board's pixels
+BUFFERS = 3        # pixel buffers per game: one being drawn, one published, one being composited
+CAPTION = 18       # pixels under each tile for its caption
+BYTES_PER_PIXEL = 4
+
+# per-game header columns (int64) in shared memory
+FIELDS = ("latest", "reading", "published", "score", "lives", "played", "busy_ns")
+LATEST, READING, PUBLISHED, SCORE, LIVES, PLAYED, BUSY_NS = range(len(FIELDS))
+
+class WallBuffers:
+    """
+    The wall's shared memory: a header row per game, then BUFFERS frames of
+    `size` RGBX pixels per game. The display process creates it (name=None);
+    workers attach to it by name.
+
+    A game's buffers rotate without copying: its worker draws into a buffer
+    that is neither the latest published one nor the one the display is
+    reading, then publishes it as latest; the display claims the latest as
+    the one it reads. Only those two index swaps happen under the lock, so
+    neither side ever waits for the other to draw or composite, and a
+    display that falls behind just skips frames.
+    """
+
+    def __init__(self, games, size, name=None):
+        self.games, self.size = games, size
+        self.frame_bytes = size[0] * size[1] * BYTES_PER_PIXEL
+        self.header_bytes = games * len(FIELDS) * 8
+        total = self.header_bytes + games * BUFFERS * self.frame_bytes
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=total)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.name = self.shm.name
+        self.header = np.ndarray((games, len(FIELDS)), dtype=np.int64, buffer=self.shm.buf)
+        if name is None:
+            self.header[:] = 0
+            self.header[:, LATEST] = self.header[:, READING] = -1
+
+    def pixels(self, game, i):
+        """Buffer `i` of `game`, as a memoryview into the shared block."""
+        start = self.header_bytes + (game * BUFFERS + i) * self.frame_bytes
+        return self.shm.buf[start:start + self.frame_bytes]
+
+    def surfaces(self, game):
+        """Surfaces over the game's buffers (zero-copy: they draw and read the shared pixels)."""
+        import pygame
+        return [pygame.image.frombuffer(self.pixels(game, i), self.size, "RGBX") for i in range(BUFFERS)]
+
+    def close(self):
+        """Detach (drop the surfaces made by surfaces() first: they hold the block's memory)."""
+        self.header = None
+        self.shm.close()
+
+    def unlink(self):
+        self.shm.unlink()
+
+def _free_buffer(drawn, reading):
+    """A buffer that is neither the one just published nor the one being read."""
+    for i in range(BUFFERS):
+        if i != drawn and i != reading:
+            return i
+
+def run_worker(name, games, size, first, count, lock, stop, policy, seed, tick_rate):
+    """
+    Worker process: simulate games first..first+count-1 and draw each tick
+    of each into its shared buffers. Runs at `tick_rate` ticks per second
+    (0: as fast as it can) until `stop` is set; finished games restart with
+    the next seed.
+    """
+    os.environ["SDL_VIDEODRIVER"] = "dummy"
+    import pygame
+    from game.render import MazeLayer, draw_board
+    from game.sprites import SpriteAtlas
+    pygame.display.init()
+    pygame.display.set_mode((1, 1))  # sprites and layers convert to the display format
+    bufs = WallBuffers(games, size, name)
+    head = bufs.header
+    surfaces = [bufs.surfaces(g) for g in range(first, first + count)]
+    like = surfaces[0][0]
+    base = GameMap()
+    base.routes
+    board_size = (base.cols * TILE_SIZE, base.rows * TILE_SIZE)
+    board = pygame.Surface(board_size, 0, like) if board_size != size else None
+    atlas = SpriteAtlas()
+    layers = [MazeLayer(atlas, like=like) for _ in range(count)]
+    engines = [GameEngine(game_map=base.fork(), seed=seed + first + k) for k in range(count)]
+    policies = [POLICIES[policy](seed + first + k) for k in range(count)]
+    back = [0] * count  # the buffer each game draws into next
+    tick = 1 / tick_rate if tick_rate else 0.0
+    due = time.perf_counter()
+    try:
+        while not stop.is_set():
+            for k, engine in enumerate(engines):
+                g = first + k
+                row = head[g]
+                start = time.perf_counter_ns()
+                if engine.game_over:
+                    row[PLAYED] += 1
+                    engine.seed = seed + first + k + int(row[PLAYED]) * games
+                    engine.reset()
+                    policies[k] = POLICIES[policy](engine.seed)
+                else:
+                    engine.step(policies[k](engine))
+                out = surfaces[k][back[k]]
+                if board is None:
+                    draw_board(out, layers[k], atlas, engine)
+                else:
+                    draw_board(board, layers[k], atlas, engine)
+                    pygame.transform.scale(board, size, out)
+                with lock:
+                    row[LATEST] = back[k]
+                    back[k] = _free_buffer(back[k], row[READING])
+                row[PUBLISHED] += 1
+                row[SCORE], row[LIVES] = engine.pacman.score, engine.pacman.lives
+                row[BUSY_NS] += time.perf_counter_ns() - start
+            if tick:
+                due += tick
+                wait = due - time.perf_counter()
+                if wait > 0:
+                    time.sleep(wait)
+                elif wait < -MAX_CATCHUP_TICKS * tick:
+                    due = time.perf_counter()  # too slow for the tick rate: carry on from now
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # numpy rows and surfaces over the block hold its memory; drop them before detaching
+        row = out = like = layers = surfaces = head = None
+        bufs.close()
+
+class SpectatorWall:
+    """
+    Many headless games on one screen. Worker processes simulate and draw
+    their games into a WallBuffers block; this (display) process composites
+    each game's latest frame into a grid, blitting straight from surfaces
+    over the shared pixels, and only the tiles that changed are updated.
+    Workers never wait for the display: a slow display shows fewer of the
+    frames each game produces (see stats()).
+    """
+
+    def __init__(self, games=GAMES, workers=None, scale=SCALE, policy="greedy", seed=0, tick_rate=FPS, cols=None):
+        gm = GameMap()
+        self.games = games
+        self.workers = max(1, min(workers or os.cpu_count() or 1, games))
+        self.size = (max(1, round(gm.cols * TILE_SIZE * scale)), max(1, round(gm.rows * TILE_SIZE * scale)))
+        self.cols = cols or math.ceil(math.sqrt(games))
+        self.rows = math.ceil(games / self.cols)
+        self.policy, self.seed, self.tick_rate = policy, seed, tick_rate
+        self.buffers = self.surfaces = None
+        self.procs, self.locks = [], []
+        self.shown = [0] * games
+        self.started = None
+
+    @property
+    def screen_size(self):
+        w, h = self.size
+        return self.cols * w, self.rows * (h + CAPTION)
+
+    def cell(self, game):
+        """Top-left pixel of a game's tile on the wall."""
+        w, h = self.size
+        return game % self.cols * w, game // self.cols * (h + CAPTION)
+
+    def start(self):
+        # spawn, not fork: the workers start their own SDL rather than a copy of this one's
+        ctx = multiprocessing.get_context("spawn")
+        self.buffers = WallBuffers(self.games, self.size)
+        self.surfaces = [self.buffers.surfaces(g) for g in range(self.games)]
+        self.stop_event = ctx.Event()
+        self.owner = []
+        for w in range(self.workers):
+            first, last = w * self.games // self.workers, (w + 1) * self.games // self.workers
+            lock = ctx.Lock()
+            self.locks.append(lock)
+            self.owner += [lock] * (last - first)
+            p = ctx.Process(target=run_worker, name=f"wall-{w}", daemon=True,
+                            args=(self.buffers.name, self.games, self.size, first, last - first, lock,
+                                  self.stop_event, self.policy, self.seed, self.tick_rate))
+            p.start()
+            self.procs.append(p)
+        self.started = time.perf_counter()
+
+    def alive(self):
+        return all(p.is_alive() for p in self.procs)
+
+    def composite(self, screen):
+        """Blit every game with a frame newer than the one shown; returns the changed rects."""
+        head, dirty = self.buffers.header, []
+        w, h = self.size
+        for g in range(self.games):
+            row = head[g]
+            with self.owner[g]:
+                latest = row[LATEST]
+                if latest < 0 or latest == row[READING]:
+                    continue
+                row[READING] = latest
+            # the worker now draws around this buffer, so it can be read outside the lock
+            x, y = self.cell(g)
+            screen.blit(self.surfaces[g][latest], (x, y))
+            dirty.append((x, y, w, h))
+            self.shown[g] += 1
+        return dirty
+
+    def stats(self):
+        """Per-game dicts: frames produced and shown per second, games played, worker ms per frame."""
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        out = []
+        for g in range(self.games):
+            row = self.buffers.header[g]
+            made = int(row[PUBLISHED])
+            out.append(dict(game=g, played=int(row[PLAYED]), score=int(row[SCORE]), lives=int(row[LIVES]),
+                            produced_fps=made / elapsed, shown_fps=self.shown[g] / elapsed,
+                            skipped=1 - self.shown[g] / made if made else 0.0,
+                            frame_ms=row[BUSY_NS] / made / 1e6 if made else 0.0))
+        return out
+
+    def stop(self):
+        self.stop_event.set()
+        for p in self.procs:
+            p.join(5)
+            if p.is_alive():
+                p.terminate()
+        self.surfaces = None
+        self.buffers.close()
+        self.buffers.unlink()
+
+def report(stats, elapsed, out=sys.stdout):
+    print(f"{'game':>5}{'played':>8}{'score':>8}{'made/s':>9}{'shown/s':>9}{'skipped':>9}{'ms/frame':>10}", file=out)
+    for s in stats:
+        print(f"{s['game']:>5}{s['played']:>8}{s['score']:>8}{s['produced_fps']:>9.1f}{s['shown_fps']:>9.1f}"
+              f"{s['skipped']:>9.0%}{s['frame_ms']:>10.3f}", file=out)
+    made = sum(s["produced_fps"] for s in stats)
+    shown = sum(s["shown_fps"] for s in stats)
+    print(f"{len(stats)} games in {elapsed:.1f}s: {made:.0f} frames/s produced, {shown:.0f} frames/s shown "
+          f"({1 - shown / made if made else 0:.0%} skipped)", file=out)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Watch many headless games at once, each simulated and drawn "
+                                             "in a worker process.")
+    ap.add_argument("--games", type=int, default=GAMES)
+    ap.add_argument("--workers", type=int, default=None, help="worker processes (default: one per CPU)")
+    ap.add_argument("--scale", type=float, default=SCALE, help=f"tile size relative to the board (default {SCALE})")
+    ap.add_argument("--cols", type=int, default=None, help="tiles per row (default: a square grid)")
+    ap.add_argument("--policy", default="greedy", choices=list(POLICIES), help="who plays Pacman")
+    ap.add_argument("--seed", type=int, default=0, help="seed of game 0; game i plays seed + i")
+    ap.add_argument("--tick-rate", type=float, default=FPS, help="ticks per second per game (0: as fast as possible)")
+    ap.add_argument("--display-fps", type=float, default=RENDER_FPS, help="cap on frames the wall composites")
+    ap.add_argument("--seconds", type=float, default=0, help="quit after this long (default: when closed)")
+    ap.add_argument("--offscreen", action="store_true", help="use SDL's dummy video driver (benchmarks)")
+    args = ap.parse_args(argv)
+
+    if args.offscreen:
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    import pygame
+    from game.render import LazyFont, TextCache
+    wall = SpectatorWall(args.games, args.workers, args.scale, args.policy, args.seed, args.tick_rate, args.cols)
+    pygame.display.init()
+    screen = pygame.display.set_mode(wall.screen_size)
+    pygame.display.set_caption(f"Pac-Man wall: {args.games} games")
+    screen.fill(HUD_BG)
+    pygame.display.flip()
+    font = LazyFont(16)
+    captions = [TextCache(font, WHITE) for _ in range(args.games)]
+    clock = pygame.time.Clock()
+    wall.start()
+    status, running, next_caption = 0, True, 0.0
+    try:
+        while running:
+            for e in pygame.event.get():
+                if e.type == pygame.QUIT:
+                    running = False
+            dirty = wall.composite(screen)
+            now = time.perf_counter()
+            if now >= next_caption:
+                # captions change every frame (scores), so they're refreshed twice a second
+                next_caption = now + 0.5
+                w, h = wall.size
+                for s, text in zip(wall.stats(), captions):
+                    x, y = wall.cell(s["game"])
+                    area = (x, y + h, w, CAPTION)
+                    screen.fill(HUD_BG, area)
+                    screen.blit(text.render(f"#{s['game']} {s['score']}  x{s['lives']}  "
+                                            f"{s['produced_fps']:.0f}/{s['shown_fps']:.0f} fps"), (x + 4, y + h + 3))
+                    dirty.append(area)
+            pygame.display.update(dirty)
+            if not wall.alive():
+                print("a wall worker died", file=sys.stderr)
+                status, running = 1, False
+            if args.seconds and now - wall.started >= args.seconds:
+                running = False
+            clock.tick(args.display_fps)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        elapsed = time.perf_counter() - wall.started
+        stats = wall.stats()
+        wall.stop()
+        pygame.quit()
+    report(stats, elapsed)
+    return status
+
+if __name__ == "__main__":
+    sys.exit(main())